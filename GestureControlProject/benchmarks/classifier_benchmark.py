@@ -0,0 +1,158 @@
+"""Time and score the template gesture classifier against the hand-written rules.
+
+Usage: python classifier_benchmark.py [--classes 2 10 40] [--train 60] [--test 30]
+                                      [--rotation 60]
+
+Synthetic hands are built from per-finger curl values, one set per
+class ('fist', 'thumbs_up' and 'open_palm' first, random poses after
+that), then turned by up to --rotation degrees, scaled, moved around the
+image, mirrored into left hands at random and given landmark noise.
+For each class count it reports the classification cost of a two-hand
+frame, the number of templates and test accuracy. For fist and thumbs-up
+it also compares the rule predicates in landmarks.py with the classifier
+on the same rotated hands.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from gesture_classifier import DEFAULT_ASPECT, GestureClassifier
+from landmarks import HandBatch, is_fist, is_thumbs_up
+
+# Knuckle x of index, middle, ring and pinky, in units of wrist -> middle knuckle
+KNUCKLES = [(-0.3, -0.95), (0.0, -1.0), (0.25, -0.95), (0.45, -0.85)]
+SEGMENTS = [0.45, 0.3, 0.25]
+NAMED = {
+    'fist': (1.0, 1.0, 1.0, 1.0, 1.0),        # Index .. pinky curl, thumb curl
+    'thumbs_up': (1.0, 1.0, 1.0, 1.0, -1.0),  # Thumb -1: pointing straight up
+    'open_palm': (0.0, 0.0, 0.0, 0.0, 0.0),
+}
+
+
+def hand_shape(curls):
+    """(21, 3) right hand, wrist at the origin, fingers up; curls 0 (straight) .. 1 (folded)"""
+    points = np.zeros((21, 3))
+    for finger, (x, y) in enumerate(KNUCKLES):
+        base = 5 + 4 * finger
+        points[base] = (x, y, 0)
+        angle = 0.0
+        position = np.array([x, y, 0.0])
+        for joint, length in enumerate(SEGMENTS):
+            angle += curls[finger] * math.radians(95)
+            # Folding turns the finger towards the camera, then back down over the palm
+            position = position + length * np.array([0.0, -math.cos(angle), -math.sin(angle)])
+            points[base + 1 + joint] = position
+    thumb = curls[4]
+    if thumb < 0:  # Thumb up
+        direction = np.array([0.0, -1.0])
+    else:  # 0: out to the side, 1: across the palm
+        theta = math.radians(-135 + 150 * thumb)
+        direction = np.array([math.cos(theta), math.sin(theta)])
+    position = np.array([-0.2, -0.2])
+    for joint in range(4):
+        position = position + 0.28 * direction
+        points[1 + joint, :2] = position
+    return points
+
+
+def class_poses(count, rng):
+    poses = dict(NAMED)
+    while len(poses) < count:
+        curls = tuple(rng.choice([0.0, 0.5, 1.0], 4)) + (float(rng.choice([-1.0, 0.0, 0.5, 1.0])),)
+        if curls not in poses.values():
+            poses[f'pose_{len(poses)}'] = curls
+    return dict(list(poses.items())[:count])
+
+
+def sample(curls, count, rotation, noise, rng):
+    """(count, 21, 3) normalized landmarks and handedness of noisy, turned, placed hands"""
+    points = np.empty((count, 21, 3), np.float32)
+    handedness = []
+    for i in range(count):
+        jittered = np.clip(np.array(curls) + rng.normal(0, 0.06, 5), -1.0, 1.0)
+        jittered[4] = curls[4] if curls[4] < 0 else jittered[4]
+        hand = hand_shape(jittered)
+        angle = math.radians(rng.uniform(-rotation, rotation))
+        c, s = math.cos(angle), math.sin(angle)
+        xy = hand[:, :2] @ np.array([[c, s], [-s, c]])
+        left = rng.random() < 0.5
+        if left:
+            xy[:, 0] = -xy[:, 0]
+        scale = rng.uniform(0.08, 0.16)
+        center = rng.uniform(0.3, 0.7, 2)
+        xy = xy * scale + center + rng.normal(0, noise, xy.shape)
+        points[i, :, 0] = (xy[:, 0] - 0.5) / DEFAULT_ASPECT + 0.5  # Back to image-normalized x
+        points[i, :, 1] = xy[:, 1]
+        points[i, :, 2] = hand[:, 2] * scale / DEFAULT_ASPECT
+        handedness.append('Left' if left else 'Right')
+    return points, handedness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--classes', type=int, nargs='+', default=[2, 10, 40])
+    parser.add_argument('--train', type=int, default=60, help="Training frames per class")
+    parser.add_argument('--test', type=int, default=30, help="Test frames per class")
+    parser.add_argument('--rotation', type=float, default=60.0,
+                        help="Hands are turned by up to this many degrees either way")
+    parser.add_argument('--noise', type=float, default=0.002,
+                        help="Landmark noise, standard deviation in normalized units")
+    parser.add_argument('--repeat', type=int, default=2000, help="Timed two-hand frames")
+    args = parser.parse_args()
+
+    report = {}
+    for count in args.classes:
+        rng = np.random.default_rng(count)
+        poses = class_poses(count, rng)
+        examples = {name: sample(curls, args.train, args.rotation, args.noise, rng)
+                    for name, curls in poses.items()}
+        classifier = GestureClassifier.fit(examples)
+
+        correct = total = 0
+        tests = {}
+        for label, (name, curls) in enumerate(poses.items()):
+            points, handedness = tests[name] = sample(curls, args.test, args.rotation, args.noise, rng)
+            predicted = classifier.classify(HandBatch(points, handedness))
+            correct += int((predicted == label).sum())
+            total += len(points)
+
+        points, handedness = tests['fist']
+        frames = [HandBatch(points[i:i + 2], handedness[i:i + 2]) for i in range(0, len(points) - 1, 2)]
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            classifier.classify(frames[i % len(frames)])
+        per_frame = (time.perf_counter() - start) / args.repeat
+
+        report[f'{count}_classes'] = {
+            'templates': len(classifier.templates),
+            'classify_two_hands_us': round(per_frame * 1e6, 1),
+            'accuracy': round(correct / total, 4),
+        }
+
+        if count == max(args.classes):
+            # Rules vs classifier on the same rotated hands
+            comparison = {}
+            for name, rule in (('fist', is_fist), ('thumbs_up', is_thumbs_up)):
+                index = classifier.classes.index(name)
+                hits = {'rule': [0, 0], 'classifier': [0, 0]}  # [true positives, false positives]
+                for other, (points, handedness) in tests.items():
+                    batch = HandBatch(points, handedness)
+                    for method, found in (('rule', rule(batch)),
+                                          ('classifier', classifier.classify(batch) == index)):
+                        hits[method][0 if other == name else 1] += int(found.sum())
+                comparison[name] = {method: {'recall': round(tp / args.test, 3),
+                                             'false_positives': fp}
+                                    for method, (tp, fp) in hits.items()}
+            report['rules_vs_classifier'] = comparison
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Replay a landmark trajectory through the cursor smoothing options.
+
+Usage: python cursor_filter_benchmark.py [--fps 30] [--noise 0.003] [--latency 0.05]
+                                         [--recording RECORDING [--hand Left|Right]]
+
+A synthetic index-fingertip stream (hold, sweep, hold, circle) with
+Gaussian noise is fed through each smoothing option. For every option it
+reports jitter while the hand holds still, tracking error against where
+the hand really is when the cursor moves (capture time + latency), the
+equivalent lag, and the cost of one update.
+
+--recording replays the index tip of a landmark recording (see
+landmark_recording.py) instead, of the first hand in view or of --hand.
+A recording has no ground truth, so the reference is the recorded tip
+averaged over a few frames centred on each one, which no causal filter
+can see; the hand "holds still" where that reference moves slower than
+STILL_SPEED.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from cursor_filter import CursorMapper
+from landmark_recording import LandmarkRecording
+from landmarks import INDEX_TIP
+
+SCREEN = (1920, 1080)
+STILL_SPEED = 0.1  # Normalized units per second
+
+
+def synthetic_trajectory(fps, seed=0):
+    """Returns timestamps, true normalized positions, and a moving-segment mask"""
+    t = np.arange(0, 6.0, 1.0 / fps)
+    x = np.full_like(t, 0.3)
+    y = np.full_like(t, 0.5)
+    sweep = (t >= 1.0) & (t < 2.0)
+    x[sweep] = 0.3 + 0.4 * (t[sweep] - 1.0)
+    x[t >= 2.0] = 0.7
+    circle = t >= 3.0
+    phase = 2 * np.pi * 0.5 * (t[circle] - 3.0)
+    x[circle] = 0.5 + 0.2 * np.cos(phase)
+    y[circle] = 0.5 + 0.2 * np.sin(phase)
+    moving = sweep | circle
+    return t, np.stack([x, y], axis=1), moving
+
+
+def recorded_trajectory(path, hand=None, window=5):
+    """Timestamps, recorded tips, reference tips, a moving mask and where each run starts.
+
+    Frames without the hand split the recording into runs, the mappers are
+    reset at the start of every run like the engine does when it loses the
+    cursor hand.
+    """
+    recording = LandmarkRecording(path)
+    t, tips, starts = [], [], []
+    lost = True
+    for i in range(len(recording)):
+        batch = recording.batch(i)
+        index = None
+        if batch is not None:
+            if hand is None:
+                index = 0
+            elif hand in batch.handedness:
+                index = batch.handedness.index(hand)
+        if index is None:
+            lost = True
+            continue
+        if lost:
+            starts.append(len(t))
+            lost = False
+        t.append(float(recording.frames['timestamp'][i]))
+        tips.append(batch.points[index, INDEX_TIP, :2])
+    if not t:
+        raise SystemExit(f"No {hand or 'hand'} in {path}")
+    t = np.array(t)
+    tips = np.array(tips, float)
+    reference = np.empty_like(tips)
+    for begin, end in zip(starts, starts[1:] + [len(t)]):
+        run_tips = tips[begin:end]
+        half = min(window // 2, (len(run_tips) - 1) // 2)
+        padded = np.pad(run_tips, ((half, half), (0, 0)), mode='edge')
+        kernel = np.ones(2 * half + 1) / (2 * half + 1)
+        reference[begin:end] = np.stack([np.convolve(padded[:, k], kernel, mode='valid')
+                                         for k in range(2)], axis=1)
+    speed = np.zeros(len(t))
+    speed[1:] = np.linalg.norm(np.diff(reference, axis=0), axis=1) / np.maximum(np.diff(t), 1e-6)
+    speed[starts] = 0.0
+    return t, tips, reference, speed > STILL_SPEED, starts
+
+
+class ExponentialSmoothing:
+    """The fixed smoothing = 0.5 filter gesture_control.py used to have"""
+
+    def __init__(self, factor=0.5):
+        self.factor = factor
+        self.prev = None
+
+    def reset(self):
+        self.prev = None
+
+    def map(self, x, y, timestamp):
+        point = np.array([x * (SCREEN[0] - 1), y * (SCREEN[1] - 1)])
+        if self.prev is None:
+            self.prev = point
+        self.prev = self.prev + (point - self.prev) * self.factor
+        return int(self.prev[0]), int(self.prev[1])
+
+
+class Raw:
+    def map(self, x, y, timestamp):
+        return int(x * (SCREEN[0] - 1)), int(y * (SCREEN[1] - 1))
+
+
+def run(mapper, t, noisy, truth, moving, latency, starts=()):
+    out = np.empty_like(noisy)
+    starts = set(starts)
+    reset = getattr(mapper, 'reset', None)
+    start = time.perf_counter()
+    for i in range(len(t)):
+        if i in starts and reset is not None:
+            reset()
+        if getattr(mapper, 'predict', False):
+            mapper.observe_latency(latency)  # What the engine reads off the cursor thread
+        out[i] = mapper.map(noisy[i, 0], noisy[i, 1], t[i])
+    per_update_us = (time.perf_counter() - start) / len(t) * 1e6
+
+    # Where the hand really is when the cursor moves
+    truth_px = np.stack([np.interp(t + latency, t, truth[:, k]) * (SCREEN[k] - 1)
+                         for k in range(2)], axis=1)
+    error = np.linalg.norm(out - truth_px, axis=1)
+    still = ~moving
+    still[:5] = False  # Let every filter settle first
+    steps = np.linalg.norm(np.diff(out, axis=0), axis=1)
+    speed = np.linalg.norm(np.diff(truth_px, axis=0), axis=1) / np.diff(t)
+    return {
+        'jitter_px': round(float(np.sqrt((steps[still[1:]] ** 2).mean())), 3),
+        'tracking_rmse_px': round(float(np.sqrt((error[moving] ** 2).mean())), 2),
+        'lag_ms': round(float(error[moving].mean() / speed[moving[1:]].mean() * 1000), 1),
+        'update_us': round(per_update_us, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--noise', type=float, default=0.003,
+                        help="Landmark noise, standard deviation in normalized units")
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="Simulated capture-to-actuation latency in seconds")
+    parser.add_argument('--recording', help="Replay the index tip of this landmark recording")
+    parser.add_argument('--hand', choices=['Left', 'Right'],
+                        help="Hand of the recording that moves the cursor, default the first")
+    args = parser.parse_args()
+
+    starts = ()
+    if args.recording:
+        t, noisy, truth, moving, starts = recorded_trajectory(args.recording, args.hand)
+    else:
+        t, truth, moving = synthetic_trajectory(args.fps)
+        noisy = truth + np.random.default_rng(0).normal(0, args.noise, truth.shape)
+    options = {
+        'raw': Raw(),
+        'exponential_0.5': ExponentialSmoothing(0.5),
+        'one_euro': CursorMapper(SCREEN),
+        'one_euro_predict': CursorMapper(SCREEN, predict=True),
+    }
+    report = {name: run(mapper, t, noisy, truth, moving, args.latency, starts)
+              for name, mapper in options.items()}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
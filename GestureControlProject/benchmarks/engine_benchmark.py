@@ -0,0 +1,107 @@
+"""Time GestureEngine's import, warm-up, first frame and restarts.
+
+Usage: python engine_benchmark.py [SESSION] [--frames 10] [--restarts 3]
+
+SESSION is a video file or a directory of images, a synthetic source is
+used without one. Reports:
+
+  - import time of the engine module against MediaPipe and OpenCV, each
+    in a fresh interpreter, which is what importing the entry points used
+    to cost before anything appeared on screen
+  - time to the first processed frame of a cold engine, which has to
+    import and build everything first, and of one warmed up beforehand
+    (as hand_tracker.py does while its menu shows)
+  - time to the first frame of restarted sessions on the same engine,
+    next to a new engine per session, which builds a new Hands graph and
+    loads the model the way every Start click used to
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, SRC)
+
+from engine import GestureEngine
+from input_backend import RecordingBackend
+from window_context import FakeWindows
+
+HANDS_OPTIONS = dict(max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+
+def import_seconds(statement):
+    """Seconds `statement` takes in a fresh interpreter, best of three"""
+    code = ("import sys, time; sys.path.insert(0, {!r}); start = time.perf_counter(); {}; "
+            "print(time.perf_counter() - start)").format(SRC, statement)
+    return min(float(subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                    text=True, check=True).stdout.split()[-1])
+               for _ in range(3))
+
+
+def make_source(session, frames):
+    from frame_sources import PACE_FAST, SyntheticSource, open_source
+    if session is None:
+        return SyntheticSource(frames=frames, pace=PACE_FAST)
+    return open_source(session, pace=PACE_FAST)
+
+
+def make_engine():
+    engine = GestureEngine(HANDS_OPTIONS, input_backend=RecordingBackend(), windows=FakeWindows())
+    engine.headless = True
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('session', nargs='?', help="Video file or image directory")
+    parser.add_argument('--frames', type=int, default=10, help="Frames per synthetic session")
+    parser.add_argument('--restarts', type=int, default=3)
+    args = parser.parse_args()
+
+    report = {
+        'import_s': {
+            'engine': round(import_seconds('import engine'), 3),
+            'mediapipe_and_cv2': round(import_seconds('import cv2, mediapipe'), 3),
+        },
+    }
+
+    # Cold: the module imports, the graph and the model load all happen in run()
+    engine = make_engine()
+    start = time.perf_counter()
+    engine.run(make_source(args.session, args.frames))
+    cold = {'session_s': round(time.perf_counter() - start, 3),
+            'first_frame_s': round(engine.first_frame_seconds, 3)}
+    engine.close()
+
+    engine = make_engine()
+    start = time.perf_counter()
+    engine.warm_up().wait_ready()
+    warm_up = time.perf_counter() - start
+    engine.run(make_source(args.session, args.frames))
+    warmed = {'warm_up_s': round(warm_up, 3), 'first_frame_s': round(engine.first_frame_seconds, 3)}
+    report['first_frame'] = {'cold': cold, 'warmed': warmed}
+
+    restarts = []
+    for _ in range(args.restarts):
+        engine.run(make_source(args.session, args.frames))
+        restarts.append(engine.first_frame_seconds)
+    engine.close()
+
+    rebuilds = []
+    for _ in range(args.restarts):
+        engine = make_engine()
+        engine.run(make_source(args.session, args.frames))
+        rebuilds.append(engine.first_frame_seconds)
+        engine.close()
+    report['restart_first_frame_s'] = {
+        'same_engine': [round(s, 3) for s in restarts],
+        'new_graph': [round(s, 3) for s in rebuilds],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
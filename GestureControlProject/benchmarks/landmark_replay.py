@@ -0,0 +1,108 @@
+"""Replay a landmark recording through the gesture, cursor and action layers.
+
+Usage: python landmark_replay.py RECORDING [--cooldown GESTURE=SECONDS ...]
+                                 [--window TITLE] [--actions-config PATH]
+                                 [--macros-config PATH] [--events] [--realtime]
+
+RECORDING comes from gesture_control.py or hand_tracker.py run with
+--record. No camera or MediaPipe is involved, so a session replays far
+faster than real time. The recording first goes through the gesture
+state machine and MotionGestures alone, which reports the events under
+the given cooldowns (recorded time) and is fully deterministic. Then it
+goes through GestureEngine.replay() with gesture_control.py's
+handle_event and an Actuator on a RecordingBackend, with FakeWindows
+showing --window in the foreground. That is the path of a live session
+after MediaPipe: cursor mapping, per-app actions, macros, action
+coalescing. Reports what reached the input backend and how many actions
+were coalesced away. Replayed as fast as possible, actions that take
+real time coalesce more than they would live; --realtime spaces the
+frames as recorded.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import gesture_control
+from actuator import Actuator
+from app_actions import AppActions
+from engine import GestureEngine
+from gesture_events import DEFAULT_GESTURES, GestureStateMachine
+from input_backend import RecordingBackend
+from landmark_recording import LandmarkRecording, replay_gestures
+from window_context import FakeWindows
+
+
+def parse_cooldown(text):
+    name, _, seconds = text.partition('=')
+    return name, float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording', help="Landmark recording (.glmk)")
+    parser.add_argument('--cooldown', type=parse_cooldown, action='append', default=[],
+                        metavar='GESTURE=SECONDS', help="Override a gesture's cooldown")
+    parser.add_argument('--window', default='untitled - notepad',
+                        help="Title of the foreground window the actions are matched against")
+    parser.add_argument('--actions-config', default=gesture_control.DEFAULT_ACTIONS_CONFIG)
+    parser.add_argument('--macros-config', default=gesture_control.DEFAULT_MACROS_CONFIG)
+    parser.add_argument('--events', action='store_true',
+                        help="List every gesture event and every input event")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Pace the session replay by the recorded timestamps")
+    args = parser.parse_args()
+
+    recording = LandmarkRecording(args.recording)
+    configs = dict(DEFAULT_GESTURES)
+    for name, seconds in args.cooldown:
+        configs[name] = configs[name]._replace(cooldown=seconds)
+
+    start = time.perf_counter()
+    events = replay_gestures(recording, configs)
+    gesture_seconds = time.perf_counter() - start
+
+    windows = FakeWindows()
+    windows.open(args.window)
+    backend = RecordingBackend()
+    actuator = gesture_control.actuator = Actuator(
+        backend, windows, AppActions.load(args.actions_config))
+    gesture_control.load_gesture_macros(args.macros_config)
+    engine = GestureEngine(gesture_control.HANDS_OPTIONS, gesture_control.handle_event,
+                           actuator=actuator)
+    engine.gesture_events = GestureStateMachine(configs)
+    start = time.perf_counter()
+    try:
+        frames = engine.replay(recording, realtime=args.realtime)
+    finally:
+        engine.close()
+    session_seconds = time.perf_counter() - start
+
+    with_hands = int((recording.frames['hand_count'] > 0).sum()) if frames else 0
+    report = {
+        'frames': frames,
+        'frames_with_hands': with_hands,
+        'recorded_seconds': round(recording.duration, 3),
+        'gesture_replay_seconds': round(gesture_seconds, 4),
+        'speedup': round(recording.duration / gesture_seconds, 1) if gesture_seconds else None,
+        'session_replay_seconds': round(session_seconds, 4),
+        'cooldowns': {name: config.cooldown for name, config in configs.items()},
+        'events': dict(Counter(f"{e.gesture}/{e.hand}/{e.kind}" for e in events)),
+        'input': dict(Counter(event.kind for event in backend.events)),
+        'actions_coalesced': actuator.actions.dropped,
+    }
+    if args.events:
+        first = float(recording.frames['timestamp'][0]) if frames else 0.0
+        report['event_log'] = [(round(e.timestamp - first, 3), e.kind, e.gesture, e.hand)
+                               for e in events]
+        report['input_log'] = [(event.kind,) + tuple(event.args) for event in backend.events
+                               if event.kind != 'move']
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
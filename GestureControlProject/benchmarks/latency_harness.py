@@ -0,0 +1,305 @@
+"""Measure motion-to-cursor latency on video whose frames carry their own capture time.
+
+Usage: python latency_harness.py [--seconds 8] [--fps 30] [--warmup 1] [--roi] [--predict]
+                                 [--write clip.avi] [--video clip.avi] [--output report.json]
+
+Frame k of the clip shows a drawn open hand whose index tip is at
+trajectory(k / fps) and carries k in a row of black and white cells in
+its top left corner, so every frame says when it was "in front of the
+lens". The clip plays like a live camera: frame k is due k / fps seconds
+after the first one, and a reader that falls behind skips to the frame
+that is due, it never gets a backlog. The real GestureEngine tracks it
+headless, inline like gesture_control.py by default, and moves the cursor
+of a RecordingBackend.
+
+For every cursor move the harness decodes which frame it came from and
+reports:
+
+  - latency from the frame being due to the move being injected, which
+    covers capture, queueing, inference, filtering and the cursor thread
+  - the part of it after the capture thread stamped the frame, which is
+    what RecordingBackend.latencies() sees
+  - frame error: distance from where that frame's index tip maps on the
+    screen, i.e. tracking plus smoothing error, and its mean (x, y) offset
+  - display error: distance from where the hand is when the cursor moves,
+    what the user sees, latency included
+
+Moves during the first --warmup seconds, while the hand is acquired, are
+left out. Nothing depends on the machine but the timings, so two runs on
+the same CI runner are comparable. --write saves the clip (MJPG) and
+--video replays one, e.g. to track the same pixels after a pipeline change.
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import cv2
+import numpy as np
+
+from classifier_benchmark import hand_shape
+from engine import DEFAULT_REGION, GestureEngine
+from frame_sources import FrameSource
+from input_backend import RecordingBackend
+from window_context import FakeWindows
+
+FRAME_SIZE = (640, 480)
+SCREEN = (1920, 1080)
+HANDS_OPTIONS = dict(max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+# Frame index code: BITS cells of CELL pixels, least significant first
+BITS = 20
+CELL = 10
+BACKGROUND = (60, 60, 60)
+SKIN = (120, 150, 200)
+CREASE = (90, 115, 165)
+NAIL = (150, 175, 215)
+HAND_SCALE = 130  # Pixels from the wrist to the middle knuckle
+FINGER_WIDTH = 0.17  # Of HAND_SCALE
+FINGER_SPREAD = 8.0  # Degrees between neighbouring fingers
+CHAINS = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 16], [17, 18, 19, 20]]
+
+
+def trajectory(t):
+    """Normalized (x, y) of the index tip at clip time t, in camera (unmirrored) coordinates"""
+    return (0.5 + 0.15 * math.sin(2 * math.pi * t / 4.0),
+            0.35 + 0.08 * math.sin(2 * math.pi * t / 3.0))
+
+
+def screen_point(x, y):
+    """Where the engine maps a camera point: mirrored, through its active region"""
+    return DEFAULT_REGION.map(1.0 - x, y, SCREEN[0], SCREEN[1])
+
+
+def encode_index(image, index):
+    for bit in range(BITS):
+        value = 255 if index >> bit & 1 else 0
+        image[CELL:2 * CELL, CELL * (bit + 1):CELL * (bit + 2)] = value
+
+
+def decode_index(image):
+    """Frame index drawn by encode_index(), survives lossy compression"""
+    centers = image[CELL + CELL // 2, CELL * np.arange(1, BITS + 1) + CELL // 2]
+    bits = centers.mean(axis=1) > 127
+    return int((bits * (1 << np.arange(BITS))).sum())
+
+
+class HandPainter:
+    """Draws an open right hand, palm to the camera, that MediaPipe detects"""
+
+    def __init__(self):
+        points = hand_shape((0.0, 0.0, 0.0, 0.0, 0.0))[:, :2]
+        for finger, chain in enumerate(CHAINS[1:]):
+            angle = math.radians((finger - 1.5) * FINGER_SPREAD)
+            rotation = np.array([[math.cos(angle), -math.sin(angle)],
+                                 [math.sin(angle), math.cos(angle)]])
+            base = points[chain[0]]
+            points[chain] = base + (points[chain] - base) @ rotation.T
+        # Pixel offsets from the index tip, the point the cursor follows
+        self.offsets = (points - points[8]) * HAND_SCALE
+        self.width = int(HAND_SCALE * FINGER_WIDTH)
+
+    def draw(self, image, x, y):
+        height, width = image.shape[:2]
+        p = np.round(self.offsets + (x * width, y * height)).astype(np.int32)
+        half = int(HAND_SCALE * 0.35)
+        wrist = p[0]
+        # Forearm down to the bottom edge, then the palm over it
+        cv2.fillConvexPoly(image, np.array([wrist + (-half, 0), wrist + (half, 0),
+                                            (wrist[0] + half + 10, height),
+                                            (wrist[0] - half - 10, height)]), SKIN)
+        side = int(HAND_SCALE * 0.08)
+        palm = np.array([wrist + (-half, 0), wrist + (half, 0), p[17] + (side, 0),
+                         p[13], p[9], p[5] - (side, 0), p[2]])
+        cv2.fillPoly(image, [cv2.convexHull(palm)], SKIN)
+        for chain in CHAINS:
+            for k, (a, b) in enumerate(zip(chain, chain[1:])):
+                thickness = int(self.width * (1 - 0.12 * k))
+                cv2.line(image, tuple(p[a]), tuple(p[b]), SKIN, thickness)
+                cv2.circle(image, tuple(p[b]), thickness // 2, SKIN, -1)
+            cv2.circle(image, tuple(p[chain[-1]]), max(2, int(self.width * 0.3)), NAIL, -1)
+            for joint in chain[1:-1]:
+                cv2.circle(image, tuple(p[joint]), max(1, int(self.width * 0.2)), CREASE, 1)
+
+
+def render(image, index, fps, painter):
+    """Draw frame `index` of the clip into `image`"""
+    image[:] = BACKGROUND
+    painter.draw(image, *trajectory(index / fps))
+    # Soften the edges like a camera would, the code is drawn after
+    cv2.GaussianBlur(image, (7, 7), 0, dst=image)
+    encode_index(image, index)
+
+
+def write_clip(path, fps, frames):
+    painter = HandPainter()
+    image = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, FRAME_SIZE)
+    for index in range(frames):
+        render(image, index, fps, painter)
+        writer.write(image)
+    writer.release()
+
+
+class EncodedClip(FrameSource):
+    """The clip as a live camera: frames drawn on the fly, or read from `video`.
+
+    Logs (time delivered, decoded index) for every frame it hands out.
+    """
+
+    def __init__(self, fps, frames, video=None):
+        self.fps = fps
+        self.frames = frames
+        self.video = video
+        self.capture = None
+        self.exhausted = False
+
+    def open(self):
+        self.painter = HandPainter()
+        self._image = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), np.uint8)
+        if self.video is not None:
+            self.capture = cv2.VideoCapture(self.video)
+            if not self.capture.isOpened():
+                return False
+            # The trajectory runs on the clip's own frame rate
+            self.fps = self.capture.get(cv2.CAP_PROP_FPS) or self.fps
+            self.frames = min(self.frames, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._position = 0  # Next frame of the video
+        self._next = 0      # Next frame due
+        self.start = None   # When frame 0 was due
+        self.delivered = []
+        self.exhausted = False
+        return True
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now
+        due = self.start + self._next / self.fps
+        if now < due:
+            time.sleep(due - now)
+            index = self._next
+        else:
+            # Behind: skip to the frame due now, like a camera would
+            index = max(self._next, int((now - self.start) * self.fps))
+        if index >= self.frames:
+            self.exhausted = True
+            return False, None
+        if image is None or image.shape != self._image.shape:
+            image = self._image
+        if self.capture is None:
+            render(image, index, self.fps, self.painter)
+        else:
+            while self._position < index:
+                self.capture.grab()
+                self._position += 1
+            self.capture.read(image)
+            self._position += 1
+        self._next = index + 1
+        self.delivered.append((time.perf_counter(), decode_index(image)))
+        return True, image
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+def percentiles(values, name, unit):
+    values = np.asarray(values)
+    if not values.size:
+        return {}
+    return {f'{name}_{unit}_p{p}': round(float(np.percentile(values, p)), 2) for p in (50, 95, 99)}
+
+
+def analyse(clip, backend, warmup):
+    """Match every cursor move to the frame it came from and compare with ground truth"""
+    delivered = [t for t, _ in clip.delivered]
+    indexes = [index for _, index in clip.delivered]
+    latency, pipeline, frame_offset, display_error, frames = [], [], [], [], set()
+    decode_errors = sum(1 for k in range(1, len(indexes)) if indexes[k] <= indexes[k - 1])
+    for event in backend.events:
+        if event.kind != 'move' or event.source_timestamp is None:
+            continue
+        # The capture thread stamps a frame right after the clip delivers it
+        k = bisect.bisect_right(delivered, event.source_timestamp) - 1
+        if k < 0:
+            continue
+        index = indexes[k]
+        clip_time = index / clip.fps
+        if clip_time < warmup:
+            continue
+        frames.add(index)
+        latency.append((event.timestamp - (clip.start + clip_time)) * 1000.0)
+        pipeline.append((event.timestamp - event.source_timestamp) * 1000.0)
+        position = np.array(event.args, float)
+        frame_offset.append(position - screen_point(*trajectory(clip_time)))
+        now = trajectory(event.timestamp - clip.start)
+        display_error.append(np.hypot(*(position - screen_point(*now))))
+
+    shown = [index for index in indexes if index / clip.fps >= warmup]
+    report = {
+        'frames_delivered': len(shown),
+        'frames_skipped': (shown[-1] - shown[0] + 1 - len(shown)) if shown else 0,
+        'frames_moved_cursor': len(frames),
+        'moves': len(latency),
+        'decode_errors': decode_errors,
+    }
+    report.update(percentiles(latency, 'latency', 'ms'))
+    if latency:
+        report['latency_ms_max'] = round(float(np.max(latency)), 2)
+    report.update(percentiles(pipeline, 'after_capture', 'ms'))
+    report.update(percentiles(np.hypot(*np.transpose(frame_offset)), 'frame_error', 'px'))
+    if frame_offset:
+        # Mostly where MediaPipe puts the tip of a drawn finger, constant between runs
+        report['frame_offset_px_mean'] = np.round(np.mean(frame_offset, axis=0), 1).tolist()
+    report.update(percentiles(display_error, 'display_error', 'px'))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=8.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=1.0,
+                        help="Seconds at the start left out of the report")
+    parser.add_argument('--roi', action='store_true', help="Track on a crop around the hand")
+    parser.add_argument('--predict', action='store_true',
+                        help="Lead the cursor by the measured latency, see cursor_filter.py")
+    parser.add_argument('--write', metavar='PATH', help="Save the clip as a video and exit")
+    parser.add_argument('--video', metavar='PATH', help="Replay a clip saved with --write")
+    parser.add_argument('--output', help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    frames = int(args.seconds * args.fps)
+    if args.write:
+        write_clip(args.write, args.fps, frames)
+        return
+
+    backend = RecordingBackend(SCREEN)
+    engine = GestureEngine(HANDS_OPTIONS, input_backend=backend, windows=FakeWindows(),
+                           roi=args.roi, predict=args.predict)
+    engine.headless = True
+    engine.wait_ready(timeout=None)  # Model loading is not part of the latency
+    clip = EncodedClip(args.fps, frames, args.video)
+    try:
+        engine.run(clip)
+    finally:
+        engine.close()
+
+    report = analyse(clip, backend, args.warmup)
+    report['frames_processed'] = engine.frames_processed
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Run the configured Notepad save macro against a simulated, variably slow UI.
+
+Usage: python macro_benchmark.py [--config ../config/gesture_control_macros.json]
+                                 [--ui-delays 0.01 0.1 0.5 0.8]
+
+A fake Notepad reacts to the macro's keystrokes after a delay: Ctrl+C
+fills the fake clipboard, Ctrl+Shift+S opens a "Save As" window and
+Alt+S closes it again. Windows and clipboard are the fake services from
+window_context.py and macros.py, no real input is sent. For each UI
+delay it reports how long both triggers of the macro took, whether the
+file name reached the dialog and the save went through, next to the
+fixed sleeps the macro used to have (4.0 s + 0.8 s), which also broke
+once the UI needed longer than they allowed.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from actions import ActionContext
+from input_backend import RecordingBackend
+from macros import FUNCTIONS, FakeClipboard, MacroServices, default_variables, load_macros
+from window_context import FakeWindows, WindowContext
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), '..', 'config', 'gesture_control_macros.json')
+FIXED_SLEEPS = (0.5 + 0.5 + 1.5 + 0.5 + 1.0, 0.5 + 0.3)  # First and second trigger
+# The longest UI reaction each fixed sleep waited for
+FIXED_SLEEP_LIMIT = 0.5
+
+
+class FakeNotepad(RecordingBackend):
+    """Input backend whose keystrokes drive a fake Notepad after `delay` seconds"""
+
+    def __init__(self, windows, clipboard, delay):
+        super().__init__()
+        self.windows = windows
+        self.clipboard = clipboard
+        self.delay = delay
+        self.editor = windows.open("notes - Notepad")
+        self.dialog = None
+        self.saved_as = None
+        self.typed = ''
+
+    def _later(self, fn):
+        timer = threading.Timer(self.delay, fn)
+        timer.daemon = True
+        timer.start()
+
+    def hotkey(self, *keys):
+        super().hotkey(*keys)
+        if keys == ('ctrl', 'c'):
+            self._later(lambda: self.clipboard.set_text("Shopping list\neggs\nmilk"))
+        elif keys == ('ctrl', 'shift', 's'):
+            self._later(self._open_dialog)
+        elif keys == ('alt', 's') and self.dialog is not None:
+            self._later(self._close_dialog)
+
+    def write(self, text):
+        super().write(text)
+        if self.dialog is not None:
+            self.typed = text
+
+    def _open_dialog(self):
+        self.dialog = self.windows.open("Save As")
+
+    def _close_dialog(self):
+        self.saved_as = self.typed
+        self.windows.close(self.dialog)
+        self.dialog = None
+        self.windows.focus(self.editor)
+
+
+def run(config, delay):
+    platform = FakeWindows()
+    clipboard = FakeClipboard("old clipboard text")
+    backend = FakeNotepad(platform, clipboard, delay)
+    windows = WindowContext(platform).start()
+    macro = load_macros(config, MacroServices(backend, windows, clipboard),
+                        FUNCTIONS, default_variables())['notepad_save']
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            start = time.perf_counter()
+            macro(ActionContext('thumbs_up'))
+            first = time.perf_counter() - start
+            opened = macro.active and backend.dialog is not None
+            start = time.perf_counter()
+            if macro.active:
+                macro(ActionContext('thumbs_up'))
+            second = time.perf_counter() - start
+    finally:
+        windows.stop()
+    return {
+        'first_trigger_s': round(first, 3),
+        'second_trigger_s': round(second, 3),
+        'dialog_opened': opened,
+        'saved_as': backend.saved_as,
+        'messages': messages.getvalue().splitlines(),
+        'fixed_sleeps_s': round(sum(FIXED_SLEEPS), 1),
+        'fixed_sleeps_would_work': delay <= FIXED_SLEEP_LIMIT,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help="Macros config file")
+    parser.add_argument('--ui-delays', type=float, nargs='+', default=[0.01, 0.1, 0.5, 0.8],
+                        help="Seconds the fake UI takes to react to each keystroke")
+    args = parser.parse_args()
+
+    report = {f'ui_delay_{delay}s': run(args.config, delay) for delay in args.ui_delays}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Measure the per-frame cost of dynamic gesture recognition on a synthetic session.
+
+Usage: python motion_benchmark.py [--fps 30] [--repeat 20] [--window 32]
+
+A synthetic hand swipes right and left with an open palm, pinches and
+drags, then scrolls with two fingers up. The stream runs through
+MotionGestures and, for scale, through the static gesture predicates and
+a naive recognizer that recomputes velocity, displacement and pinch
+distance over the whole landmark window every frame. Reports the cost of
+one update in microseconds and the events that were recognized.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from landmarks import INDEX_TIP, PALM, THUMB_TIP, WRIST, HandBatch, gestures
+from motion import MotionGestures
+
+FINGER_X = [0.46, 0.50, 0.54, 0.58]  # Index, Middle, Ring, Pinky
+
+
+def hand_pose(pose):
+    """(21, 3) landmarks of a right hand with its palm at the origin.
+
+    pose is 'open' (all fingers up), 'pinch' (thumb on the index tip) or
+    'two' (index and middle up, the others folded).
+    """
+    points = np.zeros((21, 3), np.float32)
+    points[WRIST] = (0.0, 0.2, 0)
+    points[1:5] = [(-0.06, 0.15, 0), (-0.08, 0.1, 0), (-0.12, 0.05, 0), (-0.15, 0.0, 0)]
+    up = {'open': (True, True, True, True), 'pinch': (True, True, True, True),
+          'two': (True, True, False, False)}[pose]
+    for finger, x in enumerate(FINGER_X):
+        base = 5 + 4 * finger
+        x -= 0.5
+        tip_y = -0.18 if up[finger] else 0.06
+        points[base:base + 4] = [(x, 0.02, 0), (x, -0.08, 0), (x, (tip_y - 0.08) / 2, 0),
+                                 (x, tip_y, 0)]
+    if pose == 'pinch':
+        points[THUMB_TIP] = points[INDEX_TIP] + (0.0, 0.02, 0)
+    return points - points[PALM]
+
+
+def synthetic_session(fps):
+    """Timestamps and (frames, 21, 3) landmarks: swipe right, swipe left, pinch-drag, scroll"""
+    segments = [
+        # (seconds, pose, palm start, palm end)
+        (0.5, 'open', (0.3, 0.5), (0.3, 0.5)),
+        (0.25, 'open', (0.3, 0.5), (0.7, 0.5)),    # Swipe right
+        (0.75, 'open', (0.7, 0.5), (0.7, 0.5)),
+        (0.25, 'open', (0.7, 0.5), (0.3, 0.5)),    # Swipe left
+        (0.75, 'open', (0.3, 0.5), (0.3, 0.5)),
+        (1.0, 'pinch', (0.3, 0.5), (0.5, 0.6)),    # Pinch and drag
+        (0.5, 'open', (0.5, 0.6), (0.5, 0.6)),
+        (1.0, 'two', (0.5, 0.7), (0.5, 0.4)),      # Scroll up
+        (0.5, 'open', (0.5, 0.4), (0.5, 0.4)),
+    ]
+    times, frames = [], []
+    t = 0.0
+    for seconds, pose, (x0, y0), (x1, y1) in segments:
+        shape = hand_pose(pose)
+        count = int(round(seconds * fps))
+        for k in range(count):
+            f = k / max(count - 1, 1)
+            frames.append(shape + (x0 + (x1 - x0) * f, y0 + (y1 - y0) * f, 0))
+            times.append(t)
+            t += 1.0 / fps
+    return np.array(times), np.array(frames, np.float32)
+
+
+class NaiveMotion:
+    """Keeps a plain list of recent frames and recomputes every feature from it"""
+
+    def __init__(self, window):
+        self.window = window
+        self.frames = []
+        self.times = []
+
+    def update(self, batch, timestamp):
+        self.frames.append(batch.points[0].copy())
+        self.times.append(timestamp)
+        del self.frames[:-self.window], self.times[:-self.window]
+        points = np.array(self.frames)
+        times = np.array(self.times)
+        palm = points[:, PALM, :2]
+        velocity = np.diff(palm, axis=0) / np.maximum(np.diff(times), 1e-6)[:, None]
+        displacement = palm[-1] - palm[0]
+        size = np.linalg.norm(points[:, PALM, :2] - points[:, WRIST, :2], axis=1)
+        pinch = np.linalg.norm(points[:, THUMB_TIP, :2] - points[:, INDEX_TIP, :2], axis=1) / size
+        return velocity, displacement, pinch
+
+
+def time_updates(make_update, times, batches, repeat):
+    """Best per-frame microseconds over `repeat` runs, each with a fresh update function"""
+    best = float('inf')
+    for _ in range(repeat):
+        update = make_update()
+        start = time.perf_counter()
+        for t, batch in zip(times, batches):
+            update(batch, t)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(times) * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per method, the best is reported")
+    parser.add_argument('--window', type=int, default=32, help="Frames of history per hand")
+    args = parser.parse_args()
+
+    times, frames = synthetic_session(args.fps)
+    batches = [HandBatch(points[None], ['Right']) for points in frames]
+
+    motion = MotionGestures(capacity=args.window)
+    events = []
+    for t, batch in zip(times, batches):
+        events.extend(motion.update(batch, t))
+
+    def static():
+        def update(batch, timestamp):
+            batch._fingers_folded = batch._fingers_extended = None  # Fresh frame, nothing cached
+            gestures.evaluate(batch)
+        return update
+
+    def static_and_motion():
+        # As in the live loops, motion reuses the finger features the predicates computed
+        motion = MotionGestures(capacity=args.window)
+
+        def update(batch, timestamp):
+            batch._fingers_folded = batch._fingers_extended = None
+            gestures.evaluate(batch)
+            motion.update(batch, timestamp)
+        return update
+
+    report = {
+        'frames': len(times),
+        'events': dict(Counter(f"{e.gesture}/{e.kind}" for e in events)),
+        'scroll_steps': sum(e.value for e in events if e.gesture == 'scroll' and e.kind == 'move'),
+        'static_predicates_us': time_updates(static, times, batches, args.repeat),
+        'static_plus_motion_us': time_updates(static_and_motion, times, batches, args.repeat),
+        'motion_us': time_updates(lambda: MotionGestures(capacity=args.window).update,
+                                  times, batches, args.repeat),
+        'naive_window_us': time_updates(lambda: NaiveMotion(args.window).update,
+                                        times, batches, args.repeat),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
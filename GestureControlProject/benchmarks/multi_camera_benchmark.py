@@ -0,0 +1,88 @@
+"""Track several recordings at once as if they were cameras, against the first one alone.
+
+Usage: python multi_camera_benchmark.py SESSION SESSION [SESSION ...]
+                                        [--pace fast|realtime] [--seconds N]
+
+SESSIONs are video files or image directories, e.g. the same desk filmed
+from two angles. Each run goes through MultiCameraTracker, one capture and
+one inference process per session. Reports the output frame rate (which
+should not drop as sessions are added, since each one brings its own
+processes), capture-to-fused latency, frames with hands, and how many
+fused hands every session supplied, in the order the sessions were
+given.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from frame_sources import PACE_FAST, PACE_REALTIME, open_source
+from multi_camera import MultiCameraTracker
+
+HANDS_OPTIONS = dict(max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+
+def run(sessions, pace, seconds):
+    sources = [open_source(session, pace=pace, loop=seconds > 0) for session in sessions]
+    tracker = MultiCameraTracker(sources, HANDS_OPTIONS, preview=False).start()
+    frames = with_hands = 0
+    supplied = [0] * len(sessions)
+    latencies = []
+    start = None
+    try:
+        while not tracker.finished:
+            if seconds > 0 and start is not None and time.perf_counter() - start > seconds:
+                break
+            tracked = tracker.read()
+            if tracked is None:
+                continue
+            if start is None:
+                # Rates are counted from the first frame, past starting the processes
+                start = time.perf_counter()
+                continue
+            latencies.append(time.perf_counter() - tracked.timestamp)
+            frames += 1
+            if tracked.batch is not None:
+                with_hands += 1
+                for hand in tracker.fusion.sources:
+                    supplied[hand.camera] += 1
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+    finally:
+        tracker.stop()
+    latencies = np.array(latencies) * 1000.0
+    report = {
+        'frames': frames,
+        'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+        'frames_with_hands': with_hands,
+        # By camera index, the same session may be given twice
+        'sessions': list(sessions),
+        'hands_supplied': supplied,
+    }
+    if latencies.size:
+        report['latency_ms_p50'] = round(float(np.percentile(latencies, 50)), 2)
+        report['latency_ms_p95'] = round(float(np.percentile(latencies, 95)), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sessions', nargs='+', help="Video files or image directories")
+    parser.add_argument('--pace', choices=[PACE_FAST, PACE_REALTIME], default=PACE_REALTIME)
+    parser.add_argument('--seconds', type=float, default=0,
+                        help="Loop the sessions and stop after this many seconds")
+    args = parser.parse_args()
+
+    report = {
+        'single': run(args.sessions[:1], args.pace, args.seconds),
+        'fused': run(args.sessions, args.pace, args.seconds),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
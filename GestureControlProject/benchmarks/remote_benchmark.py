@@ -0,0 +1,170 @@
+"""Send cursor positions and gesture events to an actuator over loopback.
+
+Usage: python remote_benchmark.py [--rate 120] [--seconds 2] [--delays 0 0.02]
+                                  [--stall 0.5] [--stall-rate 1000] [--send-buffer 4096]
+                                  [--transports tcp unix]
+
+A RemoteActuator streams cursor positions at --rate Hz, with a pinch drag
+and some scrolling in between, to an ActuatorServer whose Actuator logs
+into a RecordingBackend. --delays makes that backend take longer per
+cursor move, like a busy desktop, to show the latest-value coalescing and
+back-pressure: the cursor stays current instead of queueing up. Only the
+Actuator falls behind there, though, the server keeps reading; in the
+--stall case the server's event handler blocks for that many seconds at
+the pinch, so nothing is read, and positions come at --stall-rate Hz
+until the producer's socket (its SO_SNDBUF shrunk to --send-buffer
+bytes) fills up and sendall blocks. Positions
+then coalesce on both ends, and the last one sent must still be the last
+one applied. Reports bytes on the wire, capture-to-injection cursor
+latency, how many positions were applied or coalesced and whether every
+event arrived in order.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from actuator import Actuator
+from gesture_events import MOVE, PRESS, RELEASE, GestureEvent
+from input_backend import RecordingBackend
+from remote import ActuatorServer, RemoteActuator
+from window_context import FakeWindows
+
+
+class SlowBackend(RecordingBackend):
+    """RecordingBackend whose cursor moves take `delay` seconds"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def move_to(self, x, y, timestamp=None):
+        if self.delay:
+            time.sleep(self.delay)
+        super().move_to(x, y, timestamp)
+
+
+def script(rate, seconds):
+    """(time offset, cursor position or GestureEvent) pairs to send"""
+    steps = int(rate * seconds)
+    items = []
+    for i in range(steps):
+        t = i / rate
+        items.append((t, (960 + 800 * np.sin(t * 3), 540 + 400 * np.cos(t * 2))))
+        if i == steps // 4:
+            items.append((t, GestureEvent(PRESS, 'pinch', 'Right', 0.0, (0.5, 0.5))))
+        elif steps // 4 < i < steps // 2:
+            items.append((t, GestureEvent(MOVE, 'pinch', 'Right', 0.0, (0.5, 0.5))))
+        elif i == steps // 2:
+            items.append((t, GestureEvent(RELEASE, 'pinch', 'Right', 0.0, (0.5, 0.5))))
+        elif i % 10 == 0:
+            items.append((t, GestureEvent(MOVE, 'scroll', 'Left', 0.0, 1)))
+    return items
+
+
+def run(address, delay, rate, seconds, stall=0.0, send_buffer=None):
+    backend = SlowBackend(delay)
+    actuator = Actuator(backend, FakeWindows())
+    received = []
+
+    def on_event(event):
+        received.append(event)
+        if event.gesture == 'pinch':
+            if event.kind == PRESS:
+                time.sleep(stall)  # Holds up the server's reads
+                actuator.start_drag()
+            elif event.kind == RELEASE:
+                actuator.end_drag()
+        elif event.gesture == 'scroll':
+            actuator.scroll(event.value)
+
+    server = ActuatorServer(actuator, on_event, address).start()
+    remote = RemoteActuator(server.address, send_buffer=send_buffer)
+    cursors = scrolls = 0
+    last = None
+    try:
+        remote.start()
+        start = time.perf_counter()
+        for offset, item in script(rate, seconds):
+            wait = start + offset - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            now = time.perf_counter()
+            if isinstance(item, GestureEvent):
+                remote.send_event(item._replace(timestamp=now))
+                scrolls += item.gesture == 'scroll'
+            else:
+                remote.move_to(item[0], item[1], now)
+                cursors += 1
+                last = (int(item[0]), int(item[1]))
+        remote.stop()
+        # The server applies everything sent before END, then stops the actuator
+        deadline = time.perf_counter() + 5.0
+        while actuator.cursor is not None and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        remote.close()
+        server.stop()
+
+    moves = [event.args for event in backend.events if event.kind == 'move']
+    latencies = np.array(backend.latencies('move')) * 1000.0
+    kinds = [(event.kind, event.gesture) for event in received]
+    pinch = [kind for kind, gesture in kinds if gesture == 'pinch']
+    report = {
+        'cursor_positions': cursors,
+        'moves_applied': backend.count('move'),
+        'coalesced_by_producer': remote.coalesced,
+        'coalesced_by_server': server.cursor_coalesced,
+        'newest_position_applied': bool(moves) and moves[-1] == last,
+        'dropped_events': remote.dropped,
+        'bytes_sent': remote.bytes_sent,
+        'bytes_per_message': round(remote.bytes_sent / max(server.messages, 1), 1),
+        'pinch_in_order': bool(pinch) and pinch[0] == PRESS and pinch[-1] == RELEASE,
+        'scroll_steps': sum(event.value for event in received if event.gesture == 'scroll'),
+        'scroll_steps_sent': scrolls,
+        'buttons': [event.kind for event in backend.events if event.kind.startswith('mouse_')],
+    }
+    if latencies.size:
+        report['cursor_latency_ms_p50'] = round(float(np.percentile(latencies, 50)), 2)
+        report['cursor_latency_ms_p95'] = round(float(np.percentile(latencies, 95)), 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=120.0, help="Cursor positions per second")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--delays', type=float, nargs='+', default=[0.0, 0.02],
+                        help="Seconds the actuator's backend takes per cursor move")
+    parser.add_argument('--stall', type=float, default=0.5,
+                        help="Seconds the server stops reading at the pinch, 0 to skip that case")
+    parser.add_argument('--stall-rate', type=float, default=1000.0,
+                        help="Cursor positions per second in the stall case")
+    parser.add_argument('--send-buffer', type=int, default=4096,
+                        help="The producer's SO_SNDBUF in the stall case, bytes")
+    parser.add_argument('--transports', nargs='+', choices=['tcp', 'unix'],
+                        default=['tcp', 'unix'] if hasattr(socket, 'AF_UNIX') else ['tcp'])
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for transport in args.transports:
+            address = '127.0.0.1:0' if transport == 'tcp' else 'unix:' + os.path.join(directory, 'actuator.sock')
+            for delay in args.delays:
+                report[f'{transport}_delay_{delay}s'] = run(address, delay, args.rate, args.seconds)
+            if args.stall:
+                report[f'{transport}_stall_{args.stall}s'] = run(address, 0.0, args.stall_rate,
+                                                                 args.seconds, args.stall,
+                                                                 args.send_buffer)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
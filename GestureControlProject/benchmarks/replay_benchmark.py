@@ -0,0 +1,99 @@
+"""Push a recorded session through hand_tracker.py's tracking session.
+
+Usage: python replay_benchmark.py SESSION [--pace fast|realtime] [--loop-seconds N]
+                                  [--real-input] [--pipelined] [--headless]
+
+SESSION is a video file or a directory of images. Reports sustained FPS,
+capture-to-processed latency of every frame that went through the tracker,
+per-stage timings, and the injected input events (recorded, not injected,
+unless --real-input). The session runs from HandTrackerUI's start menu
+with a preview window; with --headless, or where there is no display or
+no Tk, it runs through HandTracker alone without either.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from frame_sources import PACE_FAST, PACE_REALTIME, open_source
+from hand_tracker import HandTracker, HandTrackerUI
+from input_backend import RecordingBackend
+from metrics import PipelineMetrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('session', help="Video file or image directory")
+    parser.add_argument('--pace', choices=[PACE_FAST, PACE_REALTIME], default=PACE_FAST)
+    parser.add_argument('--loop-seconds', type=float, default=0,
+                        help="Loop the session and stop after this many seconds")
+    parser.add_argument('--real-input', action='store_true',
+                        help="Really move the cursor instead of recording the events")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="Run capture and inference in separate processes")
+    parser.add_argument('--headless', action='store_true', help="Run without the preview window")
+    args = parser.parse_args()
+
+    source = open_source(args.session, pace=args.pace, loop=args.loop_seconds > 0)
+    recorder = None if args.real_input else RecordingBackend()
+    metrics = PipelineMetrics()
+    options = dict(source=source, input_backend=recorder, pipelined=args.pipelined,
+                   metrics=metrics)
+    app = None
+    if not args.headless:
+        try:
+            app = HandTrackerUI(**options)
+        except RuntimeError as e:
+            print(f"{e}, running headless", file=sys.stderr)
+    if app is None:
+        app = HandTracker(**options)
+        app.engine.headless = True
+    if args.loop_seconds > 0:
+        timer = threading.Timer(args.loop_seconds, app.engine.stop)
+        timer.daemon = True
+        timer.start()
+
+    start = time.perf_counter()
+    if isinstance(app, HandTrackerUI):
+        app.start_tracking()  # Returns once the session ran out or timed out
+        elapsed = time.perf_counter() - start
+        app.root.destroy()
+    else:
+        app.track()
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(app.engine.frame_latencies) * 1000.0
+    report = {
+        'session': args.session,
+        'pace': args.pace,
+        'pipelined': args.pipelined,
+        'headless': app.engine.headless,
+        'frames': app.engine.frames_processed,
+        'seconds': round(elapsed, 3),
+        'fps': round(app.engine.frames_processed / elapsed, 2) if elapsed else 0.0,
+    }
+    if latencies.size:
+        report.update({
+            'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2),
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+            'latency_ms_max': round(float(latencies.max()), 2),
+        })
+    if recorder is not None:
+        input_latencies = np.array(recorder.latencies('move')) * 1000.0
+        report['cursor_moves'] = recorder.count('move')
+        report['clicks'] = recorder.count('click')
+        if input_latencies.size:
+            report['input_latency_ms_p50'] = round(float(np.percentile(input_latencies, 50)), 2)
+            report['input_latency_ms_p95'] = round(float(np.percentile(input_latencies, 95)), 2)
+    report['stages'] = metrics.snapshot()['stages']
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
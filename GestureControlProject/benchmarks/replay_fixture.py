@@ -0,0 +1,120 @@
+"""Write the landmark recording and expected gesture events the suite's replay stage checks.
+
+Usage: python replay_fixture.py [--output-dir fixtures] [--fps 30]
+
+A synthetic session runs frame by frame through a GestureEngine the way a
+live session does: each frame's hands are appended to a landmark
+recording, then mapped to the cursor and run through both state machines.
+The session swipes, pinches and drags, scrolls (motion_benchmark.py's
+hand), then makes a fist, a thumbs up and a two-handed fist and open palm
+(classifier_benchmark.py's hand), with frames without hands between.
+Writes fixtures/session.glmk and fixtures/session_events.json, the events
+the live path produced. Only rerun it when the gesture recognizers change
+on purpose, and commit both files together.
+"""
+import argparse
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+import numpy as np
+
+from classifier_benchmark import NAMED, hand_shape
+from engine import GestureEngine
+from input_backend import RecordingBackend
+from landmark_recording import LandmarkRecorder
+from landmarks import HandBatch
+from motion_benchmark import synthetic_session
+from window_context import FakeWindows
+
+FIXTURE_DIR = os.path.join(HERE, 'fixtures')
+RECORDING = 'session.glmk'
+EVENTS = 'session_events.json'
+
+
+def event_record(event):
+    """JSON-ready [timestamp, kind, gesture, hand, value] of a GestureEvent"""
+    value = event.value
+    if isinstance(value, tuple):
+        value = [float(v) for v in value]
+    elif value is not None:
+        value = float(value)
+    return [float(event.timestamp), event.kind, event.gesture, event.hand, value]
+
+
+def posed_hand(pose, x, y, left=False, scale=0.12):
+    """(21, 3) landmarks of one of classifier_benchmark.py's named poses, wrist at (x, y)"""
+    hand = hand_shape(NAMED[pose])
+    if left:
+        hand[:, 0] = -hand[:, 0]
+    points = np.empty((21, 3), np.float32)
+    points[:, :2] = hand[:, :2] * scale + (x, y)
+    points[:, 2] = hand[:, 2] * scale
+    return points
+
+
+def session_frames(fps):
+    """(timestamp, HandBatch or None) of every frame of the session"""
+    times, frames = synthetic_session(fps)
+    batches = [HandBatch(points[None], ['Right']) for points in frames]
+    segments = [
+        # (seconds, [(pose, x, y, left), ...]), no hands for an empty list
+        (0.3, []),
+        (0.6, [('fist', 0.5, 0.7, False)]),
+        (0.4, [('open_palm', 0.5, 0.7, False)]),
+        (1.2, [('thumbs_up', 0.5, 0.7, False)]),
+        (0.3, []),
+        (0.8, [('fist', 0.35, 0.7, True), ('open_palm', 0.65, 0.7, False)]),
+        (0.3, []),
+    ]
+    for seconds, hands in segments:
+        for _ in range(int(round(seconds * fps))):
+            if hands:
+                points = np.stack([posed_hand(pose, x, y, left) for pose, x, y, left in hands])
+                batches.append(HandBatch(points, ['Left' if left else 'Right'
+                                                  for _, _, _, left in hands]))
+            else:
+                batches.append(None)
+    # Capture times are seconds of some monotonic clock, never zero-based
+    first = 1000.0
+    timestamps = [first + k / fps for k in range(len(batches))]
+    return list(zip(timestamps, batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output-dir', default=FIXTURE_DIR)
+    parser.add_argument('--fps', type=float, default=30.0)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, RECORDING)
+    if os.path.exists(path):
+        os.remove(path)  # The recorder appends
+
+    events = []
+    engine = GestureEngine({}, events.append, input_backend=RecordingBackend(),
+                           windows=FakeWindows())
+    actuator = engine.actuator.start()
+    recorder = LandmarkRecorder(path)
+    try:
+        # What GestureEngine._session does with every tracked frame
+        cursor_mapper = engine._begin(actuator)
+        for seq, (timestamp, batch) in enumerate(session_frames(args.fps)):
+            recorder.record(timestamp, seq, batch)
+            engine._track(batch, timestamp, cursor_mapper, actuator)
+    finally:
+        recorder.close()
+        engine.close()
+
+    with open(os.path.join(args.output_dir, EVENTS), 'w') as f:
+        json.dump([event_record(event) for event in events], f, indent=1)
+        f.write('\n')
+    print(json.dumps({'frames': recorder.frames, 'events': len(events)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Compare full-frame and region-of-interest hand inference on a recorded session.
+
+Usage: python roi_benchmark.py SESSION [--frames 300] [--size 256] [--padding 0.4]
+
+SESSION is a video file or a directory of images with a hand in view.
+The frames are loaded once, then every mode runs the same preprocessing
+and MediaPipe Hands (fresh graph per mode) over them. Reports throughput,
+preprocess and inference time per frame, how often a hand was found, and
+for ROI modes how far the index fingertip lands from the full-frame
+result, in pixels. ROI modes use a static-image-mode graph, like the
+engine does.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import mediapipe as mp
+import numpy as np
+
+from frame_sources import PACE_FAST, open_source
+from landmarks import INDEX_TIP, LandmarkConverter
+from pipeline import Preprocessor
+from roi import HandRoi, roi_hands_options
+
+
+def load_frames(session, limit):
+    source = open_source(session, pace=PACE_FAST)
+    if not source.open():
+        raise SystemExit(f"Could not open {session}")
+    frames = []
+    try:
+        while len(frames) < limit:
+            ret, frame = source.read()
+            if not ret:
+                if source.exhausted:
+                    break
+                continue
+            frames.append(frame.copy())
+    finally:
+        source.release()
+    return frames
+
+
+def run(frames, roi, max_hands):
+    converter = LandmarkConverter(max_hands)
+    preprocessor = Preprocessor(roi, preview=False)
+    tips = np.full((len(frames), 2), np.nan)
+    preprocess = np.empty(len(frames))
+    inference = np.empty(len(frames))
+    options = dict(max_num_hands=max_hands, min_detection_confidence=0.5,
+                   min_tracking_confidence=0.5)
+    if roi is not None:
+        options = roi_hands_options(options)  # As the engine runs ROI sessions
+    with mp.solutions.hands.Hands(**options) as hands:
+        start = time.perf_counter()
+        for i, captured in enumerate(frames):
+            t0 = time.perf_counter()
+            rgb = preprocessor.prepare(captured)
+            t1 = time.perf_counter()
+            batch = preprocessor.finish(converter.convert(hands.process(rgb)), captured.shape)
+            t2 = time.perf_counter()
+            preprocess[i] = t1 - t0
+            inference[i] = t2 - t1
+            if batch is not None:
+                tips[i] = batch.points[0, INDEX_TIP, :2] * (captured.shape[1], captured.shape[0])
+        elapsed = time.perf_counter() - start
+    report = {
+        'fps': round(len(frames) / elapsed, 1),
+        'preprocess_ms': round(float(np.median(preprocess)) * 1000, 3),
+        'inference_ms': round(float(np.median(inference)) * 1000, 3),
+        'inference_p95_ms': round(float(np.percentile(inference, 95)) * 1000, 3),
+        'detection_rate': round(float(np.mean(~np.isnan(tips[:, 0]))), 3),
+    }
+    return report, tips
+
+
+def deviation(reference, tips):
+    """Index tip distance from the full-frame result where both found a hand, in pixels"""
+    both = ~np.isnan(reference[:, 0]) & ~np.isnan(tips[:, 0])
+    if not both.any():
+        return {}
+    distance = np.linalg.norm(tips[both] - reference[both], axis=1)
+    return {
+        'tip_deviation_px': round(float(np.median(distance)), 2),
+        'tip_deviation_px_p95': round(float(np.percentile(distance, 95)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('session', help="Video file or image directory")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--size', type=int, default=256, help="ROI crop side fed to MediaPipe")
+    parser.add_argument('--padding', type=float, default=0.4)
+    parser.add_argument('--max-hands', type=int, default=1)
+    args = parser.parse_args()
+
+    frames = load_frames(args.session, args.frames)
+    if not frames:
+        raise SystemExit("No frames read")
+
+    report = {'frames': len(frames), 'resolution': f"{frames[0].shape[1]}x{frames[0].shape[0]}"}
+    report['full_frame'], reference = run(frames, None, args.max_hands)
+    modes = {
+        'roi': HandRoi(padding=args.padding, size=None),
+        f'roi_{args.size}': HandRoi(padding=args.padding, size=args.size),
+    }
+    for name, roi in modes.items():
+        report[name], tips = run(frames, roi, args.max_hands)
+        report[name].update(deviation(reference, tips))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,522 @@
+"""Run every pipeline stage offline and check the results against regression thresholds.
+
+Usage: python suite.py [--stages predicates features ...] [--video PATH]
+                       [--output results.json] [--baseline results.json]
+                       [--tolerance 0.5] [--thresholds thresholds.json]
+
+Needs no camera, display or GPU: hands come from the synthetic landmark
+generator of classifier_benchmark.py, frames are random or drawn, and
+actions go to a RecordingBackend. Stages:
+
+  predicates  is_fist / is_thumbs_up / the whole registry on two-hand
+              batches, plus how often the rules are right on upright hands
+  features    finger features, classifier normalization, the motion
+              ring buffer and both event state machines, per frame
+  preprocess  Preprocessor.prepare + finish + mirror at several resolutions
+  cursor      CursorMapper cost, jitter and tracking error on the
+              trajectory of cursor_filter_benchmark.py; the thresholds
+              are about five standard deviations above the mean over 40
+              noise seeds
+  dispatch    Actuator cursor moves and queued actions into a RecordingBackend,
+              and that a drag's release survives a full action queue
+  remote      remote_benchmark.py's stall case over loopback TCP: the
+              ActuatorServer stops reading mid-session while positions keep
+              coming, so the RemoteActuator's socket fills; positions must
+              coalesce, the newest one still land and no event get lost
+  governor    PerformanceGovernor fed synthetic frame costs: frames per
+              step down and up its level ladder, changes while the cost
+              sits between its thresholds or the levels straddle the
+              budget, frames processed while no hand is seen
+  replay      the recorded session in fixtures/ (see replay_fixture.py)
+              replayed by GestureEngine.replay() and replay_gestures():
+              events that differ from the ones the live path produced
+  roi         MediaPipe on HandRoi crops of latency_harness.py's moving
+              hand, rescans included, against the full frame: how often
+              the hand is found and how far its index tip lands
+  engine      startup costs of engine_benchmark.py: importing the engine
+              module in a fresh interpreter, on its own and as a share of
+              importing MediaPipe and OpenCV, warm-up, and the first frame
+              of a warmed-up engine and of restarted sessions on it
+  end_to_end  GestureEngine tracking the drawn, moving hand of
+              latency_harness.py (or its --write clip given as --video),
+              paced like a live camera: cursor moves, motion-to-cursor
+              latency and tracking error
+
+Every metric named in --thresholds (thresholds.json next to this script by
+default) is checked against its "max" or "min", and against --baseline, a
+--output of an earlier run, by --tolerance relative to the old value.
+Only compare runs from the same machine; on shared CI runners the
+microsecond timings alone vary by half between runs, hence the default.
+Times are per call unless the name says otherwise. The report is printed
+and written to --output as JSON; the exit status is 1 if any check failed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from itertools import zip_longest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+import cv2
+import numpy as np
+
+from classifier_benchmark import NAMED, sample
+from cursor_filter_benchmark import SCREEN, run as run_cursor, synthetic_trajectory
+
+STAGES = ['predicates', 'features', 'preprocess', 'cursor', 'dispatch', 'remote', 'governor',
+          'replay', 'roi', 'engine', 'end_to_end']
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+HANDS_OPTIONS = dict(max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+
+def per_call_us(fn, args, rounds=5):
+    """Microseconds per fn(*item) over the items of `args`, best of `rounds`"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in args:
+            fn(*item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(args) * 1e6, 2)
+
+
+def hands(pose, count, rng, rotation=15.0, noise=0.002):
+    """(count, 21, 3) landmarks and handedness of one named pose, slightly turned"""
+    return sample(NAMED[pose], count, rotation, noise, rng)
+
+
+def pairs(points, handedness):
+    """Two-hand (points, handedness) frames from single hands"""
+    return [(points[i:i + 2], handedness[i:i + 2]) for i in range(0, len(points) - 1, 2)]
+
+
+def bench_predicates(rng):
+    from landmarks import HandBatch, gestures, is_fist, is_thumbs_up
+
+    poses = {pose: hands(pose, 400, rng) for pose in NAMED}
+    frames = pairs(*poses['open_palm'])
+    report = {
+        # A new batch per call, so the shared finger features are computed too
+        'is_fist_us': per_call_us(lambda p, h: is_fist(HandBatch(p, h)), frames),
+        'is_thumbs_up_us': per_call_us(lambda p, h: is_thumbs_up(HandBatch(p, h)), frames),
+        'registry_us': per_call_us(lambda p, h: gestures.evaluate(HandBatch(p, h)), frames),
+    }
+    for name, predicate in [('fist', is_fist), ('thumbs_up', is_thumbs_up)]:
+        hits = {pose: float(predicate(HandBatch(*poses[pose])).mean()) for pose in NAMED}
+        report[f'{name}_recall'] = round(hits[name], 3)
+        report[f'{name}_false_positive'] = round(max(rate for pose, rate in hits.items()
+                                                     if pose != name), 3)
+    return report
+
+
+def bench_features(rng):
+    from gesture_classifier import normalize
+    from gesture_events import GestureStateMachine
+    from landmarks import HandBatch
+    from motion import LandmarkHistory, MotionGestures
+
+    # Open palm to fist and back, so the state machines have events to emit
+    points = np.concatenate([hands(pose, 60, rng)[0] for pose in ['open_palm', 'fist'] * 5])
+    handedness = ['Right', 'Left'] * (len(points) // 2)
+    frames = pairs(points, handedness)
+    times = [(i / 30.0,) for i in range(len(frames))]
+
+    def fingers(p, h):
+        batch = HandBatch(p, h)
+        return batch.fingers_folded, batch.fingers_extended
+
+    history = LandmarkHistory()
+    machine = GestureStateMachine()
+    motion = MotionGestures()
+    batches = [HandBatch(p, h) for p, h in frames]
+    return {
+        'fingers_us': per_call_us(fingers, frames),
+        'normalize_us': per_call_us(normalize, frames),
+        'history_push_us': per_call_us(history.push,
+                                       [(t, p[0]) for (t,), (p, _) in zip(times, frames)]),
+        'state_machine_us': per_call_us(machine.update,
+                                        [(b, t) for b, (t,) in zip(batches, times)], rounds=1),
+        'motion_us': per_call_us(motion.update,
+                                 [(b, t) for b, (t,) in zip(batches, times)], rounds=1),
+    }
+
+
+def bench_preprocess(rng):
+    from landmarks import HandBatch
+    from pipeline import Preprocessor
+
+    points = hands('open_palm', 2, rng)[0]
+    report = {}
+    for width, height in RESOLUTIONS:
+        frames = [rng.integers(0, 256, (height, width, 3), np.uint8) for _ in range(4)]
+        preprocessor = Preprocessor(preview=True)
+
+        def frame(image):
+            preprocessor.prepare(image)
+            preprocessor.finish(HandBatch(points.copy(), ['Left', 'Right']), image.shape)
+            preprocessor.mirror(image)
+
+        report[f'{width}x{height}_frame_us'] = per_call_us(frame, [(f,) for f in frames * 25])
+    return report
+
+
+def bench_cursor(rng):
+    from cursor_filter import CursorMapper
+
+    t, truth, moving = synthetic_trajectory(30.0)
+    noisy = truth + rng.normal(0, 0.003, truth.shape)
+    report = {}
+    for name, mapper in [('one_euro', CursorMapper(SCREEN)),
+                         ('one_euro_predict', CursorMapper(SCREEN, predict=True))]:
+        result = run_cursor(mapper, t, noisy, truth, moving, 0.05)
+        report[f'{name}_map_us'] = result['update_us']
+        report[f'{name}_jitter_px'] = result['jitter_px']
+        report[f'{name}_tracking_rmse_px'] = result['tracking_rmse_px']
+    return report
+
+
+def bench_dispatch(rng):
+    from actuator import Actuator
+    from input_backend import RecordingBackend
+    from window_context import FakeWindows
+
+    backend = RecordingBackend(SCREEN)
+    actuator = Actuator(backend, FakeWindows()).start()
+    try:
+        # Paced like a fast camera, back to back moves would just coalesce
+        points = rng.uniform(0, 1, (500, 2)) * SCREEN
+        calls = 0.0
+        for x, y in points:
+            start = time.perf_counter()
+            actuator.move_to(x, y, start)
+            calls += time.perf_counter() - start
+            time.sleep(0.002)
+        move_us = calls / len(points) * 1e6
+        time.sleep(0.05)  # Let the cursor thread apply the last one
+        moves = np.array(backend.latencies('move')) * 1000.0
+
+        done = threading.Event()
+
+        def click(ctx):
+            backend.click()
+            done.set()
+
+        action_ms = []
+        for _ in range(200):
+            done.clear()
+            submitted = time.perf_counter()
+            actuator.submit('click', click)
+            done.wait(1.0)
+            action_ms.append((backend.events[-1].timestamp - submitted) * 1000.0)
+    finally:
+        actuator.stop()
+    return dict(drag_check(), **{
+        'move_call_us': round(move_us, 2),
+        'moves_applied': len(moves),
+        'move_latency_ms_p50': round(float(np.percentile(moves, 50)), 3),
+        'action_latency_ms_p50': round(float(np.percentile(action_ms, 50)), 3),
+        'action_latency_ms_p95': round(float(np.percentile(action_ms, 95)), 3),
+    })
+
+
+def drag_check():
+    """Drags whose release waits behind a full action queue, then runs or is cut off by stop()"""
+    from actuator import Actuator
+    from input_backend import RecordingBackend
+    from window_context import FakeWindows
+
+    held = 0
+    for finish in (True, False):
+        backend = RecordingBackend(SCREEN)
+        actuator = Actuator(backend, FakeWindows()).start()
+        gate = threading.Event()
+        try:
+            actuator.start_drag()
+            actuator.wait_idle(2.0)  # The button is down
+            actuator.submit('block', lambda ctx: gate.wait(2.0))
+            for i in range(2 * actuator.actions.maxsize):
+                actuator.submit(f'filler_{i}', lambda ctx: None)
+            actuator.end_drag()
+            for i in range(2 * actuator.actions.maxsize):
+                actuator.submit(f'more_{i}', lambda ctx: None)
+            if finish:
+                gate.set()
+                actuator.wait_idle(2.0)
+        finally:
+            gate.set()
+            actuator.stop()
+        held += backend.count('mouse_down') - backend.count('mouse_up')
+    return {'drag_buttons_held': held}
+
+
+def bench_remote(rng, rate=1000.0, seconds=1.0, stall=0.3):
+    from remote_benchmark import run as run_remote
+
+    report = run_remote('127.0.0.1:0', 0.0, rate, seconds, stall, send_buffer=4096)
+    return {
+        'coalesced_by_producer': report['coalesced_by_producer'],
+        'newest_position_applied': int(report['newest_position_applied']),
+        'pinch_in_order': int(report['pinch_in_order']),
+        'scroll_steps_lost': report['scroll_steps_sent'] - report['scroll_steps'],
+        'dropped_events': report['dropped_events'],
+    }
+
+
+def bench_governor(rng, fps=30.0):
+    from governor import PerformanceGovernor
+
+    budget = 1.0 / fps
+
+    def drive(governor, cost, frames, start=0):
+        """Feed `frames` frames, each processed one costing cost(level index) seconds
+        with 5% noise; returns the frame numbers the level changed at"""
+        changes = []
+        for k in range(start, start + frames):
+            timestamp = k / fps
+            if not governor.should_process(timestamp):
+                continue
+            seconds = cost(governor.index) * (1.0 + rng.normal(0, 0.05))
+            if governor.observe(seconds, True, timestamp):
+                changes.append(k)
+        return changes
+
+    # Four times over budget, over it even when skipping frames: down the whole
+    # ladder, then far under it: back up
+    governor = PerformanceGovernor(budget)
+    down = drive(governor, lambda index: 4 * budget, 1000)
+    bottom = governor.index
+    up = drive(governor, lambda index: 0.2 * budget, 3000, start=1000)
+    top = governor.index
+    # Between the fast and slow thresholds
+    band = drive(PerformanceGovernor(budget), lambda index: 0.8 * budget, 1000)
+    # Level 2 over budget, level 3 between the thresholds: should settle on 3
+    costs = [1.6, 1.4, 1.15, 0.8, 0.6, 0.5, 0.4]
+    settled = PerformanceGovernor(budget)
+    straddle = drive(settled, lambda index: costs[index] * budget, 3000)
+    # No hand after the first frame: only one frame every idle_interval once idle
+    governor = PerformanceGovernor(budget)
+    processed = []
+    for k in range(int(10 * fps)):
+        timestamp = k / fps
+        if governor.should_process(timestamp):
+            governor.observe(budget, k == 0, timestamp)
+            processed.append(timestamp)
+    idle_from = governor.idle_after + 1.0
+    idle_processed = sum(1 for timestamp in processed if timestamp >= idle_from)
+    return {
+        'levels_descended': bottom,
+        'frames_per_step_down': round(float(np.diff([0] + down).mean()), 1),
+        'levels_climbed': bottom - top,
+        'frames_per_step_up': round(float(np.diff([1000] + up).mean()), 1) if up else 0.0,
+        'changes_in_band': len(band),
+        'straddle_level': settled.index,
+        'straddle_changes_after_settling': sum(1 for k in straddle if k >= 500),
+        'idle_processed_fps': round(idle_processed / (10.0 - idle_from), 2),
+    }
+
+
+def mismatches(events, expected):
+    """Positions at which two event lists differ, counting missing and extra events"""
+    return sum(1 for a, b in zip_longest(events, expected) if a != b)
+
+
+def bench_replay(rng):
+    from engine import GestureEngine
+    from input_backend import RecordingBackend
+    from landmark_recording import LandmarkRecording, replay_gestures
+    from replay_fixture import EVENTS, FIXTURE_DIR, RECORDING, event_record
+    from window_context import FakeWindows
+
+    recording = LandmarkRecording(os.path.join(FIXTURE_DIR, RECORDING))
+    with open(os.path.join(FIXTURE_DIR, EVENTS)) as f:
+        expected = [tuple(event) for event in json.load(f)]
+
+    def normalized(events):
+        # Through JSON like the expected list, so tuples and lists compare equal
+        return [tuple(json.loads(json.dumps(event_record(event)))) for event in events]
+
+    events = []
+    engine = GestureEngine({}, events.append, input_backend=RecordingBackend(SCREEN),
+                           windows=FakeWindows())
+    start = time.perf_counter()
+    try:
+        frames = engine.replay(recording)
+    finally:
+        elapsed = time.perf_counter() - start
+        engine.close()
+    session = normalized(events)
+    offline = normalized(replay_gestures(recording))
+    report = {
+        'frames': frames,
+        'expected_events': len(expected),
+        'events': len(session),
+        'mismatches': mismatches(session, expected),
+        'offline_mismatches': mismatches(offline, expected),
+        'frames_per_second': round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    for i, (got, want) in enumerate(zip_longest(session, expected)):
+        if got != want:
+            report['first_mismatch'] = {'index': i, 'event': got, 'expected': want}
+            break
+    return report
+
+
+def bench_roi(rng, frames=150, fps=30.0):
+    from latency_harness import FRAME_SIZE, HandPainter, render
+    from roi import HandRoi
+    from roi_benchmark import deviation, run as run_roi
+
+    painter = HandPainter()
+    images = []
+    for index in range(frames):
+        image = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), np.uint8)
+        render(image, index, fps, painter)
+        images.append(image)
+    full, reference = run_roi(images, None, 1)
+    roi, tips = run_roi(images, HandRoi(), 1)
+    report = {
+        'full_frame_detection_rate': full['detection_rate'],
+        'full_frame_inference_ms': full['inference_ms'],
+        'detection_rate': roi['detection_rate'],
+        'inference_ms': roi['inference_ms'],
+    }
+    report.update(deviation(reference, tips))
+    return report
+
+
+def bench_engine(rng, frames=10, restarts=3):
+    from engine_benchmark import import_seconds, make_engine, make_source
+
+    engine_import = import_seconds('import engine')
+    heavy_import = import_seconds('import cv2, mediapipe')
+    engine = make_engine()
+    try:
+        start = time.perf_counter()
+        engine.warm_up().wait_ready()
+        warm_up = time.perf_counter() - start
+        engine.run(make_source(None, frames))
+        first_frame = engine.first_frame_seconds
+        restarted = []
+        for _ in range(restarts):
+            engine.run(make_source(None, frames))
+            restarted.append(engine.first_frame_seconds)
+    finally:
+        engine.close()
+    return {
+        'import_engine_s': round(engine_import, 3),
+        'import_engine_share': round(engine_import / heavy_import, 3),
+        'warm_up_s': round(warm_up, 3),
+        'first_frame_s': round(first_frame, 3),
+        'restart_first_frame_s_max': round(max(restarted), 3),
+    }
+
+
+def bench_end_to_end(rng, video=None, seconds=5.0, fps=30.0, warmup=1.0):
+    from engine import GestureEngine
+    from input_backend import RecordingBackend
+    from latency_harness import EncodedClip, analyse
+    from window_context import FakeWindows
+
+    backend = RecordingBackend(SCREEN)
+    engine = GestureEngine(HANDS_OPTIONS, input_backend=backend, windows=FakeWindows())
+    engine.headless = True
+    engine.wait_ready(timeout=None)  # Model loading is engine_benchmark.py's business
+    clip = EncodedClip(fps, int(seconds * fps), video)
+    start = time.perf_counter()
+    try:
+        engine.run(clip)
+    finally:
+        # Counted from the first frame, past the session's setup
+        elapsed = time.perf_counter() - start - (engine.first_frame_seconds or 0.0)
+        engine.close()
+    # Motion-to-cursor latency and tracking error, see latency_harness.py
+    report = analyse(clip, backend, warmup)
+    report['frames'] = engine.frames_processed
+    report['fps'] = round((engine.frames_processed - 1) / elapsed, 2) if elapsed > 0 else 0.0
+    return report
+
+
+def check(results, thresholds, baseline, tolerance):
+    """One entry per thresholded metric: its value, limits and whether it passed"""
+    checks = []
+    for metric, limits in thresholds.items():
+        stage, name = metric.split('.', 1)
+        value = results.get(stage, {}).get(name)
+        if value is None:
+            continue  # Stage not run
+        entry = {'metric': metric, 'value': value, 'ok': True}
+        if 'max' in limits:
+            entry['max'] = limits['max']
+            entry['ok'] &= value <= limits['max']
+        if 'min' in limits:
+            entry['min'] = limits['min']
+            entry['ok'] &= value >= limits['min']
+        old = baseline.get(stage, {}).get(name)
+        if old is not None:
+            entry['baseline'] = old
+            # Rates and scores regress downwards, times and errors upwards
+            if 'min' in limits:
+                entry['ok'] &= value >= old * (1.0 - tolerance)
+            else:
+                entry['ok'] &= value <= old * (1.0 + tolerance)
+        entry['ok'] = bool(entry['ok'])
+        checks.append(entry)
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--video', help="Clip saved by latency_harness.py --write for the end_to_end stage")
+    parser.add_argument('--output', help="Write the JSON report here")
+    parser.add_argument('--baseline', help="JSON report of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Allowed relative regression against --baseline")
+    parser.add_argument('--thresholds', default=os.path.join(HERE, 'thresholds.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.thresholds) as f:
+        thresholds = json.load(f)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    for stage in args.stages:
+        rng = np.random.default_rng(args.seed)
+        if stage == 'end_to_end':
+            results[stage] = bench_end_to_end(rng, args.video)
+        else:
+            results[stage] = globals()['bench_' + stage](rng)
+
+    checks = check(results, thresholds, baseline, args.tolerance)
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+        },
+        'results': results,
+        'checks': checks,
+        'passed': all(entry['ok'] for entry in checks),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
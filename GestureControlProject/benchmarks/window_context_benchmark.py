@@ -0,0 +1,66 @@
+"""Time resolving a gesture's app action, uncached vs. through WindowContext.
+
+Usage: python window_context_benchmark.py [--windows 200] [--resolves 10000]
+
+Uses the FakeWindows platform with one YouTube window behind many others
+and an unrelated window in front, the case where the old handler
+enumerated every window on each thumbs up. "uncached" asks the platform
+for the foreground title and scans all windows every time, like the old
+handler; "cached" resolves through the compiled rules and the window cache.
+Reports microseconds per resolve and platform queries per resolve.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from app_actions import CONFIG_DIR, AppActions
+from window_context import FakeWindows, WindowContext
+
+
+def uncached(platform):
+    title = platform.title(platform.foreground()).lower()
+    if "youtube" in title or "notepad" in title or "save as" in title:
+        return title
+    for handle, title in platform.windows():
+        if "youtube" in platform.title(handle).lower():
+            return handle
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=200)
+    parser.add_argument('--resolves', type=int, default=10000)
+    args = parser.parse_args()
+
+    platform = FakeWindows()
+    for i in range(args.windows):
+        platform.open(f"Document {i} - Some Editor", focus=False)
+    platform.open("Funny cats - YouTube - Mozilla Firefox", focus=False)
+    platform.open("Inbox - Mail")
+    actions = AppActions.load(os.path.join(CONFIG_DIR, 'gesture_control_actions.json'))
+    windows = WindowContext(platform).start()
+
+    report = {}
+    for name, resolve in (('uncached', lambda: uncached(platform)),
+                          ('cached', lambda: actions.resolve('thumbs_up', windows))):
+        calls = platform.calls
+        start = time.perf_counter()
+        for _ in range(args.resolves):
+            result = resolve()
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            'resolve_us': round(elapsed / args.resolves * 1e6, 3),
+            'platform_calls_per_resolve': round((platform.calls - calls) / args.resolves, 2),
+            'found': result is not None,
+        }
+    windows.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
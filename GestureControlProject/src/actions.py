@@ -0,0 +1,172 @@
+import threading
+import traceback
+from collections import deque
+
+
+class ActionContext:
+    """Handed to a running action so it can wait without blocking anyone else"""
+
+    def __init__(self, key):
+        self.key = key
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def sleep(self, seconds):
+        """Wait up to `seconds`, returns False if the action was cancelled meanwhile"""
+        return not self._cancelled.wait(seconds)
+
+
+class ActionExecutor:
+    """Runs gesture actions on a worker thread so the vision loop never waits.
+
+    Actions are callables taking an ActionContext and are queued under a key
+    (e.g. 'click'). While an action with the same key is queued or running a
+    new one is coalesced: dropped by default, or replacing the queued one
+    with replace=True. When the queue is full the oldest queued action is
+    discarded, since a stale gesture is worth less than a fresh one, unless
+    it was submitted with keep=True (one half of a press/release pair).
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = None  # ActionContext of the action being executed
+        self._thread = None
+        self._stopped = True
+        self.dropped = 0
+
+    def start(self):
+        """Start the worker thread"""
+        with self._cond:
+            if not self._stopped:
+                return self
+            self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, key, action, replace=False, keep=False):
+        """Queue an action, returns False if it was coalesced away"""
+        with self._cond:
+            if self._stopped:
+                return False
+            for i, (queued_key, _, queued_keep) in enumerate(self._queue):
+                if queued_key == key:
+                    if not replace:
+                        self.dropped += 1
+                        return False
+                    self._queue[i] = (key, action, keep or queued_keep)
+                    return True
+            if self._running is not None and self._running.key == key and not replace:
+                self.dropped += 1
+                return False
+            if len(self._queue) >= self.maxsize:
+                # Kept actions stay, the queue only grows past maxsize if all of them are
+                for i, (_, _, queued_keep) in enumerate(self._queue):
+                    if not queued_keep:
+                        del self._queue[i]
+                        self.dropped += 1
+                        break
+            self._queue.append((key, action, keep))
+            self._cond.notify()
+            return True
+
+    def cancel(self, key):
+        """Drop queued actions for `key` and cancel the running one"""
+        with self._cond:
+            self._queue = deque(item for item in self._queue if item[0] != key)
+            if self._running is not None and self._running.key == key:
+                self._running.cancel()
+
+    def is_busy(self, key):
+        """True while an action for `key` is queued or running"""
+        with self._cond:
+            return ((self._running is not None and self._running.key == key)
+                    or any(item[0] == key for item in self._queue))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._queue)
+                if self._stopped:
+                    return
+                key, action, _ = self._queue.popleft()
+                context = self._running = ActionContext(key)
+            try:
+                action(context)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """Block until nothing is queued or running"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._stopped or (not self._queue and self._running is None),
+                timeout)
+
+    def stop(self):
+        """Cancel everything and stop the worker thread"""
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            if self._running is not None:
+                self._running.cancel()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+
+class Macro:
+    """Multi-step action that pauses between triggers.
+
+    `steps` is a generator function taking an ActionContext. Each `yield`
+    ends the current trigger; the next trigger resumes the macro right
+    after it and sends in the new context:
+
+        def save_flow(ctx):
+            open_dialog()
+            ctx = yield   # wait for the confirming gesture
+            confirm()
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self._generator = None
+
+    @property
+    def active(self):
+        """True while the macro is waiting for its next trigger"""
+        return self._generator is not None
+
+    def __call__(self, context):
+        try:
+            if self._generator is None:
+                self._generator = self.steps(context)
+                next(self._generator)
+            else:
+                self._generator.send(context)
+        except StopIteration:
+            self._generator = None
+        except BaseException:
+            self.reset()
+            raise
+        if context.cancelled:
+            self.reset()
+
+    def reset(self):
+        """Abandon a half-finished run"""
+        if self._generator is not None:
+            self._generator.close()
+            self._generator = None
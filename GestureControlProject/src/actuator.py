@@ -0,0 +1,130 @@
+"""The side effects of gestures: cursor moves, clicks, keys and per-app actions.
+
+An Actuator owns the input backend, the action thread, the foreground
+window cache and the configured app actions. GestureEngine drives one in
+the same process; remote.py puts one on another machine (or process) and
+feeds it over a socket, so the vision side never touches the desktop.
+"""
+import threading
+
+from actions import ActionExecutor
+from input_backend import CoalescingCursor, create_backend
+from metrics import PipelineMetrics
+from window_context import WindowContext
+
+
+class Actuator:
+    """Applies cursor positions and queues gesture actions.
+
+    Everything but move_to() runs on the action thread; move_to() only
+    hands the newest position to a CoalescingCursor.
+    """
+
+    def __init__(self, input_backend=None, windows=None, app_actions=None, metrics=None):
+        self.input = input_backend  # Created by prepare() unless passed in
+        # Cached foreground window (a FakeWindows platform in tests) and per-app rules
+        self.windows = WindowContext(windows)
+        self.app_actions = app_actions  # AppActions run by app_action()
+        self.macros = {}  # Macros the app actions can name
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        # Gesture actions run on their own thread so tracking never waits on them
+        self.actions = ActionExecutor()
+        self.cursor = None
+        self.dragging = False      # A drag was started and its end not submitted yet
+        self._button_down = False  # What the backend was last told, set on the action thread
+        self._scroll_lock = threading.Lock()
+        self._scroll_pending = 0  # Wheel clicks not handed to the backend yet
+
+    def prepare(self):
+        """Create the input backend, this imports pyautogui or the win32 modules"""
+        if self.input is None:
+            self.input = create_backend()
+        return self
+
+    def screen_size(self):
+        return self.prepare().input.screen_size()
+
+    def start(self):
+        self.prepare()
+        self._scroll_pending = 0
+        self.actions.start()
+        self.windows.start()
+        self.cursor = CoalescingCursor(self.input, self.metrics)
+        return self
+
+    def stop(self):
+        self.actions.stop()
+        if self._button_down:
+            # Never leave the button held, also when the release was queued but never ran
+            self.input.mouse_up()
+            self._button_down = False
+        self.dragging = False
+        self.windows.stop()
+        if self.cursor is not None:
+            self.cursor.stop()
+            self.cursor = None
+
+    def close(self):
+        if self.input is not None:
+            self.input.close()
+
+    @property
+    def cursor_latency(self):
+        """Capture-to-actuation seconds of the last cursor move, None before the first"""
+        return self.cursor.latency if self.cursor is not None else None
+
+    def wait_idle(self, timeout=None):
+        """Wait until every submitted action ran and the cursor caught up, False on timeout"""
+        if not self.actions.wait_idle(timeout):
+            return False
+        return self.cursor is None or self.cursor.wait_idle(timeout)
+
+    def move_to(self, x, y, timestamp=None):
+        """Move the cursor to screen pixel (x, y), for a frame captured at `timestamp`"""
+        self.cursor.move_to(x, y, timestamp)
+
+    def submit(self, name, action):
+        """Queue action(ctx), see actions.py"""
+        return self.actions.submit(name, action)
+
+    def start_drag(self):
+        """Hold the button down, the cursor keeps following the hand"""
+        if self.actions.submit('drag_start', self._mouse_down, keep=True):
+            self.dragging = True
+
+    def end_drag(self):
+        """Release the button start_drag() pressed, if it did"""
+        if not self.dragging:
+            return
+        if self.actions.submit('drag_end', self._mouse_up, keep=True):
+            self.dragging = False
+
+    def _mouse_down(self, ctx):
+        self.input.mouse_down()
+        self._button_down = True
+
+    def _mouse_up(self, ctx):
+        self.input.mouse_up()
+        self._button_down = False
+
+    def scroll(self, clicks):
+        """Scroll the wheel by `clicks`, positive is up.
+
+        Clicks add up while a scroll is queued or running, the next one
+        applies them all at once, so none get lost.
+        """
+        with self._scroll_lock:
+            self._scroll_pending += clicks
+        self.actions.submit('scroll', self._apply_scroll, replace=True)
+
+    def _apply_scroll(self, ctx):
+        with self._scroll_lock:
+            clicks, self._scroll_pending = self._scroll_pending, 0
+        if clicks:
+            self.input.scroll(clicks)
+
+    def app_action(self, gesture):
+        """Run the configured rule for `gesture` in the active window"""
+        def run(ctx):
+            self.app_actions.run(gesture, self.windows, self.input, ctx, self.macros)
+        self.actions.submit(gesture, run)
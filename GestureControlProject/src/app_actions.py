@@ -0,0 +1,126 @@
+"""Which keys a gesture sends, depending on the application in front.
+
+Rules come from a JSON config file, e.g. config/gesture_control_actions.json:
+
+    {"thumbs_up": [
+        {"match": "youtube", "press": "l", "message": "Skipped forward 10 seconds!"},
+        {"match": "notepad|save as", "macro": "notepad_save"},
+        {"match": "youtube", "background": true, "press": "l"}
+    ]}
+
+`match` is a regular expression searched in the lower-case window title.
+Each rule does one thing: `press` a key, send a `hotkey` combination,
+`write` text or run a named `macro`. Foreground rules are tried in order
+against the active window. If none matches, `background` rules look for
+another window whose title matches, bring it to the front for the
+keystroke, then return to the previous window. Every gesture's
+foreground rules are compiled into one regular expression, and results
+are cached per title, so resolving an action is a dictionary lookup.
+"""
+import json
+import os
+import re
+from collections import namedtuple
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config')
+
+AppRule = namedtuple('AppRule', ['match', 'pattern', 'kind', 'value', 'background',
+                                 'message'])
+
+ACTION_KINDS = ('press', 'hotkey', 'write', 'macro')
+
+
+def _compile_rule(spec):
+    kinds = [kind for kind in ACTION_KINDS if kind in spec]
+    if 'match' not in spec or len(kinds) != 1:
+        raise ValueError(f"A rule needs 'match' and exactly one of {ACTION_KINDS}: {spec}")
+    kind = kinds[0]
+    return AppRule(spec['match'], re.compile(spec['match']), kind, spec[kind],
+                   bool(spec.get('background', False)), spec.get('message'))
+
+
+class GestureRules:
+    """The rules of one gesture, compiled into a single matcher"""
+
+    def __init__(self, rules):
+        self.rules = [rule for rule in rules if not rule.background]
+        self.background = [rule for rule in rules if rule.background]
+        # One alternation, anchored so the first rule that matches anywhere wins
+        self._matcher = re.compile('|'.join(f'(?P<r{i}>.*?(?:{rule.match}))'
+                                            for i, rule in enumerate(self.rules))) if self.rules else None
+        self._cache = {}
+
+    def match(self, title):
+        """Foreground rule for a lower-case window title, or None"""
+        try:
+            return self._cache[title]
+        except KeyError:
+            pass
+        rule = None
+        if self._matcher is not None:
+            m = self._matcher.match(title)
+            if m is not None:
+                rule = self.rules[int(m.lastgroup[1:])]
+        if len(self._cache) > 256:
+            self._cache.clear()
+        self._cache[title] = rule
+        return rule
+
+    def resolve(self, windows):
+        """(rule, window to bring to the front or None) for a WindowContext, or (None, None)"""
+        rule = self.match(windows.active.title)
+        if rule is not None:
+            return rule, None
+        for rule in self.background:
+            handle = windows.find(rule.pattern)
+            if handle is not None:
+                return rule, handle
+        return None, None
+
+
+class AppActions:
+    """Per-gesture rules loaded from a config file"""
+
+    def __init__(self, config):
+        self.gestures = {gesture: GestureRules([_compile_rule(spec) for spec in specs])
+                         for gesture, specs in config.items()}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def resolve(self, gesture, windows):
+        rules = self.gestures.get(gesture)
+        if rules is None:
+            return None, None
+        return rules.resolve(windows)
+
+    def run(self, gesture, windows, backend, ctx, macros=None):
+        """Perform the action for `gesture` in the current window context.
+
+        Runs on the action thread. Returns the rule that ran, or None.
+        """
+        rule, window = self.resolve(gesture, windows)
+        if rule is None:
+            return None
+        previous = None
+        if window is not None:
+            previous = windows.active.handle
+            windows.activate(window)
+            if not ctx.sleep(0.2):  # Let the window take focus
+                return None
+        if rule.kind == 'press':
+            backend.press(rule.value)
+        elif rule.kind == 'hotkey':
+            backend.hotkey(*rule.value)
+        elif rule.kind == 'write':
+            backend.write(rule.value)
+        else:
+            (macros or {})[rule.value](ctx)
+        if rule.message:
+            print(rule.message)
+        if previous is not None:
+            ctx.sleep(0.2)
+            windows.activate(previous)
+        return rule
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from frame_sources import DEFAULT_BACKEND
+
+CameraInfo = namedtuple('CameraInfo', ['index', 'backend', 'width', 'height', 'fps'])
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".gesture_control", "cameras.json")
+
+
+def probe_camera(index, backend=DEFAULT_BACKEND, width=640, height=480, sample_frames=10):
+    """Open a camera and measure it, returns a CameraInfo or None if unusable.
+
+    With sample_frames=0 only one frame is read and fps is left at 0, which
+    is enough to confirm that a cached camera is still there.
+    """
+    cap = cv2.VideoCapture(index, backend)
+    try:
+        if not cap.isOpened():
+            return None
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+        fps = 0.0
+        if sample_frames:
+            start = time.perf_counter()
+            frame_count = 0
+            for _ in range(sample_frames):
+                if cap.grab():
+                    frame_count += 1
+            elapsed = time.perf_counter() - start
+            fps = round(frame_count / elapsed, 1) if elapsed > 0 else 0.0
+        return CameraInfo(index, backend, frame.shape[1], frame.shape[0], fps)
+    finally:
+        cap.release()
+
+
+class CameraDiscovery:
+    """Probes camera indexes in parallel on a background thread.
+
+    Cameras remembered from the last run are only revalidated (one frame),
+    every other index gets a full probe. Results are written back to the
+    cache, so on the next launch the usual camera is verified, and start()
+    can open it, as soon as its single test frame arrives.
+    """
+
+    def __init__(self, max_index=10, backend=DEFAULT_BACKEND,
+                 cache_path=DEFAULT_CACHE_PATH, on_update=None):
+        self.max_index = max_index
+        self.backend = backend
+        self.cache_path = cache_path
+        self.on_update = on_update  # Called with the camera list as results arrive
+        self.cached = self.load_cache()
+        self._verified = {}
+        self._probed = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.done = threading.Event()
+
+    def load_cache(self):
+        """Read the cameras found last time, or an empty dict"""
+        try:
+            with open(self.cache_path) as f:
+                entries = json.load(f)
+            return {entry['index']: CameraInfo(**entry) for entry in entries
+                    if entry.get('backend') == self.backend}
+        except (OSError, ValueError, TypeError, KeyError):
+            return {}
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, 'w') as f:
+                json.dump([info._asdict() for info in self.cameras], f, indent=2)
+        except OSError:
+            pass  # A missing cache only costs startup time
+
+    @property
+    def cameras(self):
+        """Cameras verified so far during this run, by index"""
+        with self._cond:
+            return [self._verified[i] for i in sorted(self._verified)]
+
+    @property
+    def candidates(self):
+        """Best current guess: verified cameras, or cached ones while probing"""
+        cameras = self.cameras
+        if cameras or self.done.is_set():
+            return cameras
+        return [self.cached[i] for i in sorted(self.cached)]
+
+    def is_verified(self, index):
+        with self._cond:
+            return index in self._verified
+
+    def start(self):
+        """Start probing in the background, returns immediately"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        """Probe every index in parallel and return the cameras found"""
+        with ThreadPoolExecutor(max_workers=self.max_index) as pool:
+            for index in range(self.max_index):
+                # Known cameras only need a quick check that they still work
+                sample_frames = 0 if index in self.cached else 10
+                future = pool.submit(probe_camera, index, self.backend,
+                                     sample_frames=sample_frames)
+                future.add_done_callback(
+                    lambda f, index=index: self._on_probed(index, f))
+        self.save_cache()
+        self.done.set()
+        with self._cond:
+            self._cond.notify_all()
+        return self.cameras
+
+    def _on_probed(self, index, future):
+        info = future.exception() is None and future.result()
+        with self._cond:
+            self._probed.add(index)
+            if info:
+                if not info.fps and index in self.cached:
+                    info = info._replace(fps=self.cached[index].fps)
+                self._verified[index] = info
+            self._cond.notify_all()
+        if self.on_update:
+            self.on_update(self.cameras)
+
+    def wait_for(self, index, timeout=None):
+        """Block until `index` has been probed, returns its CameraInfo or None"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: index in self._probed or self.done.is_set(), timeout)
+            return self._verified.get(index)
+
+    def wait(self, timeout=None):
+        """Block until discovery has finished, returns the cameras found"""
+        self.done.wait(timeout)
+        return self.cameras
@@ -0,0 +1,168 @@
+"""Stopping and querying a tracking loop that has no window to press 'q' in.
+
+A RunControl collects every way to stop: OS signals (Ctrl+C, SIGTERM,
+Ctrl+Break), a global hotkey (Windows) and commands sent to a localhost
+control port, e.g. from another terminal:
+
+    python control.py stop
+    python control.py status
+"""
+import argparse
+import json
+import signal
+import socket
+import sys
+import threading
+
+DEFAULT_CONTROL_PORT = 47800
+# Ctrl+Alt+Q as virtual key codes
+DEFAULT_HOTKEY = (0x11, 0x12, ord('Q'))
+
+
+class RunControl:
+    """Stop flag for a tracking loop, set by signals, a hotkey or the control port"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._previous_handlers = {}
+        self._hotkey_thread = None
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def install_signal_handlers(self):
+        """Stop on SIGINT, SIGTERM and SIGBREAK; must be called on the main thread"""
+        for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            self._previous_handlers[signum] = signal.signal(signum, self._on_signal)
+        return self
+
+    def restore_signal_handlers(self):
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
+
+    def _on_signal(self, signum, frame):
+        self.set()
+
+    def watch_hotkey(self, keys=DEFAULT_HOTKEY, interval=0.05):
+        """Stop when all `keys` are held, from any window. Returns False where unsupported"""
+        try:
+            import win32api
+        except ImportError:  # Global hotkey only on Windows
+            return False
+
+        def poll():
+            while not self._event.wait(interval):
+                # The high bit is set while a key is down
+                if all(win32api.GetAsyncKeyState(key) & 0x8000 for key in keys):
+                    self.set()
+        self._hotkey_thread = threading.Thread(target=poll, daemon=True, name='hotkey')
+        self._hotkey_thread.start()
+        return True
+
+
+class ControlServer:
+    """Line-based commands on a localhost TCP port.
+
+    `handlers` maps a command name to a function taking the rest of the
+    line and returning the reply text. Only one client is served at a time,
+    which is plenty for stop/status requests.
+    """
+
+    def __init__(self, handlers, port=DEFAULT_CONTROL_PORT, host='127.0.0.1'):
+        self.handlers = dict(handlers)
+        self.host = host
+        self.port = port
+        self._socket = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            self._socket.bind((self.host, self.port))
+        except OSError:
+            self._socket.close()
+            self._socket = None
+            raise
+        self._socket.listen(2)
+        self._socket.settimeout(0.2)
+        self.port = self._socket.getsockname()[1]  # When started on port 0
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='control')
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                conn.settimeout(1.0)
+                try:
+                    for line in conn.makefile('r'):
+                        conn.sendall((self.handle(line) + '\n').encode())
+                except OSError:
+                    pass
+
+    def handle(self, line):
+        command, _, rest = line.strip().partition(' ')
+        handler = self.handlers.get(command)
+        if handler is None:
+            return f"error: unknown command {command!r}, try one of {', '.join(self.handlers)}"
+        try:
+            return handler(rest) or 'ok'
+        except Exception as e:
+            return f"error: {e}"
+
+    def stop(self):
+        self._stop_event.set()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+def send_command(command, port=DEFAULT_CONTROL_PORT, host='127.0.0.1', timeout=2.0):
+    """Send one command to a running ControlServer and return its reply"""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((command + '\n').encode())
+        return conn.makefile('r').readline().strip()
+
+
+def control_handlers(stop, metrics=None):
+    """The standard commands: stop, and status (metrics snapshot as JSON)"""
+    handlers = {'stop': lambda rest: stop.set()}
+    if metrics is not None:
+        handlers['status'] = lambda rest: json.dumps(metrics.snapshot())
+    return handlers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Send a command to a running gesture tracker")
+    parser.add_argument('command', help="stop or status")
+    parser.add_argument('--port', type=int, default=DEFAULT_CONTROL_PORT)
+    args = parser.parse_args()
+    try:
+        print(send_command(args.command, args.port))
+    except OSError as e:
+        print(f"No tracker listening on port {args.port}: {e}")
+        sys.exit(1)
@@ -0,0 +1,110 @@
+import math
+
+
+class OneEuroFilter:
+    """Adaptive low-pass filter for one coordinate (Casiez et al., CHI 2012).
+
+    Heavy smoothing while the value barely moves removes jitter, and the
+    cutoff rises with speed so fast motion is followed with little lag.
+    Driven by sample timestamps, O(1) per update.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = 0.0  # Filtered derivative, units per second
+        self.lag = 0.0       # Seconds the last output trails the input by
+        self._timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, timestamp):
+        if self.value is None:
+            self.value = value
+            self._timestamp = timestamp
+            return value
+        dt = timestamp - self._timestamp
+        if dt <= 0:
+            return self.value
+        self._timestamp = timestamp
+
+        velocity = (value - self.value) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.velocity += a_d * (velocity - self.velocity)
+
+        cutoff = self.min_cutoff + self.beta * abs(self.velocity)
+        alpha = self._alpha(cutoff, dt)
+        self.lag = (1.0 - alpha) / alpha * dt
+        self.value += alpha * (value - self.value)
+        return self.value
+
+
+class ActiveRegion:
+    """Part of the camera image, in normalized coordinates, that spans the whole screen"""
+
+    def __init__(self, left=0.0, top=0.0, right=1.0, bottom=1.0):
+        if right <= left or bottom <= top:
+            raise ValueError("Active region must have a positive width and height")
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+    def map(self, x, y, screen_width, screen_height):
+        """Map a normalized camera point to clamped screen pixels"""
+        u = (x - self.left) / (self.right - self.left)
+        v = (y - self.top) / (self.bottom - self.top)
+        u = min(max(u, 0.0), 1.0)
+        v = min(max(v, 0.0), 1.0)
+        return u * (screen_width - 1), v * (screen_height - 1)
+
+
+class CursorMapper:
+    """Camera landmark -> screen cursor: active region, One Euro filter, prediction.
+
+    The filtered position is moved ahead along the filtered velocity by the
+    filter's own lag, so smoothing removes jitter without the cursor
+    trailing the hand more than the raw landmarks do. With predict=True it
+    also leads by the capture-to-actuation latency fed to observe_latency(),
+    which hides most of the pipeline lag during motion. The lead is capped
+    at max_lead seconds.
+    """
+
+    def __init__(self, screen_size, region=None, min_cutoff=1.0, beta=0.005,
+                 d_cutoff=2.0, predict=False, max_lead=0.06):
+        self.screen_width, self.screen_height = screen_size
+        self.region = region if region is not None else ActiveRegion()
+        self.filter_x = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self.filter_y = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self.predict = predict
+        self.max_lead = max_lead
+        self.latency = 0.0  # Smoothed capture-to-actuation latency, seconds
+
+    def reset(self):
+        """Forget the filter state, e.g. when the hand was lost"""
+        self.filter_x.reset()
+        self.filter_y.reset()
+
+    def observe_latency(self, seconds):
+        """Feed a measured capture-to-actuation latency into the predictor"""
+        self.latency += 0.1 * (seconds - self.latency)
+
+    def map(self, x, y, timestamp):
+        """Screen position for normalized camera point (x, y) captured at `timestamp`"""
+        sx, sy = self.region.map(x, y, self.screen_width, self.screen_height)
+        fx = self.filter_x(sx, timestamp)
+        fy = self.filter_y(sy, timestamp)
+        lead_x, lead_y = self.filter_x.lag, self.filter_y.lag
+        if self.predict:
+            lead_x += self.latency
+            lead_y += self.latency
+        fx += self.filter_x.velocity * min(lead_x, self.max_lead)
+        fy += self.filter_y.velocity * min(lead_y, self.max_lead)
+        fx = min(max(fx, 0.0), self.screen_width - 1)
+        fy = min(max(fy, 0.0), self.screen_height - 1)
+        return int(fx), int(fy)
@@ -0,0 +1,395 @@
+"""Hand tracking and gesture dispatch as a reusable engine.
+
+GestureEngine owns what a tracking session needs apart from the UI: the
+MediaPipe Hands graph, the gesture state machines and an Actuator (see
+actuator.py) for the cursor and the actions, which may also be a
+RemoteActuator on another machine (see remote.py). Entry points like
+gesture_control.py and hand_tracker.py only decide what each gesture
+event does.
+
+Importing this module is cheap. MediaPipe, OpenCV and the Windows modules
+are imported when first needed. warm_up() imports them, builds the Hands
+graph and runs it once on a blank frame on a background thread, e.g.
+while a start menu is shown, so the first session starts with a loaded
+model. The graph is kept between sessions: run() or start() and stop()
+can be called again and again, and a new session only resets the graph's
+tracking state.
+"""
+import threading
+import time
+from collections import deque
+
+from actuator import Actuator
+from control import ControlServer, RunControl, control_handlers
+from cursor_filter import ActiveRegion, CursorMapper
+from frame_buffer import CaptureThread
+from gesture_events import GestureStateMachine
+from landmarks import INDEX_TIP
+from metrics import PipelineMetrics
+from motion import MotionGestures
+
+# Camera area (normalized) that spans the whole screen, so the hand never
+# has to reach the edges of the frame
+DEFAULT_REGION = ActiveRegion(0.1, 0.1, 0.9, 0.9)
+
+# Blank frame the Hands graph is warmed up with
+WARM_UP_SHAPE = (480, 640, 3)
+
+
+class VideoStream:
+    """A frame source read on its own capture thread, what InlineTracker reads from"""
+
+    def __init__(self, source=0):
+        from frame_sources import PACE_FAST, open_source
+
+        # A camera index, a video file, an image directory or a FrameSource
+        self.stream = open_source(source)
+        if not self.stream.open():
+            raise RuntimeError(f"Failed to open frame source {source}")
+        # Replays read as fast as possible hand over every frame in order
+        lockstep = getattr(self.stream, 'pace', None) == PACE_FAST
+        self.capture_thread = CaptureThread(self.stream, lockstep=lockstep)
+
+    def start(self):
+        self.capture_thread.start()
+        return self
+
+    def read(self, timeout=0.5):
+        """Wait for the newest frame, returns a CapturedFrame or None on timeout"""
+        return self.capture_thread.read(timeout)
+
+    @property
+    def finished(self):
+        """True once a recorded source has delivered its last frame"""
+        return self.capture_thread.finished
+
+    def stop(self):
+        self.capture_thread.stop()
+        self.stream.release()
+
+
+class GestureEngine:
+    """Tracking sessions that move the cursor and turn hands into gesture events.
+
+    `on_event(event)` gets every GestureEvent of the gesture state machine
+    and of MotionGestures, on the tracking thread, so it should only queue
+    work with the actuator's submit(), start_drag(), end_drag(), scroll()
+    and app_action(). The cursor follows the index tip of the first hand in
+    view, or of the first one labelled `cursor_hand`. Without an `actuator`
+    a local one is made from `input_backend`, `windows` and `app_actions`.
+    """
+
+    def __init__(self, hands_options, on_event=None, cursor_hand=None, input_backend=None,
+                 metrics=None, windows=None, app_actions=None, pipelined=False, roi=False,
+                 region=DEFAULT_REGION, actuator=None, predict=False):
+        self.hands_options = dict(hands_options)
+        self.on_event = on_event
+        self.cursor_hand = cursor_hand
+        # Per-stage timings, see metrics.py; disabled unless one is passed in
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        if actuator is None:
+            actuator = Actuator(input_backend, windows, app_actions, self.metrics)
+        self.actuator = actuator
+        self.pipelined = pipelined  # Capture and inference in separate processes
+        self.roi = roi  # Inference on a crop around the hands once they are found
+        self.region = region
+        self.predict = predict  # Lead the cursor by the measured capture-to-actuation latency
+
+        # Session options, read when a session starts
+        self.metrics_overlay = False
+        self.record_path = None  # Landmark recording appended to by every session
+        self.latency_budget = None  # Seconds per frame the governor aims for, None disables it
+        self.headless = False  # No preview window, see control.py for stopping
+        self.preview_fps = 15.0
+        self.preview_title = "Gesture Control"
+        self.draw_hands = True  # Draw the landmarks on the preview
+        self.annotate = None  # fn(image) drawing status text, on the preview thread
+        self.on_key = None  # fn(key) for keys pressed in the preview, 'q' always stops
+        self.control_port = None  # Localhost port for stop/status commands, None for none
+
+        self.gesture_events = GestureStateMachine()
+        self.motion = MotionGestures()  # Swipes, pinch-and-drag and scrolling
+        self.hands = None  # Built by warm_up(), kept between sessions
+        self._hands_roi = False  # Whether self.hands was built for ROI crops
+
+        # Capture-to-processed latency of recent frames, in seconds
+        self.frame_latencies = deque(maxlen=10000)
+        self.frames_processed = 0
+        self.sessions = 0
+        self.first_frame_seconds = None  # From the start of the last session to its first frame
+
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        self._warm_error = None
+        self._control = None  # RunControl of the current session
+        self._thread = None   # Session thread of start()
+
+    def warm_up(self, background=True):
+        """Load the heavy modules, the actuator's input backend and the Hands graph.
+
+        Runs on a thread unless `background` is False. A session waits for a
+        warm-up in progress and does one itself if none was started.
+        """
+        with self._lock:
+            if self._warm_thread is None:
+                self._warm_error = None
+                self._warm_thread = threading.Thread(target=self._warm_up, daemon=True)
+                self._warm_thread.start()
+        if not background:
+            self.wait_ready()
+        return self
+
+    def _warm_up(self):
+        try:
+            self.actuator.prepare()
+            # Imported for their OpenCV import, which is most of a session's startup
+            import pipeline
+            if not self.headless:
+                import preview
+            if self.pipelined or self.hands is not None:
+                return  # Pipelined mode builds its graph in the inference process
+            import mediapipe as mp
+            import numpy as np
+
+            options = self._graph_options()
+            hands = mp.solutions.hands.Hands(**options)
+            # The first frame initializes the graph and loads the models
+            hands.process(np.zeros(WARM_UP_SHAPE, np.uint8))
+            self.hands = hands
+            self._hands_roi = bool(self.roi)
+        except Exception as e:
+            self._warm_error = e
+
+    def wait_ready(self, timeout=None):
+        """Wait for warm_up(), False on timeout; raises what made it fail"""
+        self.warm_up()
+        self._warm_thread.join(timeout)
+        if self._warm_thread.is_alive():
+            return False
+        with self._lock:
+            error = self._warm_error
+            if error is not None:
+                self._warm_thread = None  # Try again next time
+                raise error
+        return True
+
+    def run(self, source=0):
+        """Track `source` until it ends or stop() is called, on the calling thread.
+
+        `source` is a camera index, a video file, an image directory or a
+        FrameSource, or a list of them to track several cameras at once
+        (see multi_camera.py). Ctrl+C, the stop hotkey, the control port and
+        'q' in the preview stop the session too.
+        """
+        self._session(source, RunControl())
+
+    def start(self, source=0):
+        """Run a session on a background thread, returns at once"""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("A tracking session is already running")
+        control = self._control = RunControl()
+        self._thread = threading.Thread(target=self._session, args=(source, control), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """End the current session, by default waiting for start()'s thread to finish"""
+        control = self._control
+        if control is not None:
+            control.set()
+        thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stop, then release the Hands graph and the actuator"""
+        self.stop()
+        if self._warm_thread is not None:
+            self._warm_thread.join()
+        if self.hands is not None:
+            self.hands.close()
+            self.hands = None
+        self.actuator.close()
+
+    def _graph_options(self):
+        """Options of the inline Hands graph, see roi_hands_options() for ROI sessions"""
+        from roi import roi_hands_options
+
+        return roi_hands_options(self.hands_options) if self.roi else self.hands_options
+
+    def _cursor_index(self, batch):
+        """Index of the hand that moves the cursor, None if it is not in view"""
+        if batch is None:
+            return None
+        if self.cursor_hand is None:
+            return 0
+        for i, hand in enumerate(batch.handedness):
+            if hand == self.cursor_hand:
+                return i
+        return None
+
+    def _begin(self, actuator):
+        """Reset the gesture state for a new session, returns its CursorMapper"""
+        self.gesture_events.reset()
+        self.motion.reset()
+        return CursorMapper(actuator.screen_size(), region=self.region, predict=self.predict)
+
+    def _track(self, batch, timestamp, cursor_mapper, actuator, live=True):
+        """Cursor and gesture events of one frame's hands"""
+        i = self._cursor_index(batch)
+        if i is None:
+            # Cursor hand lost, start the filter fresh when it comes back
+            cursor_mapper.reset()
+        else:
+            latency = actuator.cursor_latency if live else None
+            if latency is not None:
+                cursor_mapper.observe_latency(latency)
+            # Map and smooth the index finger tip, timed by the frame
+            x, y = cursor_mapper.map(batch.points[i, INDEX_TIP, 0],
+                                     batch.points[i, INDEX_TIP, 1], timestamp)
+            actuator.move_to(x, y, timestamp)
+
+        # Debounced events, cooldowns run on frame timestamps
+        on_event = self.on_event
+        if on_event is not None:
+            for event in self.gesture_events.update(batch, timestamp):
+                on_event(event)
+            for event in self.motion.update(batch, timestamp):
+                on_event(event)
+
+    def replay(self, recording, realtime=False, timeout=5.0):
+        """Run a landmark recording (see landmark_recording.py) through a session without MediaPipe.
+
+        Everything after inference is what a live session does: cursor
+        mapping, both state machines, on_event and the actuator. Frames
+        follow each other as fast as possible unless `realtime`. Returns the
+        number of frames, once the actuator ran the actions they queued (or
+        `timeout` seconds passed).
+        """
+        from landmark_recording import replay
+
+        actuator = self.actuator.start()
+        try:
+            cursor_mapper = self._begin(actuator)
+            # Recorded capture times are not this process's clock, so no latency feedback
+            frames = replay(recording, lambda timestamp, seq, batch: self._track(
+                batch, timestamp, cursor_mapper, actuator, live=False), realtime)
+            wait_idle = getattr(actuator, 'wait_idle', None)  # A RemoteActuator sends before END
+            if wait_idle is not None:
+                wait_idle(timeout)
+        finally:
+            actuator.stop()
+        return frames
+
+    def _on_preview_key(self, key, control):
+        if key == ord('q'):
+            control.set()
+        if self.on_key is not None:
+            self.on_key(key)
+
+    def _session(self, source, control):
+        self._control = control
+        started = time.perf_counter()
+        self.wait_ready()
+        from pipeline import InlineTracker, PipelinedTracker
+        from roi import HandRoi
+
+        metrics = self.metrics
+        options = self.hands_options
+        max_hands = options.get('max_num_hands', 2)
+        roi = HandRoi() if self.roi else None
+        if isinstance(source, (list, tuple)) and len(source) == 1:
+            source = source[0]
+        inline = False
+        if isinstance(source, (list, tuple)):
+            from multi_camera import MultiCameraTracker
+            # Capture and inference in their own processes for every camera
+            tracker = MultiCameraTracker(source, options, metrics=metrics, roi=self.roi,
+                                         preview=not self.headless)
+        elif self.pipelined:
+            # Capture and inference run in their own processes, the governor only works inline
+            tracker = PipelinedTracker(source, options, metrics=metrics, roi=roi,
+                                       preview=not self.headless)
+        else:
+            governor = None
+            if self.latency_budget:
+                from governor import PerformanceGovernor
+                governor = PerformanceGovernor(budget=self.latency_budget, metrics=metrics)
+            graph_options = self._graph_options()
+            if self._hands_roi != bool(self.roi):
+                # roi was switched since the warm-up
+                import mediapipe as mp
+                self.hands.close()
+                self.hands = mp.solutions.hands.Hands(**graph_options)
+                self._hands_roi = bool(self.roi)
+            self.hands.reset()  # Forget the last session's hands, keep the graph
+            tracker = InlineTracker(VideoStream(source), self.hands, max_hands=max_hands,
+                                    metrics=metrics, roi=roi, governor=governor,
+                                    hands_options=graph_options, preview=not self.headless)
+            inline = True
+        tracker.start()
+
+        recorder = server = preview = None
+        actuator = self.actuator
+        # Whatever was set up when something fails is torn down again below
+        try:
+            actuator.start()
+            cursor_mapper = self._begin(actuator)
+            if self.record_path:
+                from landmark_recording import LandmarkRecorder
+                recorder = LandmarkRecorder(self.record_path, max_hands)
+
+            if threading.current_thread() is threading.main_thread():
+                control.install_signal_handlers()
+            control.watch_hotkey()
+            if self.control_port:
+                server = ControlServer(control_handlers(control, metrics), self.control_port).start()
+            if not self.headless:
+                from preview import PreviewRenderer
+                preview = PreviewRenderer(self.preview_title, self.preview_fps,
+                                          annotate=self.annotate,
+                                          metrics=metrics if self.metrics_overlay else None,
+                                          on_key=lambda key: self._on_preview_key(key, control)).start()
+            self.sessions += 1
+            self.first_frame_seconds = None
+
+            while not control.is_set():
+                # Newest frame, already mirrored and run through MediaPipe
+                tracked = tracker.read()
+                if tracked is None:
+                    if tracker.finished:
+                        break
+                    continue  # Timed out waiting for the camera
+                if self.first_frame_seconds is None:
+                    self.first_frame_seconds = time.perf_counter() - started
+
+                batch = tracked.batch
+                timestamp = tracked.timestamp
+                if recorder is not None:
+                    recorder.record(timestamp, tracked.seq, batch)
+                start = metrics.now()
+                self._track(batch, timestamp, cursor_mapper, actuator)
+                metrics.record('gestures', start)
+
+                # Drawing happens on the preview thread, at its own pace
+                start = metrics.now()
+                if preview is not None:
+                    preview.submit(tracked.image, batch if self.draw_hands else None)
+                self.frame_latencies.append(time.perf_counter() - timestamp)
+                self.frames_processed += 1
+                metrics.record('render', start)
+                metrics.tick()
+        finally:
+            control.set()
+            if preview is not None:
+                preview.stop()
+            if server is not None:
+                server.stop()
+            control.restore_signal_handlers()
+            actuator.stop()
+            tracker.stop()
+            if inline:
+                self.hands = tracker.hands  # The governor may have rebuilt it
+            if recorder is not None:
+                recorder.close()
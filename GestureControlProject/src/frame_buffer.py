@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import namedtuple
+from threading import Thread
+
+import numpy as np
+
+# A frame handed to consumers: the image plus its sequence number and
+# capture time (time.perf_counter() seconds)
+CapturedFrame = namedtuple('CapturedFrame', ['image', 'seq', 'timestamp'])
+
+
+class LatestFrameBuffer:
+    """Triple-buffered slot that only ever holds the newest frame.
+
+    The producer fills a back slot and publishes it, the consumer checks out
+    the newest published slot. Slots are numpy arrays allocated once and
+    reused, so steady-state capture does not allocate. The image returned by
+    read() stays valid until the same consumer calls read() again.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._slots = None
+        self._latest = None   # Index of the newest published slot
+        self._reading = None  # Index of the slot checked out by the consumer
+        self._writing = None  # Index of the slot the producer is filling
+        self._seq = 0
+        self._read_seq = 0
+        self._timestamp = 0.0
+        self._closed = False
+        self._discard = False
+        self.dropped = 0      # Frames overwritten before anyone read them
+
+    def back_buffer(self):
+        """Return a free preallocated slot for the producer to fill, or None"""
+        with self._cond:
+            if self._slots is None:
+                return None
+            for i in range(len(self._slots)):
+                if i != self._latest and i != self._reading:
+                    self._writing = i
+                    return self._slots[i]
+            return None
+
+    def publish(self, frame, timestamp=None):
+        """Publish a frame, copying it into a slot unless it already is one"""
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self._cond:
+            if self._closed:
+                return
+            if (self._slots is None or frame.shape != self._slots[0].shape
+                    or frame.dtype != self._slots[0].dtype):
+                # First frame or a resolution change: (re)allocate the slots
+                self._slots = [np.empty_like(frame) for _ in range(3)]
+                self._latest = self._reading = self._writing = None
+
+            index = self._writing
+            if index is None or frame is not self._slots[index]:
+                index = next(i for i in range(3)
+                             if i != self._latest and i != self._reading)
+                np.copyto(self._slots[index], frame)
+
+            if self._seq > self._read_seq:
+                self.dropped += 1
+            self._latest = index
+            self._writing = None
+            self._seq += 1
+            self._timestamp = timestamp
+            self._cond.notify_all()
+
+    def read(self, timeout=None):
+        """Block until a frame newer than the last one read is available.
+
+        Returns a CapturedFrame, or None on timeout or once closed and drained.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self._closed or self._seq > self._read_seq,
+                    timeout):
+                return None
+            if self._seq <= self._read_seq or self._discard:
+                return None
+            self._reading = self._latest
+            self._read_seq = self._seq
+            return CapturedFrame(self._slots[self._reading], self._seq,
+                                 self._timestamp)
+
+    def wait_consumed(self, timeout=None):
+        """Block the producer until the last published frame has been read"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._closed or self._read_seq >= self._seq, timeout)
+
+    def close(self, discard=True):
+        """Wake up any waiting reader and refuse further frames.
+
+        With discard=False a frame that was published but not read yet is
+        still handed out before read() starts returning None.
+        """
+        with self._cond:
+            self._closed = True
+            self._discard = discard
+            self._cond.notify_all()
+
+    def reset(self):
+        """Reopen the buffer for a new capture session, keeping the slots"""
+        with self._cond:
+            self._closed = False
+            self._discard = False
+            self._latest = self._reading = self._writing = None
+            self._seq = self._read_seq = 0
+            self.dropped = 0
+
+
+class CaptureThread:
+    """Background thread that reads frames from a capture into a LatestFrameBuffer"""
+
+    def __init__(self, capture, buffer=None, lockstep=False):
+        self.capture = capture  # Anything with read(image) -> (ret, frame)
+        self.buffer = buffer if buffer is not None else LatestFrameBuffer()
+        # In lockstep mode every frame is handed to the consumer before the
+        # next one is read, which makes replays of recordings reproducible
+        self.lockstep = lockstep
+        self.finished = False  # Set once a finite source ran out of frames
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def start(self):
+        """Start the capture thread"""
+        self.buffer.reset()
+        self.finished = False
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            target = self.buffer.back_buffer()
+            # Let the capture decode straight into the preallocated slot
+            if target is not None:
+                ret, frame = self.capture.read(target)
+            else:
+                ret, frame = self.capture.read()
+            if not ret or frame is None:
+                if getattr(self.capture, 'exhausted', False):
+                    self.finished = True
+                    self.buffer.close(discard=False)
+                    return
+                # Back off instead of spinning on a failing device
+                self._stop_event.wait(0.01)
+                continue
+            self.buffer.publish(frame, time.perf_counter())
+            if self.lockstep:
+                while not self.buffer.wait_consumed(0.1):
+                    if self._stop_event.is_set():
+                        return
+
+    def read(self, timeout=None):
+        """Wait for the newest frame, see LatestFrameBuffer.read"""
+        return self.buffer.read(timeout)
+
+    def stop(self):
+        """Stop the capture thread and wake up any waiting reader"""
+        self._stop_event.set()
+        self.buffer.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# DirectShow opens fastest on Windows, everywhere else let OpenCV pick
+DEFAULT_BACKEND = cv2.CAP_DSHOW if sys.platform == 'win32' else cv2.CAP_ANY
+
+# Pacing modes for recorded sources
+PACE_REALTIME = 'realtime'  # Deliver frames at the recording's frame rate
+PACE_FAST = 'fast'          # Deliver frames as fast as the consumer reads them
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class FrameSource:
+    """Interface for anything that produces BGR frames.
+
+    read() mirrors cv2.VideoCapture.read so a source can be handed straight
+    to CaptureThread: it returns (ret, frame) and fills `image` in place when
+    the shapes match.
+    """
+
+    exhausted = False  # True once a finite source has no more frames
+
+    def open(self):
+        """Open the source, returns True on success"""
+        return True
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        raise NotImplementedError
+
+    def set_resolution(self, width, height):
+        """Ask for a different frame size, returns False if the source cannot change it"""
+        return False
+
+    def release(self):
+        pass
+
+
+class _Pacer:
+    """Sleeps just long enough to hold a target frame rate"""
+
+    def __init__(self, fps, pace):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.pace = pace
+        self._next = None
+
+    def wait(self):
+        if self.pace != PACE_REALTIME or not self.interval:
+            return
+        now = time.perf_counter()
+        if self._next is None or now - self._next > self.interval:
+            # First frame, or the consumer fell behind: restart the schedule
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+
+
+def _into(image, frame):
+    """Copy frame into the caller's buffer when possible"""
+    if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+        np.copyto(image, frame)
+        return image
+    return frame
+
+
+class CameraSource(FrameSource):
+    """Live camera opened through cv2.VideoCapture"""
+
+    def __init__(self, index=0, backend=DEFAULT_BACKEND, width=640, height=480):
+        self.index = index
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.capture = None
+        self._resize = None  # Resolution change waiting for the capture thread
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.index, self.backend)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return self.capture.isOpened()
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def set_resolution(self, width, height):
+        """Applied by the next read(), so only the capture thread touches the device"""
+        self._resize = (width, height)
+        return True
+
+    def read(self, image=None):
+        if self._resize is not None:
+            self.width, self.height = self._resize
+            self._resize = None
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            image = None  # The slot has the old size
+        if image is not None:
+            return self.capture.read(image)
+        return self.capture.read()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class VideoFileSource(FrameSource):
+    """Frames decoded from a recorded video file"""
+
+    def __init__(self, path, pace=PACE_REALTIME, loop=False, fps=None):
+        self.path = path
+        self.pace = pace
+        self.loop = loop
+        self.fps = fps
+        self.capture = None
+        self.exhausted = False
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            return False
+        fps = self.fps or self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self._pacer = _Pacer(fps, self.pace)
+        self.exhausted = False
+        return True
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def read(self, image=None):
+        ret, frame = self.capture.read(image) if image is not None else self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read(image) if image is not None else self.capture.read()
+        if not ret:
+            self.exhausted = True
+            return False, None
+        self._pacer.wait()
+        return True, frame
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageDirectorySource(FrameSource):
+    """Frames read from the image files of a directory, in name order"""
+
+    def __init__(self, path, fps=30.0, pace=PACE_REALTIME, loop=False):
+        self.path = path
+        self.fps = fps
+        self.pace = pace
+        self.loop = loop
+        self.files = []
+        self.exhausted = False
+
+    def open(self):
+        self.files = sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self._position = 0
+        self._pacer = _Pacer(self.fps, self.pace)
+        self.exhausted = False
+        return bool(self.files)
+
+    def read(self, image=None):
+        if self._position >= len(self.files):
+            if not self.loop or not self.files:
+                self.exhausted = True
+                return False, None
+            self._position = 0
+        frame = cv2.imread(self.files[self._position])
+        self._position += 1
+        if frame is None:
+            return False, None
+        self._pacer.wait()
+        return True, _into(image, frame)
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames, for benchmarking without any recording.
+
+    `render(image, index, timestamp)` draws frame `index` into `image`; the
+    default draws a bright disc moving across a dark background.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, frames=None,
+                 pace=PACE_REALTIME, render=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames  # None for an endless stream
+        self.pace = pace
+        self.render = render or self._default_render
+        self.exhausted = False
+
+    def open(self):
+        self._index = 0
+        self._pacer = _Pacer(self.fps, self.pace)
+        self._frame = np.zeros((self.height, self.width, 3), np.uint8)
+        self.exhausted = False
+        return True
+
+    def _default_render(self, image, index, timestamp):
+        image.fill(32)
+        x = int((index * 8) % self.width)
+        y = int(self.height / 2 + self.height / 4 * np.sin(index / 15.0))
+        cv2.circle(image, (x, y), 40, (180, 200, 230), -1)
+
+    def read(self, image=None):
+        if self.frames is not None and self._index >= self.frames:
+            self.exhausted = True
+            return False, None
+        if image is None or image.shape != self._frame.shape:
+            image = self._frame
+        self._pacer.wait()
+        self.render(image, self._index, time.perf_counter())
+        self._index += 1
+        return True, image
+
+
+def open_source(spec, pace=PACE_REALTIME, loop=False):
+    """Build a source from a camera index, video path or image directory"""
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec))
+    if spec == 'synthetic':
+        return SyntheticSource(pace=pace)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, pace=pace, loop=loop)
+    return VideoFileSource(spec, pace=pace, loop=loop)
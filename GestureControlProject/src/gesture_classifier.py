@@ -0,0 +1,189 @@
+"""Static gestures learned from recorded examples instead of hand-written rules.
+
+Landmarks are normalized first: translated to the wrist, rotated so the
+wrist -> middle knuckle axis points up, scaled by that length, and left
+hands mirrored onto right ones. A pose then looks the same however the
+hand is turned, how far it is from the camera and which hand makes it.
+
+GestureClassifier is a k-nearest-neighbour lookup over templates picked
+from the training frames. The templates and their squared norms are kept
+in one matrix, so every hand in a frame is classified with a single
+matrix product. Once installed, its classes replace the predicates of
+the same name in a GestureRegistry, so nothing downstream changes.
+
+Train from landmark recordings (see --record), one per gesture:
+
+    python gesture_classifier.py gestures.npz fist=fist.glmk thumbs_up=thumbs.glmk \\
+        none=neutral.glmk
+
+and run with --gesture-model gestures.npz. A 'none' class of ordinary hand
+poses keeps them from being forced into the nearest gesture.
+"""
+import argparse
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, PALM, WRIST
+
+# Landmark x and y are normalized by the image width and height separately;
+# scale x by this width / height so angles are measured in pixels
+DEFAULT_ASPECT = 640 / 480
+
+
+def normalize(points, handedness=None, aspect=DEFAULT_ASPECT):
+    """(hands, 63) float32 features of (hands, 21, 3) landmarks, see the module docstring"""
+    rel = (points - points[:, WRIST:WRIST + 1]) * np.array([aspect, 1.0, aspect], np.float32)
+    ux, uy = rel[:, PALM, 0], rel[:, PALM, 1]
+    inv = 1.0 / np.maximum(np.sqrt(ux * ux + uy * uy), 1e-6)
+    ux, uy = ux * inv, uy * inv
+    # One 3x3 transform per hand: rotate (ux, uy) onto (0, -1), which is up in
+    # image coordinates, mirror left hands, and scale to unit palm length
+    mirror = inv
+    if handedness is not None:
+        mirror = np.where([hand == 'Left' for hand in handedness], -inv, inv)
+    transform = np.zeros((len(points), 3, 3), np.float32)
+    transform[:, 0, 0] = -uy * mirror
+    transform[:, 1, 0] = ux * mirror
+    transform[:, 0, 1] = -ux * inv
+    transform[:, 1, 1] = -uy * inv
+    transform[:, 2, 2] = inv
+    return np.matmul(rel, transform).reshape(len(points), -1)
+
+
+class GestureClassifier:
+    """k-nearest-neighbour gesture classes over normalized landmark templates.
+
+    `labels` index into `classes`. Hands whose nearest template is further
+    than `max_distance` get no class.
+    """
+
+    def __init__(self, templates, labels, classes, k=5, max_distance=None, aspect=DEFAULT_ASPECT):
+        self.templates = np.ascontiguousarray(templates, np.float32)
+        self.labels = np.asarray(labels, np.intp)
+        self.classes = list(classes)
+        self.k = min(k, len(self.templates))
+        self.max_distance = max_distance
+        self.aspect = aspect
+        self._norms = (self.templates ** 2).sum(axis=1)
+        self._templates_t = np.ascontiguousarray(self.templates.T)
+        self._last = (None, None)  # (batch, labels) of the last classified batch
+
+    @classmethod
+    def fit(cls, examples, k=5, per_class=200, aspect=DEFAULT_ASPECT, margin=3.0):
+        """Build from {class name: (points (n, 21, 3), handedness list)}.
+
+        At most `per_class` evenly spaced frames of each class are kept as
+        templates, neighbouring frames of a recording being near duplicates.
+        max_distance is `margin` times the typical distance between a
+        template and its nearest neighbour of the same class.
+        """
+        templates, labels, spacing = [], [], []
+        for label, (name, (points, handedness)) in enumerate(examples.items()):
+            if not len(points):
+                raise ValueError(f"No examples of {name}")
+            keep = np.unique(np.linspace(0, len(points) - 1, min(per_class, len(points))).astype(int))
+            features = normalize(np.asarray(points)[keep], [handedness[i] for i in keep], aspect)
+            templates.append(features)
+            labels.append(np.full(len(features), label))
+            if len(features) > 1:
+                d = _squared_distances(features, features, (features ** 2).sum(axis=1))
+                np.fill_diagonal(d, np.inf)
+                spacing.append(np.sqrt(np.maximum(d.min(axis=1), 0)))
+        max_distance = None
+        if spacing:
+            max_distance = float(margin * np.percentile(np.concatenate(spacing), 95)) or None
+        return cls(np.concatenate(templates), np.concatenate(labels), list(examples), k,
+                   max_distance, aspect)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            max_distance = float(data['max_distance'])
+            return cls(data['templates'], data['labels'], [str(c) for c in data['classes']],
+                       int(data['k']), max_distance if max_distance > 0 else None,
+                       float(data['aspect']))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, templates=self.templates, labels=self.labels,
+                                classes=np.array(self.classes), k=self.k,
+                                max_distance=self.max_distance or 0.0, aspect=self.aspect)
+
+    def classify(self, batch):
+        """(hands,) class index of every hand in a HandBatch, -1 for no class"""
+        last_batch, last_labels = self._last
+        if last_batch is batch:
+            return last_labels  # Every installed predicate asks about the same frame
+        features = normalize(batch.points, batch.handedness, self.aspect)
+        hands = len(features)
+        # Squared distances less each hand's own |f|^2, which does not change the ranking
+        partial = self._norms - 2.0 * (features @ self._templates_t)
+        rows = np.arange(hands)[:, None]
+        nearest = np.argpartition(partial, self.k - 1, axis=1)[:, :self.k]
+        distances = np.sqrt(np.maximum(partial[rows, nearest]
+                                       + (features ** 2).sum(axis=1)[:, None], 0))
+        # Votes weighted by closeness, so a near template outweighs far ones
+        classes = len(self.classes)
+        votes = np.bincount((rows * classes + self.labels[nearest]).ravel(),
+                            (1.0 / (distances + 1e-6)).ravel(), hands * classes)
+        labels = votes.reshape(hands, classes).argmax(axis=1)
+        if self.max_distance is not None:
+            labels[distances.min(axis=1) > self.max_distance] = -1
+        self._last = (batch, labels)
+        return labels
+
+    def predicate(self, name):
+        """A GestureRegistry predicate for one class: (hands,) bool"""
+        index = self.classes.index(name)
+        return lambda batch: self.classify(batch) == index
+
+    def install(self, registry, exclude=('none',)):
+        """Register every class (but `exclude`), replacing rule-based predicates of the same name"""
+        for name in self.classes:
+            if name not in exclude:
+                registry.register(name, self.predicate(name))
+        return self
+
+
+def _squared_distances(features, templates, norms):
+    """(hands, templates) squared Euclidean distances with one matrix product"""
+    return (features ** 2).sum(axis=1)[:, None] - 2.0 * features @ templates.T + norms
+
+
+def examples_from_recording(recording):
+    """(points (n, 21, 3), handedness) of every hand in every frame of a LandmarkRecording"""
+    points, handedness = [], []
+    for index in range(len(recording)):
+        batch = recording.batch(index)
+        if batch is not None:
+            points.append(batch.points)
+            handedness.extend(batch.handedness)
+    if not points:
+        return np.zeros((0, NUM_LANDMARKS, 3), np.float32), []
+    return np.concatenate(points), handedness
+
+
+if __name__ == '__main__':
+    from landmark_recording import LandmarkRecording
+
+    parser = argparse.ArgumentParser(description="Train a gesture classifier from landmark recordings")
+    parser.add_argument('output', help="Model file to write (.npz)")
+    parser.add_argument('examples', nargs='+', metavar='GESTURE=RECORDING',
+                        help="A recording of one gesture, e.g. fist=fist.glmk")
+    parser.add_argument('--k', type=int, default=5, help="Neighbours that vote")
+    parser.add_argument('--per-class', type=int, default=200, help="Templates kept per gesture")
+    args = parser.parse_args()
+
+    examples = {}
+    for spec in args.examples:
+        name, _, path = spec.partition('=')
+        points, handedness = examples_from_recording(LandmarkRecording(path))
+        if name in examples:  # Several recordings of the same gesture
+            points = np.concatenate([examples[name][0], points])
+            handedness = examples[name][1] + handedness
+        examples[name] = (points, handedness)
+    classifier = GestureClassifier.fit(examples, args.k, args.per_class)
+    classifier.save(args.output)
+    for label, name in enumerate(classifier.classes):
+        print(f"{name}: {int((classifier.labels == label).sum())} templates")
+    print(f"Max distance {classifier.max_distance:.3f}, written to {args.output}")
@@ -1,269 +1,173 @@
-import cv2
-import mediapipe as mp
-import pyautogui
-import math
-import win32gui
-import time
-import numpy as np
-from threading import Thread
-import queue
+import argparse
 import os
-import win32clipboard
+from landmarks import gestures
+from gesture_classifier import GestureClassifier
+from gesture_events import MOVE, PRESS, RELEASE
+from engine import GestureEngine
+from actuator import Actuator
+from remote import DEFAULT_ACTUATOR_PORT, ActuatorServer, RemoteActuator
+from macros import FUNCTIONS, MacroServices, default_variables, load_macros
+from metrics import MetricsExporter, PipelineMetrics
+from control import DEFAULT_CONTROL_PORT, RunControl
+from app_actions import CONFIG_DIR, AppActions
 
-# Initialize MediaPipe
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(
+# MediaPipe settings, the graph itself is built by the engine's warm-up
+HANDS_OPTIONS = dict(
     static_image_mode=False,
     max_num_hands=1,
     min_detection_confidence=0.5,
     min_tracking_confidence=0.5
 )
-mp_draw = mp.solutions.drawing_utils
 
-# Add this class for threaded webcam reading
-class WebcamVideoStream:
-    def __init__(self, src=0):
-        self.stream = cv2.VideoCapture(src)
-        self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.stopped = False
-        self.queue = queue.Queue(maxsize=2)
-        
-    def start(self):
-        Thread(target=self._update, args=()).start()
-        return self
-        
-    def _update(self):
-        while True:
-            if self.stopped:
-                return
-            if not self.queue.full():
-                ret, frame = self.stream.read()
-                if ret:
-                    self.queue.put(frame)
-                    
-    def read(self):
-        return self.queue.get()
-        
-    def stop(self):
-        self.stopped = True
-
-# Replace the webcam initialization with:
-cap = WebcamVideoStream(src=0).start()
-screen_width, screen_height = pyautogui.size()
-pyautogui.FAILSAFE = False
-
-# Smoothing factor for cursor movement
-smoothing = 0.5
-prev_x, prev_y = 0, 0
-
-# Add variables to track states
-save_dialog_active = False
-last_gesture_time = 0
-GESTURE_COOLDOWN = 1.0  # Reduced cooldown time for smoother response
-last_skip_time = 0
-SKIP_COOLDOWN = 0.8  # Specific cooldown for YouTube skip
+# Input backend, window cache and per-app gesture actions, created in main()
+actuator = None
+DEFAULT_ACTIONS_CONFIG = os.path.join(CONFIG_DIR, 'gesture_control_actions.json')
+DEFAULT_MACROS_CONFIG = os.path.join(CONFIG_DIR, 'gesture_control_macros.json')
 
 def get_active_window_title():
-    """Get the title of the currently active window"""
-    window = win32gui.GetForegroundWindow()
-    return win32gui.GetWindowText(window)
+    """Get the title of the currently active window (lower case, from the cache)"""
+    return actuator.windows.active.title
 
-def calculate_distance(point1, point2):
-    """Calculate distance between two points"""
-    return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
+def click_action(ctx):
+    """Click once per fist, the gesture state machine keeps a held fist from repeating"""
+    actuator.input.click()
 
-def is_fist(hand_landmarks):
-    """Detect if hand is making a fist gesture"""
-    fingers_folded = True
-    finger_tips = [8, 12, 16, 20]  # Index, Middle, Ring, Pinky tip points
-    finger_bases = [5, 9, 13, 17]  # Corresponding base points
-    
-    for tip, base in zip(finger_tips, finger_bases):
-        if hand_landmarks.landmark[tip].y < hand_landmarks.landmark[base].y:
-            fingers_folded = False
-            break
-    return fingers_folded
+def handle_event(event):
+    """Queue the action for a gesture event, on the tracking or actuator server thread"""
+    if event.gesture == 'pinch':
+        # The cursor follows the index tip, so holding the button drags
+        if event.kind == PRESS:
+            actuator.start_drag()
+        elif event.kind == RELEASE:
+            actuator.end_drag()
+    elif event.gesture == 'scroll':
+        if event.kind == MOVE:
+            actuator.scroll(event.value)
+    elif event.kind != PRESS:
+        return
+    elif event.gesture == 'fist':
+        actuator.submit('click', click_action)
+    elif event.gesture == 'thumbs_up':
+        # Rules from config/gesture_control_actions.json, matched against the cached window
+        actuator.app_action(event.gesture)
+    # Swipes stay unbound: the only hand tracked also moves the cursor, and a
+    # quick open-palm sweep of it is a swipe (hand_tracker.py swipes with the other hand)
 
-def is_thumbs_up(hand_landmarks):
-    """Detect if hand is making a thumbs up gesture"""
-    thumb_tip = hand_landmarks.landmark[4]
-    thumb_base = hand_landmarks.landmark[2]
-    index_tip = hand_landmarks.landmark[8]
-    
-    # Check if thumb is extended upward and other fingers are folded
-    return (thumb_tip.y < thumb_base.y and 
-            all(hand_landmarks.landmark[i].y > hand_landmarks.landmark[i-2].y 
-                for i in [8, 12, 16, 20]))
+def load_gesture_macros(path):
+    """Macros the actions config can name, acting through the actuator"""
+    actuator.macros = load_macros(path, MacroServices(actuator.input, actuator.windows),
+                                  FUNCTIONS, default_variables())
 
-def get_clipboard_text():
-    """Get text from clipboard"""
+def serve_actuator(args):
+    """Apply the gestures a vision producer on another machine sends, no camera here"""
+    global actuator
+    actuator = Actuator(app_actions=AppActions.load(args.actions_config)).prepare()
+    load_gesture_macros(args.macros_config)
+    server = ActuatorServer(actuator, handle_event, args.serve_actuator).start()
+    stop = RunControl().install_signal_handlers()
+    print(f"Waiting for a vision producer on {server.address}, Ctrl+C to quit")
     try:
-        win32clipboard.OpenClipboard()
-        try:
-            text = win32clipboard.GetClipboardData(win32clipboard.CF_TEXT)
-            return text.decode('utf-8')
-        except:
-            return ""
-        finally:
-            win32clipboard.CloseClipboard()
-    except:
-        return ""
+        while not stop.wait(0.5):
+            pass
+    finally:
+        stop.restore_signal_handlers()
+        server.stop()
+        actuator.close()
 
-def handle_thumbs_up_action():
-    """Handle thumbs up gesture based on active window"""
-    global save_dialog_active, last_gesture_time, last_skip_time
+def main():
+    global actuator
+    
+    parser = argparse.ArgumentParser(description="Control the desktop with hand gestures")
+    parser.add_argument('source', nargs='*', default=[0],
+                        help="Camera index, video file or image directory (default: camera 0); "
+                             "several are tracked at once, each hand taken from the best one")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="Run capture and inference in separate processes")
+    parser.add_argument('--roi', action='store_true',
+                        help="Run inference on a downscaled crop around the hand once it is found")
+    parser.add_argument('--latency-budget', type=float, metavar='MS',
+                        help="Trade tracking quality for staying within this many ms per frame")
+    parser.add_argument('--predict', action='store_true',
+                        help="Lead the cursor along the hand's motion by the measured latency")
+    parser.add_argument('--headless', action='store_true',
+                        help="No preview window; stop with Ctrl+C, Ctrl+Alt+Q or 'python control.py stop'")
+    parser.add_argument('--preview-fps', type=float, default=15.0,
+                        help="Preview refresh rate, drawn off the tracking thread")
+    parser.add_argument('--control-port', type=int,
+                        help=f"Accept stop/status commands on this localhost port "
+                             f"(default {DEFAULT_CONTROL_PORT} when headless)")
+    parser.add_argument('--metrics-overlay', action='store_true',
+                        help="Show per-stage latency and FPS on the preview")
+    parser.add_argument('--metrics-file',
+                        help="Periodically write metrics here (.prom for Prometheus, else JSON)")
+    parser.add_argument('--record',
+                        help="Append every frame's landmarks to this recording for offline replay")
+    parser.add_argument('--actions-config', default=DEFAULT_ACTIONS_CONFIG,
+                        help="JSON file mapping applications to gesture actions")
+    parser.add_argument('--macros-config', default=DEFAULT_MACROS_CONFIG,
+                        help="JSON file declaring the macros actions can run")
+    parser.add_argument('--actuator', metavar='ADDRESS',
+                        help="Only track here and send the gestures to 'gesture_control.py "
+                             "--serve-actuator' at host:port or unix:PATH")
+    parser.add_argument('--serve-actuator', metavar='ADDRESS', nargs='?',
+                        const=str(DEFAULT_ACTUATOR_PORT),
+                        help=f"Apply gestures sent by 'gesture_control.py --actuator' instead of "
+                             f"tracking. Without ADDRESS only this machine can connect "
+                             f"(127.0.0.1:{DEFAULT_ACTUATOR_PORT}); give 0.0.0.0:PORT or an "
+                             f"interface's host:PORT for a tracker on another machine. There is "
+                             f"no authentication, whoever connects moves the mouse and types, "
+                             f"so only listen on a trusted network")
+    parser.add_argument('--gesture-model',
+                        help="Classify gestures with a model from gesture_classifier.py "
+                             "instead of the built-in rules")
+    args = parser.parse_args()
     
-    # Check cooldown to prevent accidental double gestures
-    current_time = time.time()
-    if current_time - last_gesture_time < GESTURE_COOLDOWN:
+    if args.serve_actuator:
+        serve_actuator(args)
         return
-    last_gesture_time = current_time
+    if args.gesture_model:
+        # Its classes replace the rule-based predicates of the same name
+        GestureClassifier.load(args.gesture_model).install(gestures)
+    if args.pipelined and args.latency_budget:
+        print("--latency-budget only applies without --pipelined, ignoring it")
     
-    active_window = get_active_window_title().lower()
+    metrics = PipelineMetrics(enabled=args.metrics_overlay or bool(args.metrics_file))
+    exporter = MetricsExporter(metrics, args.metrics_file).start() if args.metrics_file else None
     
-    if "youtube" in active_window:
-        # Check specific cooldown for YouTube skip
-        if current_time - last_skip_time < SKIP_COOLDOWN:
-            return
-        last_skip_time = current_time
-        
-        # Just press 'l' to skip forward 10 seconds
-        pyautogui.press('l')
-        print("Skipped forward 10 seconds!")
-        
-    elif "notepad" in active_window or "save as" in active_window:
-        if not save_dialog_active:
-            # First thumbs up: Open save dialog and prepare filename
-            print("First thumbs up detected - Opening save dialog...")
-            
-            # Select all text and copy
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(0.5)  # Increased wait for selection
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(0.5)  # Increased wait for clipboard
-            
-            # Get first line of text for filename
-            content = get_clipboard_text()
-            filename = content.split('\n')[0][:30] if content else "untitled"
-            filename = ''.join(c for c in filename if c.isalnum() or c in (' ', '-', '_')) + '.txt'
-            
-            # Open save dialog
-            pyautogui.hotkey('ctrl', 'shift', 's')
-            time.sleep(1.5)  # Increased wait for dialog
-            
-            # Navigate to Documents
-            documents_path = os.path.expanduser("~/Documents")
-            pyautogui.write(documents_path)
-            time.sleep(0.5)
-            pyautogui.press('enter')
-            time.sleep(1.0)  # Increased wait after navigation
-            
-            # Write filename
-            pyautogui.write(filename)
-            save_dialog_active = True
-            print(f"Save As dialog opened - Suggested filename: {filename}")
-            
-        else:
-            # Second thumbs up: Confirm save
-            print("Second thumbs up detected - Saving file...")
-            time.sleep(0.5)  # Increased wait before save
-            
-            # Make sure we're in the save dialog
-            active = get_active_window_title().lower()
-            if "save as" in active:
-                # Press Alt+S as a more reliable way to save
-                pyautogui.hotkey('alt', 's')
-                time.sleep(0.3)
-                
-                # Also try Enter as a backup
-                pyautogui.press('enter')
-                time.sleep(0.3)
-                
-                save_dialog_active = False
-                print("File saved successfully!")
-            else:
-                print("Save dialog not found. Please try again.")
-                save_dialog_active = False
-            
+    remote = None
+    if args.actuator:
+        # Gestures are mapped to actions on the other end, with its configs
+        remote = RemoteActuator(args.actuator)
+        engine = GestureEngine(HANDS_OPTIONS, remote.send_event, metrics=metrics,
+                               pipelined=args.pipelined, roi=args.roi, actuator=remote,
+                               predict=args.predict)
     else:
-        # Check if YouTube window exists in background
-        def callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                title = win32gui.GetWindowText(hwnd).lower()
-                if "youtube" in title:
-                    windows.append(hwnd)
-            return True
-        
-        youtube_windows = []
-        win32gui.EnumWindows(callback, youtube_windows)
-        
-        if youtube_windows:
-            # Check specific cooldown for YouTube skip
-            if current_time - last_skip_time < SKIP_COOLDOWN:
-                return
-            last_skip_time = current_time
-            
-            current_window = win32gui.GetForegroundWindow()
-            win32gui.SetForegroundWindow(youtube_windows[0])
-            time.sleep(0.2)  # Reduced delay
-            
-            # Just press 'l' to skip
-            pyautogui.press('l')
-            print("Skipped forward 10 seconds (background window)!")
-            
-            time.sleep(0.2)  # Reduced delay
-            win32gui.SetForegroundWindow(current_window)
-
-try:
-    while True:
-        img = cap.read()
-        if img is None:
-            continue
-            
-        # Flip the image horizontally
-        img = cv2.flip(img, 1)
-        
-        # Convert to RGB
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Process hand landmarks with performance flag
-        results = hands.process(rgb_img)
-        
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Only draw landmarks if needed (comment out if not needed)
-                # mp_draw.draw_landmarks(img, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                
-                # Get index finger tip coordinates
-                index_finger = hand_landmarks.landmark[8]
-                x = int(index_finger.x * screen_width)
-                y = int(index_finger.y * screen_height)
-                
-                # Apply smoothing
-                x = int(prev_x + (x - prev_x) * smoothing)
-                y = int(prev_y + (y - prev_y) * smoothing)
-                prev_x, prev_y = x, y
-                
-                # Move cursor
-                pyautogui.moveTo(x, y)
-                
-                # Check for fist gesture (click)
-                if is_fist(hand_landmarks):
-                    pyautogui.click()
-                    time.sleep(0.5)  # Prevent multiple clicks
-                
-                # Check for thumbs up gesture
-                if is_thumbs_up(hand_landmarks):
-                    handle_thumbs_up_action()
-        
-        # Display the image
-        cv2.imshow("Gesture Control", img)
-        
-        # Break loop with 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        actuator = Actuator(app_actions=AppActions.load(args.actions_config), metrics=metrics)
+        engine = GestureEngine(HANDS_OPTIONS, handle_event, metrics=metrics,
+                               pipelined=args.pipelined, roi=args.roi, actuator=actuator,
+                               predict=args.predict)
+    engine.headless = args.headless
+    engine.preview_fps = args.preview_fps
+    # Headless there is no 'q' to press, so listen for 'control.py stop'
+    engine.control_port = args.control_port or (DEFAULT_CONTROL_PORT if args.headless else None)
+    engine.metrics_overlay = args.metrics_overlay
+    engine.record_path = args.record
+    engine.draw_hands = False
+    if args.latency_budget:
+        engine.latency_budget = args.latency_budget / 1000
+    # MediaPipe loads in the background
+    engine.warm_up()
+    
+    try:
+        engine.wait_ready()
+        if remote is None:
+            load_gesture_macros(args.macros_config)
+        # Until the source ends, 'q' in the preview, Ctrl+C, Ctrl+Alt+Q or the control port
+        engine.run(args.source)
+    finally:
+        engine.close()
+        if exporter is not None:
+            exporter.stop()
 
-finally:
-    cap.stop()
-    cv2.destroyAllWindows() 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Debounced gesture events from noisy per-frame detections.
+
+A gesture predicate flickers at the edges: a fist that is half closed is
+seen in some frames and not others. GestureStateMachine confirms a
+gesture once it was seen in N of the last M frames, releases it only
+when it has mostly gone (hysteresis), and applies cooldowns in frame
+time, so a held fist clicks once and a replay always gives the same events.
+"""
+from collections import namedtuple
+
+from landmarks import gestures
+
+# Event kinds
+PRESS = 'press'      # The gesture was confirmed
+HOLD = 'hold'        # Still held `hold_after` seconds after the press (then every `hold_repeat`)
+RELEASE = 'release'  # The gesture went away
+MOVE = 'move'        # A held motion gesture moved, `value` says where or how far (see motion.py)
+
+# `value` is only set by motion gestures: a position or a scroll amount
+GestureEvent = namedtuple('GestureEvent', ['kind', 'gesture', 'hand', 'timestamp', 'value'])
+GestureEvent.__new__.__defaults__ = (None,)
+
+# How one gesture is debounced:
+#   confirm  - frames out of the last `window` it must be seen in to press
+#   window   - number of recent frames considered, at most 64
+#   release  - it is released once seen in at most this many of them
+#              (below `confirm`, so a flicker at the edge does not toggle it)
+#   cooldown - seconds of frame time from one press until the next can start
+#   hold_after, hold_repeat - seconds until the first HOLD and between
+#              repeats, None for no HOLD / no repeats
+GestureConfig = namedtuple('GestureConfig', ['confirm', 'window', 'release', 'cooldown',
+                                             'hold_after', 'hold_repeat'])
+GestureConfig.__new__.__defaults__ = (4, 1, 0.0, None, None)
+
+DEFAULT_GESTURES = {
+    'fist': GestureConfig(confirm=3, window=4, release=1, cooldown=0.3),
+    'thumbs_up': GestureConfig(confirm=4, window=6, release=2, cooldown=1.0),
+}
+
+
+class _State:
+    """Debounce state of one gesture on one hand"""
+
+    __slots__ = ('history', 'count', 'active', 'pressed_at', 'held_at')
+
+    def __init__(self):
+        self.history = 0       # Bit per recent frame, newest in bit 0
+        self.count = 0         # Set bits in history
+        self.active = False
+        self.pressed_at = None
+        self.held_at = None
+
+
+class GestureStateMachine:
+    """Turns per-frame gesture detections into debounced press/hold/release events.
+
+    Every hand (by handedness label) has a fixed-size state per configured
+    gesture: a bit history of its recent frames and a running count, so an
+    update is O(1) per hand and gesture. Timing uses frame timestamps only,
+    never the wall clock, so a replayed landmark stream produces exactly the
+    same events every time.
+    """
+
+    def __init__(self, configs=None, registry=gestures):
+        self.configs = dict(configs if configs is not None else DEFAULT_GESTURES)
+        for name, config in self.configs.items():
+            if not config.release < config.confirm <= config.window <= 64:
+                raise ValueError(f"Need release < confirm <= window <= 64 for {name}")
+        self.registry = registry
+        self._hands = {}  # hand key -> {gesture: _State}
+
+    def reset(self):
+        self._hands = {}
+
+    def is_active(self, gesture, hand):
+        states = self._hands.get(hand)
+        return states is not None and states[gesture].active
+
+    def update(self, batch, timestamp):
+        """Feed one frame (HandBatch or None), returns the GestureEvents it caused"""
+        seen = {}
+        detected = None
+        if batch is not None:
+            predicates = self.registry.predicates
+            detected = {name: predicates[name](batch) for name in self.configs}
+            for i, hand in enumerate(batch.handedness):
+                seen[hand if hand not in seen else f'{hand}{i}'] = i
+
+        events = []
+        for hand in list(self._hands.keys() | seen.keys()):
+            states = self._hands.get(hand)
+            if states is None:
+                states = self._hands[hand] = {name: _State() for name in self.configs}
+            i = seen.get(hand)
+            idle = True
+            for name, config in self.configs.items():
+                hit = i is not None and bool(detected[name][i])
+                state = states[name]
+                self._step(state, config, hit, name, hand, timestamp, events)
+                idle = idle and not state.active and not state.history
+            if idle and i is None:
+                del self._hands[hand]  # Hand gone and settled, drop its state
+        return events
+
+    def _step(self, state, config, hit, name, hand, timestamp, events):
+        oldest = (state.history >> (config.window - 1)) & 1
+        state.history = ((state.history << 1) | hit) & ((1 << config.window) - 1)
+        state.count += hit - oldest
+
+        if not state.active:
+            if state.count >= config.confirm and (
+                    state.pressed_at is None or timestamp - state.pressed_at >= config.cooldown):
+                state.active = True
+                state.pressed_at = timestamp
+                state.held_at = None
+                events.append(GestureEvent(PRESS, name, hand, timestamp))
+        elif state.count <= config.release:
+            state.active = False
+            events.append(GestureEvent(RELEASE, name, hand, timestamp))
+        elif config.hold_after is not None:
+            if state.held_at is None:
+                due = state.pressed_at + config.hold_after
+            elif config.hold_repeat is not None:
+                due = state.held_at + config.hold_repeat
+            else:
+                return
+            if timestamp >= due:
+                state.held_at = timestamp
+                events.append(GestureEvent(HOLD, name, hand, timestamp))
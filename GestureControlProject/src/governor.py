@@ -0,0 +1,125 @@
+from collections import namedtuple
+
+from metrics import PipelineMetrics
+
+# One quality setting: MediaPipe model complexity, capture resolution, most
+# hands tracked, and run inference on every `skip`-th frame
+QualityLevel = namedtuple('QualityLevel',
+                          ['model_complexity', 'width', 'height', 'max_hands', 'skip'])
+
+# Best quality first; each step gives up the least noticeable thing left
+DEFAULT_LEVELS = [
+    QualityLevel(1, 640, 480, 2, 1),
+    QualityLevel(0, 640, 480, 2, 1),
+    QualityLevel(0, 480, 360, 2, 1),
+    QualityLevel(0, 320, 240, 2, 1),
+    QualityLevel(0, 320, 240, 1, 1),
+    QualityLevel(0, 320, 240, 1, 2),
+    QualityLevel(0, 320, 240, 1, 3),
+]
+
+
+class PerformanceGovernor:
+    """Steps tracking quality down or up to keep per-frame cost within a budget.
+
+    observe() is fed the measured cost of every processed frame. The cost,
+    spread over the frames skipped for it, is smoothed and compared with the
+    budget: above `slow` x budget for `patience` frames in a row drops one
+    level, below `fast` x budget for `recover_patience` frames climbs one.
+    The gap between the thresholds and the longer wait before climbing keep
+    it from flapping. After `idle_after` seconds without a hand, only one
+    frame every `idle_interval` seconds is processed until a hand shows up.
+
+    Decisions are published as metrics gauges (governor_level, model_complexity,
+    capture_width, capture_height, max_hands, frame_skip, idle, governor_load_ms)
+    and the governor_steps_down / governor_steps_up counters.
+    """
+
+    def __init__(self, budget=1 / 30, levels=None, start=0, slow=1.0, fast=0.6,
+                 patience=30, recover_patience=150, settle=15, idle_after=3.0,
+                 idle_interval=0.25, metrics=None):
+        self.budget = budget  # Seconds per camera frame
+        self.levels = list(levels if levels is not None else DEFAULT_LEVELS)
+        self.index = min(start, len(self.levels) - 1)
+        self.slow = slow
+        self.fast = fast
+        self.patience = patience
+        self.recover_patience = recover_patience
+        self.settle = settle  # Frames ignored after a change, e.g. while the graph is rebuilt
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self.load = 0.0       # Smoothed cost per camera frame, seconds
+        self.idle = False
+        self._over = 0
+        self._under = 0
+        self._ignore = 0
+        self._skipped = 0
+        self._last_hand = None
+        self._last_processed = None
+        self._publish()
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def should_process(self, timestamp):
+        """Whether the frame captured at `timestamp` should go through inference"""
+        if self.idle:
+            if self._last_processed is not None and timestamp - self._last_processed < self.idle_interval:
+                return False
+        elif self._skipped + 1 < self.level.skip:
+            self._skipped += 1
+            return False
+        self._skipped = 0
+        self._last_processed = timestamp
+        return True
+
+    def observe(self, seconds, hand_seen, timestamp):
+        """Feed the cost of one processed frame, returns True when the level changed"""
+        if hand_seen or self._last_hand is None:
+            self._last_hand = timestamp
+        idle = timestamp - self._last_hand >= self.idle_after
+        if idle != self.idle:
+            self.idle = idle
+            self.metrics.set_gauge('idle', int(idle))
+        if idle:
+            return False  # Scanning for a hand is cheap, nothing to judge
+        if self._ignore:
+            self._ignore -= 1
+            return False
+
+        self.load += 0.1 * (seconds / self.level.skip - self.load)
+        self.metrics.set_gauge('governor_load_ms', round(self.load * 1000, 2))
+        if self.load > self.budget * self.slow:
+            self._over += 1
+            self._under = 0
+        elif self.load < self.budget * self.fast:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.patience and self.index < len(self.levels) - 1:
+            self.index += 1
+            self.metrics.increment('governor_steps_down')
+        elif self._under >= self.recover_patience and self.index > 0:
+            self.index -= 1
+            self.metrics.increment('governor_steps_up')
+        else:
+            return False
+        self._over = self._under = 0
+        self._ignore = self.settle
+        self._publish()
+        return True
+
+    def _publish(self):
+        level = self.level
+        metrics = self.metrics
+        metrics.set_gauge('governor_level', self.index)
+        metrics.set_gauge('model_complexity', level.model_complexity)
+        metrics.set_gauge('capture_width', level.width)
+        metrics.set_gauge('capture_height', level.height)
+        metrics.set_gauge('max_hands', level.max_hands)
+        metrics.set_gauge('frame_skip', level.skip)
+        metrics.set_gauge('idle', int(self.idle))
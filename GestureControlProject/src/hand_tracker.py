@@ -1,79 +1,167 @@
-import cv2
-import mediapipe as mp
-import pyautogui
-import numpy as np
-import sys
-import tkinter as tk
-from tkinter import messagebox
-import win32gui
-import time
-from threading import Thread
-import queue
+import argparse
+import os
+try:
+    import tkinter as tk
+    from tkinter import messagebox
+except ImportError:  # Only the start menu needs Tk, see HandTracker
+    tk = messagebox = None
+from landmarks import gestures
+from gesture_classifier import GestureClassifier
+from gesture_events import MOVE, PRESS, RELEASE
+from engine import GestureEngine
+from metrics import MetricsExporter, PipelineMetrics
+from control import DEFAULT_CONTROL_PORT
+from app_actions import CONFIG_DIR, AppActions
+
+# MediaPipe settings, the graph is built in the background while the menu shows
+HANDS_OPTIONS = dict(
+    min_detection_confidence=0.7,
+    min_tracking_confidence=0.7,
+    max_num_hands=2  # Allow detection of both hands
+)
+
+# Thumbs-up actions per application
+DEFAULT_ACTIONS_CONFIG = os.path.join(CONFIG_DIR, 'hand_tracker_actions.json')
 
 class CameraStream:
-    def __init__(self):
-        self.stream = None
-        self.stopped = False
-        self.frame_queue = queue.Queue(maxsize=2)
-        self.available_cameras = self.list_cameras()
+    """Picks the camera to track, the engine captures from it"""
+
+    def __init__(self, source=None):
+        self.source = source  # Optional FrameSource (or list of them) used instead of a camera
+        self.discovery = None
+        if source is None:
+            from camera_discovery import CameraDiscovery
+            # Cameras are probed in the background, see discover()
+            self.discovery = CameraDiscovery()
+        
+    @property
+    def available_cameras(self):
+        """Indexes of the cameras found so far (cached ones while probing)"""
+        if self.discovery is None:
+            return []
+        return [info.index for info in self.discovery.candidates]
+        
+    def discover(self):
+        """Start probing cameras in the background"""
+        if self.discovery is not None:
+            self.discovery.start()
         
     def list_cameras(self):
-        """List all available cameras"""
-        available = []
-        for i in range(10):  # Check first 10 indexes
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)  # Use DirectShow
-            if cap.isOpened():
-                ret, _ = cap.read()
-                if ret:
-                    available.append(i)
-                cap.release()
-        return available
+        """List all available cameras, waiting for discovery to finish"""
+        self.discover()
+        return [info.index for info in self.discovery.wait()]
     
-    def start(self, camera_index=0):
-        """Start camera stream"""
-        if not self.available_cameras:
-            raise Exception("No cameras found!")
+    def resolve_source(self, camera_index=0):
+        """Pick the FrameSource to capture from, without opening it"""
+        if self.source is not None:
+            return self.source
+        from frame_sources import CameraSource
             
-        if camera_index not in self.available_cameras:
-            camera_index = self.available_cameras[0]
-            
-        self.stream = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-        self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # Only blocks when the chosen camera has not been verified yet
+        self.discover()
+        info = self.discovery.wait_for(camera_index)
+        if info is None:
+            cameras = self.discovery.wait()
+            if not cameras:
+                raise Exception("No cameras found!")
+            info = cameras[0]
+        return CameraSource(info.index, info.backend)
+    
+    def resolve_sources(self, count):
+        """FrameSources of up to `count` cameras to track at once, waiting for discovery"""
+        if self.source is not None:
+            return self.source
+        from frame_sources import CameraSource
         
-        if not self.stream.isOpened():
-            raise Exception(f"Failed to open camera {camera_index}")
-            
-        self.stopped = False
-        Thread(target=self._update, args=()).start()
-        return self
+        self.discover()
+        cameras = self.discovery.wait()
+        if not cameras:
+            raise Exception("No cameras found!")
+        return [CameraSource(info.index, info.backend) for info in cameras[:count]]
+
+class HandTracker:
+    """Camera, engine and gesture actions of the hand tracker, no Tk needed.
+
+    track() runs one session; HandTrackerUI adds the start menu around it.
+    """
+
+    def __init__(self, source=None, input_backend=None, pipelined=False, metrics=None,
+                 roi=False, windows=None, actions_config=DEFAULT_ACTIONS_CONFIG):
+        self.cameras = 1  # Cameras tracked at once, hands are taken from the one that sees them best
+        self.camera = CameraStream(source)  # Initialize camera handler
         
-    def _update(self):
-        """Update frames in background thread"""
-        while True:
-            if self.stopped:
+        # Tracking, gesture events and their actions; the cursor follows the right hand.
+        # Windows may be a FakeWindows platform in tests, session options are set on it
+        self.engine = GestureEngine(HANDS_OPTIONS, self.handle_event, cursor_hand='Right',
+                                    input_backend=input_backend, metrics=metrics,
+                                    windows=windows, app_actions=AppActions.load(actions_config),
+                                    pipelined=pipelined, roi=roi)
+        self.engine.preview_title = 'Hand Tracking'
+        self.engine.annotate = self.annotate_preview
+
+    def get_active_window_title(self):
+        """Get the title of the currently active window (lower case, from the cache)"""
+        return self.engine.actuator.windows.active.title
+
+    def click_action(self, ctx):
+        """Click with the left hand's fist, runs on the action thread"""
+        self.engine.actuator.input.click()
+        print("Click triggered!")
+
+    def handle_event(self, event):
+        """Right hand: thumbs up and pinch to drag; left hand: fist, scrolling and swipes.
+
+        Called on the tracking thread, the actions are only queued.
+        """
+        actuator = self.engine.actuator
+        if event.hand == 'Right':
+            if event.gesture == 'pinch':
+                if event.kind == PRESS:
+                    actuator.start_drag()
+                elif event.kind == RELEASE:
+                    actuator.end_drag()
+            elif event.gesture == 'thumbs_up' and event.kind == PRESS:
+                # YouTube: like, Notepad: save, browsers: bookmark, Explorer: copy (see the config)
+                actuator.app_action('thumbs_up')
+        elif event.hand == 'Left':
+            if event.gesture == 'scroll':
+                if event.kind == MOVE:
+                    actuator.scroll(event.value)
+            elif event.kind != PRESS:
                 return
-            
-            if not self.frame_queue.full():
-                ret, frame = self.stream.read()
-                if ret:
-                    self.frame_queue.put(frame)
-                    
-    def read(self):
-        """Read frame from queue"""
-        return self.frame_queue.get() if not self.frame_queue.empty() else None
-        
-    def stop(self):
-        """Stop camera stream"""
-        self.stopped = True
-        if self.stream:
-            self.stream.release()
-        while not self.frame_queue.empty():
-            self.frame_queue.get()
+            elif event.gesture == 'fist':
+                actuator.submit('click', self.click_action)
+            elif event.gesture.startswith('swipe_'):
+                actuator.app_action(event.gesture)
+
+    def track(self):
+        """Track until the session ends, reusing the hand model if it is loaded already"""
+        if self.cameras > 1:
+            self.engine.run(self.camera.resolve_sources(self.cameras))
+        else:
+            self.engine.run(self.camera.resolve_source())
+
+    def annotate_preview(self, frame):
+        """Status text and camera info, drawn on the preview thread"""
+        import cv2
+        cv2.putText(frame, "Press 'Q' to return to menu", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Camera: {self.camera.available_cameras}", 
+                   (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
-class HandTrackerUI:
-    def __init__(self):
-        self.root = tk.Tk()
+
+class HandTrackerUI(HandTracker):
+    """HandTracker behind a start menu; RuntimeError where Tk or a display is missing"""
+
+    def __init__(self, source=None, input_backend=None, pipelined=False, metrics=None,
+                 roi=False, windows=None, actions_config=DEFAULT_ACTIONS_CONFIG):
+        if tk is None:
+            raise RuntimeError("The start menu needs tkinter")
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as e:
+            raise RuntimeError(f"No display for the start menu: {e}") from e
+        super().__init__(source, input_backend, pipelined, metrics, roi, windows, actions_config)
         self.root.title("Hand Gesture Control")
         
         # Set window size and position it in center
@@ -101,11 +189,13 @@ class HandTrackerUI:
             'pady': 10
         }
         
-        self.camera = CameraStream()  # Initialize camera handler
-        
         # Create and pack widgets
         self.create_widgets()
         
+        # Probe cameras and load the hand model once the window is up instead of before it appears
+        self.root.after(100, self.camera.discover)
+        self.root.after(100, self.engine.warm_up)
+        
     def create_widgets(self):
         # Title Label with bigger font and padding
         title_label = tk.Label(
@@ -123,7 +213,10 @@ class HandTrackerUI:
             text="Use hand gestures to control your computer\n\n" +
                  "Right hand: Move cursor with index finger\n" +
                  "Right hand: Thumbs up for context actions\n" +
-                 "Left hand: Make a fist to click",
+                 "Right hand: Pinch thumb and index to drag\n" +
+                 "Left hand: Make a fist to click\n" +
+                 "Left hand: Two fingers up, move up or down to scroll\n" +
+                 "Left hand: Swipe an open palm for context actions",
             font=("Arial", 12),  # Increased font size
             bg='black',
             fg='#FFFFFF',  # Bright white color
@@ -203,7 +296,7 @@ class HandTrackerUI:
         
     def stop_tracking(self):
         self.tracking = False
-        self.camera.stop()  # Stop camera when tracking stops
+        self.engine.stop(wait=False)
         self.start_button.config(
             state=tk.NORMAL,
             bg='#00CC00'
@@ -214,122 +307,73 @@ class HandTrackerUI:
         )
         self.root.deiconify()
 
-    def get_active_window_title(self):
-        """Get the title of the currently active window"""
-        window = win32gui.GetForegroundWindow()
-        return win32gui.GetWindowText(window)
-
-    def is_thumbs_up(self, hand_landmarks):
-        """Detect if hand is making a thumbs up gesture"""
-        thumb_tip = hand_landmarks.landmark[4]
-        thumb_base = hand_landmarks.landmark[2]
-        
-        # Check if thumb is extended upward and other fingers are folded
-        return (thumb_tip.y < thumb_base.y and 
-                all(hand_landmarks.landmark[i].y > hand_landmarks.landmark[i-2].y 
-                    for i in [8, 12, 16, 20]))
-
-    def handle_thumbs_up_action(self):
-        """Handle thumbs up gesture based on active window"""
-        active_window = self.get_active_window_title().lower()
-        
-        if "youtube" in active_window:
-            pyautogui.press('l')  # Like the video
-        elif "notepad" in active_window:
-            pyautogui.hotkey('ctrl', 's')  # Save the file
-        elif "chrome" in active_window or "firefox" in active_window:
-            pyautogui.hotkey('ctrl', 'd')  # Bookmark page
-        elif "explorer" in active_window:
-            pyautogui.hotkey('ctrl', 'c')  # Copy selected file
-        time.sleep(1)  # Prevent multiple actions
-
     def run_hand_tracker(self):
-        mp_hands = mp.solutions.hands
-        mp_drawing = mp.solutions.drawing_utils
-        screen_width, screen_height = pyautogui.size()
-
+        """Track until the session ends, reusing the hand model loaded in the background"""
         try:
-            # Start camera stream
-            self.camera.start()
+            self.track()
         except Exception as e:
             messagebox.showerror("Camera Error", str(e))
-            self.stop_tracking()
-            return
-
-        with mp_hands.Hands(
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7,
-            max_num_hands=2  # Allow detection of both hands
-        ) as hands:
-            while self.tracking:
-                frame = self.camera.read()
-                if frame is None:
-                    continue
-
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = hands.process(rgb_frame)
-
-                if results.multi_hand_landmarks:
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        handedness = results.multi_handedness[
-                            results.multi_hand_landmarks.index(hand_landmarks)
-                        ].classification[0].label
-                        
-                        index_finger_tip = hand_landmarks.landmark[8]
-                        
-                        if handedness == 'Right':
-                            # Move cursor with right hand
-                            x = int(index_finger_tip.x * screen_width)
-                            y = int(index_finger_tip.y * screen_height)
-                            pyautogui.moveTo(x, y, duration=0.1)
-                            
-                            # Check for thumbs up gesture with right hand
-                            if self.is_thumbs_up(hand_landmarks):
-                                self.handle_thumbs_up_action()
-                            
-                        if handedness == 'Left':
-                            # Check for fist gesture
-                            if self.is_fist(hand_landmarks):
-                                pyautogui.click()
-                                print("Click triggered!")
-                                
-                        mp_drawing.draw_landmarks(
-                            frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-
-                # Add status text and camera info to frame
-                cv2.putText(frame, "Press 'Q' to return to menu", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(frame, f"Camera: {self.camera.available_cameras}", 
-                           (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-                cv2.imshow('Hand Tracking', frame)
-
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    self.tracking = False
-                    break
-
-        self.camera.stop()
-        cv2.destroyAllWindows()
         self.stop_tracking()
-        
-    def is_fist(self, hand_landmarks):
-        thumb = hand_landmarks.landmark[4]
-        index_finger = hand_landmarks.landmark[8]
-        middle_finger = hand_landmarks.landmark[12]
-        ring_finger = hand_landmarks.landmark[16]
-        pinky_finger = hand_landmarks.landmark[20]
 
-        return (thumb.y > hand_landmarks.landmark[3].y and
-                index_finger.y > hand_landmarks.landmark[6].y and
-                middle_finger.y > hand_landmarks.landmark[10].y and
-                ring_finger.y > hand_landmarks.landmark[14].y and
-                pinky_finger.y > hand_landmarks.landmark[18].y)
-    
     def run(self):
         self.root.mainloop()
 
 if __name__ == "__main__":
-    app = HandTrackerUI()
-    app.run() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Hand gesture control with a start menu")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="Run capture and inference in separate processes")
+    parser.add_argument('--roi', action='store_true',
+                        help="Run inference on a downscaled crop around the hands once they are found")
+    parser.add_argument('--cameras', type=int, default=1,
+                        help="Track this many cameras at once, each in its own processes")
+    parser.add_argument('--latency-budget', type=float, metavar='MS',
+                        help="Trade tracking quality for staying within this many ms per frame")
+    parser.add_argument('--predict', action='store_true',
+                        help="Lead the cursor along the hand's motion by the measured latency")
+    parser.add_argument('--headless', action='store_true',
+                        help="No preview window; stop with Ctrl+C, Ctrl+Alt+Q or 'python control.py stop'")
+    parser.add_argument('--preview-fps', type=float, default=15.0,
+                        help="Preview refresh rate, drawn off the tracking thread")
+    parser.add_argument('--control-port', type=int,
+                        help=f"Accept stop/status commands on this localhost port "
+                             f"(default {DEFAULT_CONTROL_PORT} when headless)")
+    parser.add_argument('--actions-config', default=DEFAULT_ACTIONS_CONFIG,
+                        help="JSON file mapping applications to gesture actions")
+    parser.add_argument('--metrics-overlay', action='store_true',
+                        help="Show per-stage latency and FPS on the preview")
+    parser.add_argument('--metrics-file',
+                        help="Periodically write metrics here (.prom for Prometheus, else JSON)")
+    parser.add_argument('--record',
+                        help="Append every frame's landmarks to this recording for offline replay")
+    parser.add_argument('--gesture-model',
+                        help="Classify gestures with a model from gesture_classifier.py "
+                             "instead of the built-in rules")
+    args = parser.parse_args()
+    
+    if args.gesture_model:
+        # Its classes replace the rule-based predicates of the same name
+        GestureClassifier.load(args.gesture_model).install(gestures)
+    if args.latency_budget and (args.pipelined or args.cameras > 1):
+        # Only the inline tracker has a governor
+        print("--latency-budget only applies without --pipelined and with one camera, ignoring it")
+        args.latency_budget = None
+    metrics = PipelineMetrics(enabled=args.metrics_overlay or bool(args.metrics_file))
+    exporter = MetricsExporter(metrics, args.metrics_file).start() if args.metrics_file else None
+    app = HandTrackerUI(pipelined=args.pipelined, metrics=metrics, roi=args.roi,
+                        actions_config=args.actions_config)
+    app.cameras = args.cameras
+    app.engine.metrics_overlay = args.metrics_overlay
+    app.engine.record_path = args.record
+    app.engine.headless = args.headless
+    app.engine.predict = args.predict
+    app.engine.preview_fps = args.preview_fps
+    # Headless there is no 'q' to press, so listen for 'control.py stop'
+    app.engine.control_port = args.control_port or (DEFAULT_CONTROL_PORT if args.headless else None)
+    if args.latency_budget:
+        app.engine.latency_budget = args.latency_budget / 1000
+    try:
+        app.run()
+    finally:
+        app.engine.close()
+        if exporter is not None:
+            exporter.stop() 
\ No newline at end of file
@@ -0,0 +1,314 @@
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from metrics import PipelineMetrics
+
+# One injected input event as logged by RecordingBackend. `timestamp` is when
+# it was injected and `source_timestamp` the capture time of the frame that
+# caused it (both time.perf_counter() seconds), when known.
+InputEvent = namedtuple('InputEvent', ['timestamp', 'kind', 'args', 'source_timestamp'])
+
+
+class InputBackend:
+    """Interface for injecting cursor moves, clicks and key presses.
+
+    `timestamp` on move_to is the capture time of the frame the position was
+    computed from; real backends ignore it, RecordingBackend logs it.
+    """
+
+    def screen_size(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y, timestamp=None):
+        raise NotImplementedError
+
+    def click(self, button='left'):
+        raise NotImplementedError
+
+    def mouse_down(self, button='left'):
+        raise NotImplementedError
+
+    def mouse_up(self, button='left'):
+        raise NotImplementedError
+
+    def scroll(self, clicks):
+        """Scroll the wheel, positive clicks scroll up"""
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def write(self, text):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui without its 100 ms pause after every call and without tweening"""
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+        pyautogui.PAUSE = 0
+        pyautogui.FAILSAFE = False
+
+    def screen_size(self):
+        return tuple(self.pyautogui.size())
+
+    def move_to(self, x, y, timestamp=None):
+        self.pyautogui.moveTo(x, y)
+
+    def click(self, button='left'):
+        self.pyautogui.click(button=button)
+
+    def mouse_down(self, button='left'):
+        self.pyautogui.mouseDown(button=button)
+
+    def mouse_up(self, button='left'):
+        self.pyautogui.mouseUp(button=button)
+
+    def scroll(self, clicks):
+        self.pyautogui.scroll(clicks)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self.pyautogui.hotkey(*keys)
+
+    def write(self, text):
+        self.pyautogui.write(text)
+
+
+class Win32Backend(PyAutoGUIBackend):
+    """Moves and clicks through the Win32 API directly, keys go through pyautogui"""
+
+    def __init__(self):
+        super().__init__()
+        import win32api
+        import win32con
+        self.win32api = win32api
+        self.win32con = win32con
+
+    def screen_size(self):
+        return (self.win32api.GetSystemMetrics(self.win32con.SM_CXSCREEN),
+                self.win32api.GetSystemMetrics(self.win32con.SM_CYSCREEN))
+
+    def move_to(self, x, y, timestamp=None):
+        self.win32api.SetCursorPos((int(x), int(y)))
+
+    def _buttons(self, button):
+        if button == 'right':
+            return self.win32con.MOUSEEVENTF_RIGHTDOWN, self.win32con.MOUSEEVENTF_RIGHTUP
+        return self.win32con.MOUSEEVENTF_LEFTDOWN, self.win32con.MOUSEEVENTF_LEFTUP
+
+    def click(self, button='left'):
+        down, up = self._buttons(button)
+        self.win32api.mouse_event(down, 0, 0, 0, 0)
+        self.win32api.mouse_event(up, 0, 0, 0, 0)
+
+    def mouse_down(self, button='left'):
+        self.win32api.mouse_event(self._buttons(button)[0], 0, 0, 0, 0)
+
+    def mouse_up(self, button='left'):
+        self.win32api.mouse_event(self._buttons(button)[1], 0, 0, 0, 0)
+
+    def scroll(self, clicks):
+        self.win32api.mouse_event(self.win32con.MOUSEEVENTF_WHEEL, 0, 0,
+                                  clicks * self.win32con.WHEEL_DELTA, 0)
+
+
+class XTestBackend(PyAutoGUIBackend):
+    """Moves and clicks through the X11 XTest extension, keys go through pyautogui"""
+
+    BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+    def __init__(self):
+        super().__init__()
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.xtest = xtest
+        self.display = display.Display()
+        screen = self.display.screen()
+        self._size = (screen.width_in_pixels, screen.height_in_pixels)
+
+    def screen_size(self):
+        return self._size
+
+    def move_to(self, x, y, timestamp=None):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+        self.display.flush()
+
+    def click(self, button='left'):
+        detail = self.BUTTONS.get(button, 1)
+        self.xtest.fake_input(self.display, self.X.ButtonPress, detail)
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, detail)
+        self.display.flush()
+
+    def mouse_down(self, button='left'):
+        self.xtest.fake_input(self.display, self.X.ButtonPress, self.BUTTONS.get(button, 1))
+        self.display.flush()
+
+    def mouse_up(self, button='left'):
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, self.BUTTONS.get(button, 1))
+        self.display.flush()
+
+    def scroll(self, clicks):
+        # Buttons 4 and 5 are the wheel, one press and release per click
+        detail = 4 if clicks > 0 else 5
+        for _ in range(abs(clicks)):
+            self.xtest.fake_input(self.display, self.X.ButtonPress, detail)
+            self.xtest.fake_input(self.display, self.X.ButtonRelease, detail)
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(InputBackend):
+    """Fake backend that logs timestamped events instead of injecting them"""
+
+    def __init__(self, screen_size=(1920, 1080)):
+        self._size = screen_size
+        self.events = []
+        self._lock = threading.Lock()
+
+    def _log(self, kind, args, source_timestamp=None):
+        with self._lock:
+            self.events.append(InputEvent(time.perf_counter(), kind, args, source_timestamp))
+
+    def screen_size(self):
+        return self._size
+
+    def move_to(self, x, y, timestamp=None):
+        self._log('move', (int(x), int(y)), timestamp)
+
+    def click(self, button='left'):
+        self._log('click', (button,))
+
+    def mouse_down(self, button='left'):
+        self._log('mouse_down', (button,))
+
+    def mouse_up(self, button='left'):
+        self._log('mouse_up', (button,))
+
+    def scroll(self, clicks):
+        self._log('scroll', (clicks,))
+
+    def press(self, key):
+        self._log('press', (key,))
+
+    def hotkey(self, *keys):
+        self._log('hotkey', keys)
+
+    def write(self, text):
+        self._log('write', (text,))
+
+    def count(self, kind):
+        """Number of logged events of one kind"""
+        with self._lock:
+            return sum(1 for event in self.events if event.kind == kind)
+
+    def latencies(self, kind='move'):
+        """Seconds from frame capture to injection for events that carry a source timestamp"""
+        with self._lock:
+            return [event.timestamp - event.source_timestamp for event in self.events
+                    if event.kind == kind and event.source_timestamp is not None]
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+
+class CoalescingCursor:
+    """Applies only the latest requested cursor position on a worker thread.
+
+    The vision loop calls move_to() and returns immediately; if several
+    updates arrive while the backend is still busy, only the newest one is
+    injected.
+    """
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False  # A position is being applied
+        self._stopped = False
+        self.coalesced = 0
+        self.latency = None  # Capture-to-actuation seconds of the last applied move
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def move_to(self, x, y, timestamp=None):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (x, y, timestamp)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._pending is not None)
+                if self._stopped:
+                    return
+                x, y, timestamp = self._pending
+                self._pending = None
+                self._busy = True
+            start = self.metrics.now()
+            self.backend.move_to(x, y, timestamp)
+            self.metrics.record('actuation', start)
+            if timestamp is not None:
+                # Capture of the frame to the cursor actually moving
+                self.latency = time.perf_counter() - timestamp
+                self.metrics.record('cursor_latency', timestamp)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def wait_idle(self, timeout=None):
+        """Wait until the latest position was applied, False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._stopped or (self._pending is None
+                                                                 and not self._busy), timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+
+def create_backend(name='auto'):
+    """Create an input backend by name: auto, win32, xtest, pyautogui or recording"""
+    if name == 'auto':
+        if sys.platform == 'win32':
+            name = 'win32'
+        elif sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+            name = 'xtest'
+        else:
+            name = 'pyautogui'
+    if name == 'recording':
+        return RecordingBackend()
+    if name == 'win32':
+        return Win32Backend()
+    if name == 'xtest':
+        try:
+            return XTestBackend()
+        except ImportError:
+            return PyAutoGUIBackend()
+        except Exception as e:
+            # No X server to connect to, refused authorization or no XTEST
+            print(f"XTest backend unavailable ({type(e).__name__}: {e}), using pyautogui")
+            return PyAutoGUIBackend()
+    return PyAutoGUIBackend()
@@ -0,0 +1,169 @@
+"""Compact binary recordings of per-frame hand landmarks.
+
+File layout: a 16-byte header (magic, format version, max hands per frame,
+record size) followed by fixed-size little-endian records, one per frame.
+Recording only ever appends, and a finished (or still growing) file can
+be opened with np.memmap without parsing anything.
+"""
+import os
+import struct
+import time
+
+import numpy as np
+
+from gesture_events import GestureStateMachine
+from landmarks import NUM_LANDMARKS, HandBatch, gestures
+from motion import MotionGestures
+
+MAGIC = b'GLMK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')  # magic, version, max hands, record size
+
+# Handedness labels are stored as small integer codes
+HANDEDNESS_CODES = {'': 0, 'Left': 1, 'Right': 2}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+
+
+def frame_dtype(max_hands):
+    """Structured dtype of one frame record"""
+    return np.dtype([
+        ('timestamp', '<f8'),          # Capture time, seconds
+        ('seq', '<u8'),                # Frame sequence number
+        ('hand_count', 'u1'),
+        ('handedness', 'u1', (max_hands,)),
+        ('scores', '<f4', (max_hands,)),
+        ('points', '<f4', (max_hands, NUM_LANDMARKS, 3)),
+    ])
+
+
+class LandmarkRecorder:
+    """Appends one record per frame to a landmark recording"""
+
+    def __init__(self, path, max_hands=2):
+        self.path = path
+        self.max_hands = max_hands
+        self.dtype = frame_dtype(max_hands)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            # Keep appending to an earlier recording with the same layout
+            with open(path, 'rb') as f:
+                header = _read_header(f)
+            if header != (max_hands, self.dtype.itemsize):
+                raise ValueError(f"{path} was recorded with a different layout")
+        self._file = open(path, 'ab')
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, max_hands, self.dtype.itemsize))
+        self._record = np.zeros(1, self.dtype)
+        self.frames = 0
+
+    def record(self, timestamp, seq, batch):
+        """Append a frame; batch is a HandBatch or None when no hand was seen"""
+        record = self._record[0]
+        count = 0 if batch is None else min(len(batch), self.max_hands)
+        record['timestamp'] = timestamp
+        record['seq'] = seq
+        record['hand_count'] = count
+        record['handedness'] = 0
+        record['scores'] = 0
+        record['points'] = 0
+        if count:
+            record['points'][:count] = batch.points[:count]
+            record['scores'][:count] = batch.scores[:count]
+            record['handedness'][:count] = [HANDEDNESS_CODES.get(label, 0)
+                                            for label in batch.handedness[:count]]
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+
+def _read_header(f):
+    magic, version, max_hands, record_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a landmark recording")
+    return max_hands, record_size
+
+
+class LandmarkRecording:
+    """Read-only, memory-mapped view of a landmark recording"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.max_hands, record_size = _read_header(f)
+        dtype = frame_dtype(self.max_hands)
+        if dtype.itemsize != record_size:
+            raise ValueError(f"{path} has an unexpected record size")
+        # A recording cut off mid-write simply loses its last partial record
+        count = (os.path.getsize(path) - HEADER.size) // record_size
+        self.frames = np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size,
+                                shape=(count,)) if count else np.zeros(0, dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        if len(self.frames) < 2:
+            return 0.0
+        return float(self.frames['timestamp'][-1] - self.frames['timestamp'][0])
+
+    def batch(self, index):
+        """HandBatch of frame `index`, or None when no hand was seen"""
+        record = self.frames[index]
+        count = int(record['hand_count'])
+        if not count:
+            return None
+        return HandBatch(np.asarray(record['points'][:count]),
+                         [HANDEDNESS_LABELS.get(int(code), '') for code in record['handedness'][:count]],
+                         np.asarray(record['scores'][:count]))
+
+    def __iter__(self):
+        """Yields (timestamp, seq, batch) for every frame"""
+        for index in range(len(self.frames)):
+            record = self.frames[index]
+            yield float(record['timestamp']), int(record['seq']), self.batch(index)
+
+
+def replay(recording, on_frame, realtime=False):
+    """Feed every recorded frame to on_frame(timestamp, seq, batch).
+
+    Runs as fast as possible unless realtime=True, in which case frames are
+    spaced by their recorded timestamps. Returns the number of frames fed.
+    """
+    start_wall = time.perf_counter()
+    first = None
+    count = 0
+    for timestamp, seq, batch in recording:
+        if realtime:
+            if first is None:
+                first = timestamp
+            delay = (timestamp - first) - (time.perf_counter() - start_wall)
+            if delay > 0:
+                time.sleep(delay)
+        on_frame(timestamp, seq, batch)
+        count += 1
+    return count
+
+
+def replay_gestures(recording, configs=None, registry=gestures, motion_config=None):
+    """Offline gesture events over a recording, no camera or MediaPipe needed.
+
+    Runs the recording through a GestureStateMachine with the given
+    per-gesture configs (DEFAULT_GESTURES when None) and through
+    MotionGestures, in the order a live session does, and returns every
+    GestureEvent. Timing comes from the recorded timestamps, so the same
+    recording always gives the same events. GestureEngine.replay() also
+    runs the actions they trigger.
+    """
+    machine = GestureStateMachine(configs, registry)
+    motion = MotionGestures(motion_config)
+    events = []
+
+    def on_frame(timestamp, seq, batch):
+        events.extend(machine.update(batch, timestamp))
+        events.extend(motion.update(batch, timestamp))
+
+    replay(recording, on_frame)
+    return events
@@ -0,0 +1,157 @@
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+# MediaPipe hand landmark indexes
+WRIST = 0
+THUMB_MCP, THUMB_IP, THUMB_TIP = 2, 3, 4
+INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP = 8, 12, 16, 20
+FINGER_TIPS = [8, 12, 16, 20]   # Index, Middle, Ring, Pinky tip points
+FINGER_PIPS = [6, 10, 14, 18]   # Middle joint of the same fingers
+FINGER_MCPS = [5, 9, 13, 17]    # Knuckles at the base of the same fingers
+PALM = 9                        # Middle finger knuckle, steadier than any fingertip
+
+
+class HandBatch:
+    """Landmarks of every hand in a frame as one (hands, 21, 3) float32 array.
+
+    Image coordinates, so y grows downwards. Derived features are computed
+    on first use and shared by every gesture predicate.
+    """
+
+    def __init__(self, points, handedness=None, scores=None):
+        self.points = points
+        self.handedness = handedness if handedness is not None else [''] * len(points)
+        self.scores = scores if scores is not None else np.ones(len(points), np.float32)
+        self._fingers_folded = None
+        self._fingers_extended = None
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def y(self):
+        return self.points[:, :, 1]
+
+    @property
+    def fingers_folded(self):
+        """(hands, 4) bool: fingertip below its middle joint"""
+        if self._fingers_folded is None:
+            y = self.y
+            self._fingers_folded = y[:, FINGER_TIPS] > y[:, FINGER_PIPS]
+        return self._fingers_folded
+
+    @property
+    def fingers_extended(self):
+        """(hands, 4) bool: fingertip above its knuckle"""
+        if self._fingers_extended is None:
+            y = self.y
+            self._fingers_extended = y[:, FINGER_TIPS] < y[:, FINGER_MCPS]
+        return self._fingers_extended
+
+
+class LandmarkConverter:
+    """Converts MediaPipe results into a HandBatch, reusing one buffer"""
+
+    def __init__(self, max_hands=2):
+        self._points = np.empty((max_hands, NUM_LANDMARKS, 3), np.float32)
+        self._scores = np.empty(max_hands, np.float32)
+
+    def convert(self, results):
+        """Return a HandBatch for the frame, or None when no hand was found"""
+        hands = results.multi_hand_landmarks
+        if not hands:
+            return None
+        count = len(hands)
+        if count > len(self._points):
+            self._points = np.empty((count, NUM_LANDMARKS, 3), np.float32)
+            self._scores = np.empty(count, np.float32)
+        points = self._points[:count]
+        for i, hand_landmarks in enumerate(hands):
+            points[i] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+
+        handedness = []
+        scores = self._scores[:count]
+        scores.fill(1.0)
+        for i, hand in enumerate(results.multi_handedness or []):
+            if i >= count:
+                break
+            classification = hand.classification[0]
+            handedness.append(classification.label)
+            scores[i] = classification.score
+        handedness += [''] * (count - len(handedness))
+        return HandBatch(points, handedness, scores)
+
+
+class GestureRegistry:
+    """Named gesture predicates evaluated together over a HandBatch.
+
+    A predicate takes a HandBatch and returns a (hands,) bool array, so one
+    call covers every hand in the frame.
+    """
+
+    def __init__(self):
+        self.predicates = {}
+
+    def register(self, name, predicate=None):
+        """Register a predicate, can also be used as a decorator"""
+        if predicate is None:
+            return lambda fn: self.register(name, fn)
+        self.predicates[name] = predicate
+        return predicate
+
+    def evaluate(self, batch):
+        """Return {gesture name: (hands,) bool array} for every registered gesture"""
+        return {name: predicate(batch) for name, predicate in self.predicates.items()}
+
+
+gestures = GestureRegistry()
+
+
+@gestures.register('fist')
+def is_fist(batch):
+    """All four fingers and the thumb curled in"""
+    y = batch.y
+    return batch.fingers_folded.all(axis=1) & (y[:, THUMB_TIP] > y[:, THUMB_IP])
+
+
+@gestures.register('thumbs_up')
+def is_thumbs_up(batch):
+    """Thumb extended upward, other fingers folded"""
+    y = batch.y
+    return (y[:, THUMB_TIP] < y[:, THUMB_MCP]) & batch.fingers_folded.all(axis=1)
+
+
+@gestures.register('open_palm')
+def is_open_palm(batch):
+    """All four fingers extended"""
+    return batch.fingers_extended.all(axis=1)
+
+
+@gestures.register('pointing')
+def is_pointing(batch):
+    """Only the index finger extended"""
+    extended = batch.fingers_extended
+    return extended[:, 0] & ~extended[:, 1:].any(axis=1)
+
+
+# Same pairs as mediapipe.solutions.hands.HAND_CONNECTIONS
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+
+def draw_hands(image, batch):
+    """Draw every hand of a HandBatch onto a BGR image"""
+    import cv2
+    height, width = image.shape[:2]
+    for hand in batch.points:
+        pixels = [(int(x * width), int(y * height)) for x, y, _ in hand]
+        for start, end in HAND_CONNECTIONS:
+            cv2.line(image, pixels[start], pixels[end], (224, 224, 224), 2)
+        for point in pixels:
+            cv2.circle(image, point, 3, (0, 0, 255), -1)
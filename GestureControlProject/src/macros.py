@@ -0,0 +1,216 @@
+"""Multi-step keyboard macros that wait for the UI instead of sleeping.
+
+A macro is a list of steps declared in a JSON config file, e.g.
+config/gesture_control_macros.json. A step can send input (`press`,
+`hotkey`, `write`), then wait `until` an observable condition holds:
+
+    clipboard_changed      the clipboard was written after the step started
+    focused:REGEX          the foreground window title matches
+    closed:REGEX           the foreground window title no longer matches
+
+The wait polls every `poll` seconds (default 10 ms) for at most `timeout`
+seconds (default 2). On a timeout the macro prints the step's `fail`
+message and stops, unless the step is `optional`. `clipboard_to` stores
+the clipboard text in a variable once the step is done. Other steps:
+`call` a named Python function, print a `message`, or `pause` until the
+gesture fires again. `write` text and messages are formatted with the
+macro's variables, e.g. "{documents}" or ones set by a called function.
+"""
+import json
+import os
+import re
+import time
+
+from actions import Macro
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_POLL = 0.01
+INPUT_KINDS = ('press', 'hotkey', 'write')
+
+
+class Clipboard:
+    """Interface to the system clipboard"""
+
+    def sequence(self):
+        """A number that changes every time the clipboard is written"""
+        return 0
+
+    def text(self):
+        return ''
+
+
+class Win32Clipboard(Clipboard):
+    def __init__(self):
+        import win32clipboard
+        self._win32clipboard = win32clipboard
+
+    def sequence(self):
+        return self._win32clipboard.GetClipboardSequenceNumber()
+
+    def text(self):
+        win32clipboard = self._win32clipboard
+        try:
+            win32clipboard.OpenClipboard()
+        except Exception:  # Another program has it open
+            return ''
+        try:
+            return win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+        except Exception:  # Empty, or not text
+            return ''
+        finally:
+            win32clipboard.CloseClipboard()
+
+
+class FakeClipboard(Clipboard):
+    """In-memory clipboard for tests and benchmarks"""
+
+    def __init__(self, text=''):
+        self._text = text
+        self._sequence = 0
+
+    def set_text(self, text):
+        self._text = text
+        self._sequence += 1
+
+    def sequence(self):
+        return self._sequence
+
+    def text(self):
+        return self._text
+
+
+def create_clipboard():
+    """The system clipboard where supported, otherwise an always-empty one"""
+    try:
+        return Win32Clipboard()
+    except ImportError:  # Clipboard access only on Windows
+        return Clipboard()
+
+
+class MacroServices:
+    """What macro steps act on and observe"""
+
+    def __init__(self, backend, windows, clipboard=None):
+        self.backend = backend
+        self.windows = windows      # A WindowContext
+        self.clipboard = clipboard if clipboard is not None else create_clipboard()
+
+
+# Conditions are (start, check): start(services) snapshots state before the
+# step's input is sent, check(services, snapshot) tells whether it holds
+
+def _clipboard_changed():
+    return (lambda services: services.clipboard.sequence(),
+            lambda services, start: services.clipboard.sequence() != start)
+
+
+def _focused(pattern):
+    return (lambda services: None,
+            lambda services, start: bool(pattern.search(services.windows.current().title)))
+
+
+def _closed(pattern):
+    return (lambda services: None,
+            lambda services, start: not pattern.search(services.windows.current().title))
+
+
+def parse_condition(text):
+    if text == 'clipboard_changed':
+        return _clipboard_changed()
+    kind, _, pattern = text.partition(':')
+    if kind == 'focused' and pattern:
+        return _focused(re.compile(pattern))
+    if kind == 'closed' and pattern:
+        return _closed(re.compile(pattern))
+    raise ValueError(f"Unknown macro condition {text!r}")
+
+
+def wait_until(ctx, check, timeout=DEFAULT_TIMEOUT, poll=DEFAULT_POLL):
+    """Poll check() until it is true; False on timeout or when the action is cancelled"""
+    deadline = time.perf_counter() + timeout
+    while not check():
+        if time.perf_counter() >= deadline or not ctx.sleep(poll):
+            return False
+    return True
+
+
+def _compile_step(spec, functions):
+    step = dict(spec)
+    kinds = [kind for kind in INPUT_KINDS + ('call', 'pause') if kind in step]
+    if len(kinds) > 1:
+        raise ValueError(f"A macro step does at most one of {INPUT_KINDS + ('call', 'pause')}: {spec}")
+    if 'call' in step and step['call'] not in functions:
+        raise ValueError(f"Unknown macro function {step['call']!r}")
+    if 'until' in step:
+        step['until'] = parse_condition(step['until'])
+    return step
+
+
+def build_macro(name, specs, services, functions=None, variables=None):
+    """A Macro (see actions.py) running the steps of one configured macro.
+
+    `functions` maps names for `call` steps to fn(variables, services);
+    `variables` are the initial values for `write` formatting.
+    """
+    functions = functions or {}
+    steps = [_compile_step(spec, functions) for spec in specs]
+    defaults = dict(variables or {})
+
+    def run(ctx):
+        variables = dict(defaults)
+        backend = services.backend
+        for number, step in enumerate(steps, 1):
+            if 'pause' in step:
+                ctx = yield  # Until the gesture fires again
+                continue
+            until = step.get('until')
+            snapshot = until[0](services) if until is not None else None
+            if 'press' in step:
+                backend.press(step['press'])
+            elif 'hotkey' in step:
+                backend.hotkey(*step['hotkey'])
+            elif 'write' in step:
+                backend.write(step['write'].format(**variables))
+            elif 'call' in step:
+                functions[step['call']](variables, services)
+            if 'message' in step:
+                print(step['message'].format(**variables))
+            if until is not None and not wait_until(
+                    ctx, lambda: until[1](services, snapshot),
+                    step.get('timeout', DEFAULT_TIMEOUT), step.get('poll', DEFAULT_POLL)):
+                if ctx.cancelled:
+                    return
+                if not step.get('optional', False):
+                    print(step.get('fail', f"Macro {name}: step {number} timed out"))
+                    return
+            elif 'clipboard_to' in step:
+                variables[step['clipboard_to']] = services.clipboard.text()
+            if ctx.cancelled:
+                return
+
+    return Macro(run)
+
+
+def load_macros(path, services, functions=None, variables=None):
+    """{name: Macro} for every macro in a config file"""
+    with open(path) as f:
+        config = json.load(f)
+    return {name: build_macro(name, specs, services, functions, variables)
+            for name, specs in config.items()}
+
+
+def default_variables():
+    return {'documents': os.path.expanduser(os.path.join('~', 'Documents'))}
+
+
+def suggest_filename(variables, services):
+    """A .txt name in Documents from the first line of the copied `text`"""
+    content = variables.get('text', '')
+    filename = content.split('\n')[0][:30] if content else "untitled"
+    filename = ''.join(c for c in filename if c.isalnum() or c in (' ', '-', '_')) + '.txt'
+    variables['filename'] = filename
+    variables['path'] = os.path.join(variables['documents'], filename)
+
+
+# Functions `call` steps can name
+FUNCTIONS = {'suggest_filename': suggest_filename}
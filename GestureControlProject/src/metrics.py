@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class RollingHistogram:
+    """Keeps the last `window` samples in a preallocated ring, O(1) per sample"""
+
+    def __init__(self, window=1024):
+        self.samples = np.zeros(window, np.float64)
+        self.count = 0   # Samples seen in total
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+
+    def percentiles(self, qs=(50, 95, 99)):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not filled.size:
+            return [0.0] * len(qs)
+        return list(np.percentile(filled, qs))
+
+
+class FpsCounter:
+    """Frames per second over the last `window` ticks"""
+
+    def __init__(self, window=120):
+        self.ticks = np.zeros(window, np.float64)
+        self.count = 0
+
+    def tick(self, now):
+        self.ticks[self.count % len(self.ticks)] = now
+        self.count += 1
+
+    @property
+    def fps(self):
+        n = min(self.count, len(self.ticks))
+        if n < 2:
+            return 0.0
+        newest = self.ticks[(self.count - 1) % len(self.ticks)]
+        oldest = self.ticks[(self.count - n) % len(self.ticks)]
+        return (n - 1) / (newest - oldest) if newest > oldest else 0.0
+
+
+def _zero():
+    return 0.0
+
+
+def _noop(*args):
+    pass
+
+
+class PipelineMetrics:
+    """Per-stage latency histograms and FPS counters for the tracking loops.
+
+    Stages timed by the trackers and main loops: capture_wait, preprocess,
+    inference, preview, gestures, actuation, render, plus the end-to-end
+    cursor_latency (frame capture to cursor move).
+
+    Usage in a hot path:
+
+        start = metrics.now()
+        results = hands.process(rgb)
+        metrics.record('inference', start)
+
+    When disabled, now() and record() are bound to no-op functions, so
+    instrumented code pays one trivial call per stage and nothing else.
+    """
+
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.fps_counters = {}
+        self._lock = threading.Lock()
+        self._overlay = ([], 0.0)  # Cached overlay lines and when they were made
+        if not enabled:
+            self.now = _zero
+            self.record = _noop
+            self.record_duration = _noop
+            self.tick = _noop
+            self.increment = _noop
+            self.set_gauge = _noop
+
+    def now(self):
+        return time.perf_counter()
+
+    def record(self, stage, start):
+        """Record the time elapsed since `start` (from now()) for a stage"""
+        self.record_duration(stage, time.perf_counter() - start)
+
+    def record_duration(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, RollingHistogram(self.window))
+        histogram.add(seconds)
+
+    def tick(self, name='frames'):
+        """Count one frame (or event) for an FPS counter"""
+        counter = self.fps_counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.fps_counters.setdefault(name, FpsCounter())
+        counter.tick(time.perf_counter())
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """Current metrics as a plain dict, durations in milliseconds"""
+        with self._lock:
+            histograms = dict(self.histograms)
+            fps_counters = dict(self.fps_counters)
+        stages = {}
+        for stage, histogram in histograms.items():
+            p50, p95, p99 = histogram.percentiles()
+            stages[stage] = {
+                'count': histogram.count,
+                'mean_ms': round(histogram.total / histogram.count * 1000, 3) if histogram.count else 0.0,
+                'p50_ms': round(p50 * 1000, 3),
+                'p95_ms': round(p95 * 1000, 3),
+                'p99_ms': round(p99 * 1000, 3),
+            }
+        return {
+            'timestamp': time.time(),
+            'stages': stages,
+            'fps': {name: round(counter.fps, 2) for name, counter in fps_counters.items()},
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='gesture'):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, values in snapshot['stages'].items():
+            for quantile in ('p50', 'p95', 'p99'):
+                q = int(quantile[1:]) / 100
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f"{values[quantile + '_ms'] / 1000:.6f}")
+            histogram = self.histograms[stage]
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        lines.append(f"# TYPE {prefix}_fps gauge")
+        for name, fps in snapshot['fps'].items():
+            lines.append(f'{prefix}_fps{{counter="{name}"}} {fps}')
+        for name, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def overlay_lines(self, refresh=0.5):
+        """Short text lines for the preview frame, recomputed every `refresh` seconds"""
+        lines, made = self._overlay
+        now = time.perf_counter()
+        if now - made < refresh:
+            return lines
+        snapshot = self.snapshot()
+        lines = [f"{name}: {fps:.1f} fps" for name, fps in snapshot['fps'].items()]
+        for stage, values in snapshot['stages'].items():
+            lines.append(f"{stage}: {values['p50_ms']:.1f} / {values['p95_ms']:.1f} ms")
+        self._overlay = (lines, now)
+        return lines
+
+    def draw_overlay(self, image, origin=(10, 90)):
+        """Draw p50 / p95 per stage and the FPS counters onto a BGR image"""
+        if not self.enabled:
+            return
+        import cv2
+        x, y = origin
+        for line in self.overlay_lines():
+            cv2.putText(image, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+            y += 18
+
+
+class MetricsExporter:
+    """Periodically writes a metrics snapshot to a file.
+
+    Files ending in .prom get the Prometheus text format (for the node
+    exporter's textfile collector), anything else gets JSON. Each dump
+    replaces the file atomically.
+    """
+
+    def __init__(self, metrics, path, interval=5.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def dump(self):
+        if self.path.endswith('.prom'):
+            text = self.metrics.to_prometheus()
+        else:
+            text = self.metrics.to_json()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"Could not write metrics to {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        try:
+            self.dump()  # Leave the final numbers behind
+        except OSError:
+            pass
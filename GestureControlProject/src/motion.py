@@ -0,0 +1,266 @@
+"""Dynamic gestures from the recent trajectory of each hand.
+
+The predicates in landmarks.py look at one frame. Swipes, pinch-and-drag
+and two-finger scrolling need the last few hundred milliseconds, so every
+hand keeps a LandmarkHistory: a fixed-size ring buffer of its landmarks
+plus features that are updated as each frame is pushed (palm velocity,
+palm displacement over a sliding time window, thumb-index pinch
+distance). Nothing is recomputed over the window and nothing is allocated
+per frame, so MotionGestures.update costs a few microseconds per hand.
+
+Events are GestureEvents (see gesture_events.py):
+
+    swipe_left, swipe_right,  PRESS once per swipe of an open palm
+    swipe_up, swipe_down
+    pinch                     PRESS, MOVE with the pinch point (x, y), RELEASE
+    scroll                    PRESS, MOVE with whole scroll steps (up is positive),
+                              RELEASE; index and middle finger extended
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from gesture_events import MOVE, PRESS, RELEASE, GestureEvent
+from landmarks import INDEX_TIP, NUM_LANDMARKS, PALM, THUMB_TIP, WRIST
+
+FEATURE_POINTS = [PALM, THUMB_TIP, INDEX_TIP, WRIST]
+
+# Distances are in normalized image units, times in seconds of frame time:
+#   swipe_window    - trajectory a swipe is measured over
+#   swipe_distance  - palm travel within it that makes a swipe
+#   swipe_ratio     - travel along the swipe vs across it
+#   swipe_cooldown  - after a swipe, before the next one on the same hand
+#   pinch_on, pinch_off - thumb-index tip distance, relative to the hand's
+#                     size (wrist to palm), that starts and ends a pinch
+#   pinch_smoothing - weight of the newest frame in the smoothed distance
+#   scroll_step     - palm travel per scroll step
+#   scroll_confirm  - frames the scroll pose must be seen in to start,
+#                     and missed in to end
+#   velocity_smoothing - weight of the newest frame in the palm velocity
+MotionConfig = namedtuple('MotionConfig', [
+    'swipe_window', 'swipe_distance', 'swipe_ratio', 'swipe_cooldown',
+    'pinch_on', 'pinch_off', 'pinch_smoothing',
+    'scroll_step', 'scroll_confirm', 'velocity_smoothing'])
+MotionConfig.__new__.__defaults__ = (0.35, 0.25, 2.0, 0.5, 0.25, 0.4, 0.5, 0.03, 3, 0.5)
+
+
+class LandmarkHistory:
+    """The last `capacity` frames of one hand, with incrementally updated features.
+
+    `velocity` is the smoothed palm velocity, `displacement` the palm's
+    travel over the frames inside the last `window` seconds, and
+    `pinch_distance` the smoothed thumb-index distance relative to hand size.
+    """
+
+    def __init__(self, capacity=32, window=0.35, pinch_smoothing=0.5, velocity_smoothing=0.5):
+        self.capacity = capacity
+        self.window = window
+        self.pinch_smoothing = pinch_smoothing
+        self.velocity_smoothing = velocity_smoothing
+        self.points = np.zeros((capacity, NUM_LANDMARKS, 3), np.float32)
+        # Per-frame scalars as Python floats, cheaper to read back than numpy scalars
+        self._times = [0.0] * capacity
+        self._palms = [(0.0, 0.0)] * capacity
+        self.clear()
+
+    def clear(self):
+        self.head = -1      # Slot of the newest frame
+        self.count = 0      # Frames stored, at most capacity
+        self.span = 0       # Newest frames inside the time window
+        self.velocity = (0.0, 0.0)
+        self.pinch_distance = None
+        self.pinch_point = (0.0, 0.0)
+
+    def __len__(self):
+        return self.count
+
+    def push(self, timestamp, points):
+        """Store one frame's (21, 3) landmarks and update the features"""
+        previous = self.head
+        head = self.head = (previous + 1) % self.capacity
+        self.points[head] = points
+        (px, py), (tx, ty), (ix, iy), (wx, wy) = points[FEATURE_POINTS, :2].tolist()
+
+        if self.count:
+            last_x, last_y = self._palms[previous]
+            dt = timestamp - self._times[previous]
+            if dt > 0:
+                a = self.velocity_smoothing
+                vx, vy = self.velocity
+                self.velocity = (vx + a * ((px - last_x) / dt - vx),
+                                 vy + a * ((py - last_y) / dt - vy))
+        self._times[head] = timestamp
+        self._palms[head] = (px, py)
+        self.count = min(self.count + 1, self.capacity)
+
+        # Slide the window: drop frames older than `window` from its far end
+        span = min(self.span + 1, self.count)
+        times = self._times
+        while span > 1 and times[(head - span + 1) % self.capacity] < timestamp - self.window:
+            span -= 1
+        self.span = span
+
+        # Thumb-index distance relative to hand size, so it does not depend on camera distance
+        size = math.hypot(px - wx, py - wy)
+        distance = math.hypot(tx - ix, ty - iy) / size if size > 1e-6 else 1.0
+        if self.pinch_distance is None:
+            self.pinch_distance = distance
+        else:
+            self.pinch_distance += self.pinch_smoothing * (distance - self.pinch_distance)
+        self.pinch_point = ((tx + ix) / 2, (ty + iy) / 2)
+
+    @property
+    def palm(self):
+        return self._palms[self.head]
+
+    @property
+    def displacement(self):
+        """Palm (dx, dy) from the oldest frame in the window to the newest"""
+        x0, y0 = self._palms[(self.head - self.span + 1) % self.capacity]
+        x1, y1 = self._palms[self.head]
+        return x1 - x0, y1 - y0
+
+    @property
+    def duration(self):
+        """Seconds between the oldest frame in the window and the newest"""
+        return self._times[self.head] - self._times[(self.head - self.span + 1) % self.capacity]
+
+    def restart(self):
+        """Start the window over at the newest frame, e.g. after a swipe fired"""
+        self.span = min(self.span, 1)
+
+    def recent(self, frames=None):
+        """Copies of the newest timestamps and (frames, 21, 3) landmarks, oldest first"""
+        frames = self.count if frames is None else min(frames, self.count)
+        slots = [(self.head - k) % self.capacity for k in range(frames - 1, -1, -1)]
+        return np.array([self._times[slot] for slot in slots]), self.points[slots]
+
+
+class _HandMotion:
+    """Motion state of one hand"""
+
+    __slots__ = ('history', 'pinching', 'scrolling', 'scroll_hits', 'scroll_origin',
+                 'last_swipe')
+
+    def __init__(self, history):
+        self.history = history
+        self.pinching = False
+        self.scrolling = False
+        self.scroll_hits = 0       # Scroll pose hysteresis counter, 0..scroll_confirm
+        self.scroll_origin = 0.0   # Palm y the next scroll step is counted from
+        self.last_swipe = None
+
+
+class MotionGestures:
+    """Recognizes swipes, pinch-and-drag and scrolling from each hand's trajectory.
+
+    Hands are told apart by handedness label, like GestureStateMachine.
+    Timing uses frame timestamps only, so a replayed recording gives the
+    same events every time.
+    """
+
+    def __init__(self, config=None, capacity=32):
+        self.config = config if config is not None else MotionConfig()
+        self.capacity = capacity
+        self._hands = {}  # hand key -> _HandMotion
+
+    def reset(self):
+        self._hands = {}
+
+    def history(self, hand):
+        """LandmarkHistory of a hand currently in view, or None"""
+        motion = self._hands.get(hand)
+        return motion.history if motion is not None else None
+
+    def update(self, batch, timestamp):
+        """Feed one frame (HandBatch or None), returns the GestureEvents it caused"""
+        seen = {}
+        if batch is not None:
+            for i, hand in enumerate(batch.handedness):
+                seen[hand if hand not in seen else f'{hand}{i}'] = i
+
+        events = []
+        for hand in [hand for hand in self._hands if hand not in seen]:
+            # Hand gone: end what it was doing and forget its trajectory
+            motion = self._hands.pop(hand)
+            if motion.pinching:
+                events.append(GestureEvent(RELEASE, 'pinch', hand, timestamp,
+                                           motion.history.pinch_point))
+            if motion.scrolling:
+                events.append(GestureEvent(RELEASE, 'scroll', hand, timestamp))
+        if not seen:
+            return events
+
+        # Poses from the batch's shared finger features, one vectorized pass
+        extended = batch.fingers_extended
+        open_palm = extended.all(axis=1).tolist()
+        fist = batch.fingers_folded.all(axis=1).tolist()
+        two_fingers = (extended[:, 0] & extended[:, 1] & ~extended[:, 2] & ~extended[:, 3]).tolist()
+        config = self.config
+        for hand, i in seen.items():
+            motion = self._hands.get(hand)
+            if motion is None:
+                motion = self._hands[hand] = _HandMotion(LandmarkHistory(
+                    self.capacity, config.swipe_window, config.pinch_smoothing,
+                    config.velocity_smoothing))
+            motion.history.push(timestamp, batch.points[i])
+            self._pinch(motion, hand, timestamp, fist[i], events)
+            self._scroll(motion, hand, timestamp, two_fingers[i], events)
+            if open_palm[i] and not motion.pinching and not motion.scrolling:
+                self._swipe(motion, hand, timestamp, events)
+        return events
+
+    def _pinch(self, motion, hand, timestamp, fist, events):
+        history = motion.history
+        distance = history.pinch_distance
+        if motion.pinching:
+            if distance > self.config.pinch_off:
+                motion.pinching = False
+                events.append(GestureEvent(RELEASE, 'pinch', hand, timestamp, history.pinch_point))
+            else:
+                events.append(GestureEvent(MOVE, 'pinch', hand, timestamp, history.pinch_point))
+        elif distance < self.config.pinch_on and not fist:
+            # A closed fist brings the thumb near the index finger too
+            motion.pinching = True
+            events.append(GestureEvent(PRESS, 'pinch', hand, timestamp, history.pinch_point))
+
+    def _scroll(self, motion, hand, timestamp, pose, events):
+        config = self.config
+        motion.scroll_hits = (min(motion.scroll_hits + 1, config.scroll_confirm) if pose
+                              else max(motion.scroll_hits - 1, 0))
+        palm_y = motion.history.palm[1]
+        if not motion.scrolling:
+            if motion.scroll_hits == config.scroll_confirm and not motion.pinching:
+                motion.scrolling = True
+                motion.scroll_origin = palm_y
+                events.append(GestureEvent(PRESS, 'scroll', hand, timestamp))
+            return
+        if motion.scroll_hits == 0:
+            motion.scrolling = False
+            events.append(GestureEvent(RELEASE, 'scroll', hand, timestamp))
+            return
+        # Image y grows downwards, moving the hand up scrolls up
+        steps = int((motion.scroll_origin - palm_y) / config.scroll_step)
+        if steps:
+            motion.scroll_origin -= steps * config.scroll_step
+            events.append(GestureEvent(MOVE, 'scroll', hand, timestamp, steps))
+
+    def _swipe(self, motion, hand, timestamp, events):
+        config = self.config
+        if motion.last_swipe is not None and timestamp - motion.last_swipe < config.swipe_cooldown:
+            return
+        history = motion.history
+        dx, dy = history.displacement
+        ax, ay = abs(dx), abs(dy)
+        if max(ax, ay) < config.swipe_distance:
+            return
+        if ax >= config.swipe_ratio * ay:
+            name = 'swipe_right' if dx > 0 else 'swipe_left'
+        elif ay >= config.swipe_ratio * ax:
+            name = 'swipe_down' if dy > 0 else 'swipe_up'
+        else:
+            return  # Diagonal, not a swipe
+        motion.last_swipe = timestamp
+        history.restart()
+        events.append(GestureEvent(PRESS, name, hand, timestamp))
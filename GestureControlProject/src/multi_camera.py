@@ -0,0 +1,173 @@
+"""Several cameras tracked at once, each hand taken from the camera that sees it best.
+
+Every camera gets a PipelinedTracker of its own, so capture and MediaPipe
+run in their own processes per camera and a second camera adds cores
+instead of splitting the time of one. A reader thread per camera waits for
+its results; MultiCameraTracker.read() returns as soon as any camera has a
+new frame, so the output rate is that of all cameras together, not of the
+slowest one.
+
+HandFusion combines the newest result of every camera whose capture
+timestamp lies within `max_skew` of the new frame. For every handedness
+label it picks the hand with the highest score. MediaPipe's Hands solution
+reports one confidence per hand, the handedness score, which falls when a
+hand is occluded or only partly in view. A hand stays with the camera that
+supplied it until another one is `switch_margin` more confident, because
+the cameras look from different angles and every switch moves the hand.
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from landmarks import HandBatch
+from metrics import PipelineMetrics
+from pipeline import PipelinedTracker, TrackedFrame
+from roi import HandRoi
+
+# Which camera each hand of a fused batch came from, by the hand's index
+FusedHand = namedtuple('FusedHand', ['camera', 'score'])
+
+
+class HandFusion:
+    """Picks each hand of a frame from the most confident camera.
+
+    `max_skew` is in seconds of capture time; results further apart are
+    not considered to show the same moment.
+    """
+
+    def __init__(self, cameras, max_skew=0.05, switch_margin=0.1):
+        self.max_skew = max_skew
+        self.switch_margin = switch_margin
+        self._latest = [None] * cameras  # (timestamp, batch) per camera
+        self._owners = {}                # handedness label -> camera
+        self.sources = []                # FusedHand per hand of the last fused batch
+
+    def reset(self):
+        self._latest = [None] * len(self._latest)
+        self._owners = {}
+        self.sources = []
+
+    def update(self, camera, timestamp, batch):
+        """Add one camera's result, returns the fused HandBatch or None"""
+        self._latest[camera] = (timestamp, batch)
+        best = {}  # label -> {camera: (score, batch, index)}
+        for index, latest in enumerate(self._latest):
+            if latest is None or latest[1] is None or abs(latest[0] - timestamp) > self.max_skew:
+                continue
+            found = latest[1]
+            for i, (label, score) in enumerate(zip(found.handedness, found.scores.tolist())):
+                seen = best.setdefault(label, {})
+                if index not in seen or score > seen[index][0]:
+                    seen[index] = (score, found, i)
+
+        points, labels, scores, sources = [], [], [], []
+        owners = {}
+        for label, seen in best.items():
+            choice = max(seen, key=lambda index: seen[index][0])
+            owner = self._owners.get(label)
+            if (owner is not None and owner in seen
+                    and seen[owner][0] + self.switch_margin >= seen[choice][0]):
+                choice = owner
+            score, found, i = seen[choice]
+            owners[label] = choice
+            points.append(found.points[i])
+            labels.append(label)
+            scores.append(score)
+            sources.append(FusedHand(choice, score))
+        self._owners = owners
+        self.sources = sources
+        if not points:
+            return None
+        return HandBatch(np.stack(points), labels, np.array(scores, np.float32))
+
+
+class MultiCameraTracker:
+    """PipelinedTracker per source plus HandFusion, read like any other tracker.
+
+    The image of a returned frame is the one from the camera that just
+    delivered, so with a preview it switches between the cameras.
+    """
+
+    def __init__(self, sources, hands_options, metrics=None, roi=False, preview=True,
+                 max_skew=0.05, switch_margin=0.1):
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self.preview = preview
+        self.trackers = [PipelinedTracker(source, hands_options, metrics=self.metrics,
+                                          roi=HandRoi() if roi else None,
+                                          preview=preview)
+                         for source in sources]
+        self.fusion = HandFusion(len(self.trackers), max_skew, switch_margin)
+        self._cond = threading.Condition()
+        self._pending = []   # (camera, TrackedFrame) not read yet
+        self._running = 0    # Reader threads still delivering
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._seq = 0
+
+    @property
+    def finished(self):
+        """True once every camera delivered its last frame and all were read"""
+        with self._cond:
+            return self._running == 0 and not self._pending
+
+    def start(self):
+        self.fusion.reset()
+        self._stop_event.clear()
+        self._pending = []
+        self._running = len(self.trackers)
+        for tracker in self.trackers:
+            tracker.start()
+        self._threads = [threading.Thread(target=self._read_camera, args=(camera, tracker),
+                                          daemon=True, name=f'camera-reader-{camera}')
+                         for camera, tracker in enumerate(self.trackers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _read_camera(self, camera, tracker):
+        try:
+            while not self._stop_event.is_set():
+                tracked = tracker.read(timeout=0.1)
+                if tracked is None:
+                    if tracker.finished:
+                        break
+                    continue
+                # The tracker reuses the image's buffer on its next read
+                image = tracked.image.copy() if self.preview else None
+                with self._cond:
+                    # Only the newest frame of a camera matters, its older ones are dropped
+                    self._pending = [item for item in self._pending if item[0] != camera]
+                    self._pending.append((camera, tracked._replace(image=image)))
+                    self._cond.notify()
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify()
+
+    def read(self, timeout=0.5):
+        """Wait for a new frame from any camera, fused with the others; None on timeout"""
+        metrics = self.metrics
+        start = metrics.now()
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending or self._running == 0, timeout):
+                return None
+            if not self._pending:
+                return None  # All cameras finished
+            # Oldest first, so the fusion sees every camera's frames in capture order
+            oldest = min(range(len(self._pending)), key=lambda k: self._pending[k][1].timestamp)
+            camera, tracked = self._pending.pop(oldest)
+        metrics.record('capture_wait', start)
+        start = metrics.now()
+        batch = self.fusion.update(camera, tracked.timestamp, tracked.batch)
+        metrics.record('fusion', start)
+        self._seq += 1
+        return TrackedFrame(tracked.image, self._seq, tracked.timestamp, batch)
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        for tracker in self.trackers:
+            tracker.stop()
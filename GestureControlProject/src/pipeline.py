@@ -0,0 +1,479 @@
+import multiprocessing
+import queue
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from frame_sources import open_source
+from landmarks import NUM_LANDMARKS, HandBatch, LandmarkConverter
+from metrics import PipelineMetrics
+from roi import roi_hands_options
+
+# One frame after inference: the mirrored BGR image (the raw, unmirrored
+# frame when previews are off), its sequence number and capture time
+# (time.perf_counter(), which is system-wide on Windows and Linux so it can
+# be compared across processes) and the detected hands as a HandBatch in
+# mirrored coordinates, or None when no hand was found.
+TrackedFrame = namedtuple('TrackedFrame', ['image', 'seq', 'timestamp', 'batch'])
+
+# The shared-memory ring the capture process made for its source's frames,
+# the first message on the frames and results queues
+RingInfo = namedtuple('RingInfo', ['name', 'shape'])
+
+# MediaPipe labels hands assuming a mirrored (selfie) image, so on the raw
+# frame the labels come out swapped
+_SWAP_HANDEDNESS = {'Left': 'Right', 'Right': 'Left'}
+
+
+def _read_only(image):
+    view = image.view()
+    view.flags.writeable = False
+    return view
+
+
+class Preprocessor:
+    """Turns captured BGR frames into MediaPipe input without per-frame allocations.
+
+    Pixels are never mirrored for inference. MediaPipe runs on the raw frame
+    and the landmarks are mirrored instead (x -> 1 - x, handedness swapped),
+    so only the preview is flipped, into its own buffer, and only when
+    previews are on. Color conversion, downscaling and the preview all
+    write into buffers that are reused while the frame size stays the same.
+    """
+
+    def __init__(self, roi=None, preview=True):
+        self.roi = roi          # Optional HandRoi, crops inference to the hands
+        self.preview = preview
+        self._rgb = None
+        self._scaled = None
+        self._mirrored = None
+
+    def scale(self, image, width):
+        """Downscale to at most `width` pixels wide, keeping the aspect ratio"""
+        if image.shape[1] <= width:
+            return image
+        height = round(image.shape[0] * width / image.shape[1])
+        shape = (height, width) + image.shape[2:]
+        if self._scaled is None or self._scaled.shape != shape:
+            self._scaled = np.empty(shape, image.dtype)
+        return cv2.resize(image, (width, height), dst=self._scaled, interpolation=cv2.INTER_AREA)
+
+    def prepare(self, image):
+        """Read-only RGB view of the frame (or ROI crop) to run MediaPipe on"""
+        if self.roi is not None:
+            return _read_only(self.roi.prepare(image))
+        if self._rgb is None or self._rgb.shape != image.shape:
+            self._rgb = np.empty_like(image)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return _read_only(self._rgb)
+
+    def finish(self, batch, frame_shape):
+        """Bring the hands found by MediaPipe into mirrored frame coordinates"""
+        if self.roi is not None:
+            batch = self.roi.update(batch, frame_shape)
+        if batch is not None:
+            x = batch.points[..., 0]
+            np.subtract(1.0, x, out=x)
+            batch.handedness = [_SWAP_HANDEDNESS.get(label, label) for label in batch.handedness]
+        return batch
+
+    def mirror(self, image):
+        """Mirrored preview of the frame, or the frame itself when previews are off"""
+        if not self.preview:
+            return image
+        if self._mirrored is None or self._mirrored.shape != image.shape:
+            self._mirrored = np.empty_like(image)
+        return cv2.flip(image, 1, dst=self._mirrored)
+
+
+class InlineTracker:
+    """Capture thread plus inference on the calling thread (the default mode).
+
+    With a PerformanceGovernor the tracker applies its quality level: frames
+    are skipped or downscaled, the camera is asked for the new resolution,
+    and the Hands graph is rebuilt from hands_options when the model
+    complexity or hand count changes. The caller must close tracker.hands,
+    not the instance it passed in.
+    """
+
+    def __init__(self, camera, hands, max_hands=2, metrics=None, roi=None,
+                 governor=None, hands_options=None, preview=True):
+        self.camera = camera  # An engine.VideoStream
+        self.hands = hands    # mediapipe Hands instance
+        self.roi = roi        # Optional HandRoi, crops inference to the hands
+        self.preprocessor = Preprocessor(roi, preview)
+        self.converter = LandmarkConverter(max_hands)
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self.governor = governor
+        if governor is not None and hands_options is None:
+            raise ValueError("A governor needs hands_options to rebuild the Hands graph")
+        self.hands_options = dict(hands_options or {})
+        # Options the current Hands graph was built with (MediaPipe's default complexity is 1)
+        self._options = dict(self.hands_options)
+        self._options.setdefault('model_complexity', 1)
+        self._size = None         # (width, height) of the governor level
+        self._work_start = None   # When the last frame returned started processing
+        self._work_hands = False
+        self._work_timestamp = 0.0
+        if governor is not None:
+            self._apply(governor.level)
+
+    @property
+    def finished(self):
+        return self.camera.finished
+
+    def start(self):
+        self.camera.start()
+        return self
+
+    def _apply(self, level):
+        """Switch to a governor quality level"""
+        base_hands = self.hands_options.get('max_num_hands', 2)
+        options = dict(self.hands_options, model_complexity=level.model_complexity,
+                       max_num_hands=min(level.max_hands, base_hands))
+        if options != self._options:
+            import mediapipe as mp
+            self.hands.close()
+            self.hands = mp.solutions.hands.Hands(**options)
+        self._options = options
+        source = getattr(self.camera, 'stream', None)
+        if source is not None and hasattr(source, 'set_resolution'):
+            source.set_resolution(level.width, level.height)
+        self._size = (level.width, level.height)
+        if self.roi is not None:
+            self.roi.reset()
+
+    def _observe(self):
+        """Report the cost of the previous frame, from preprocessing to now"""
+        if self._work_start is None:
+            return
+        seconds = time.perf_counter() - self._work_start
+        self._work_start = None
+        if self.governor.observe(seconds, self._work_hands, self._work_timestamp):
+            self._apply(self.governor.level)
+
+    def read(self, timeout=0.5):
+        """Wait for the next frame and run inference on it, None on timeout"""
+        metrics = self.metrics
+        governor = self.governor
+        if governor is not None:
+            self._observe()
+        start = metrics.now()
+        while True:
+            captured = self.camera.read(timeout)
+            if captured is None or governor is None or governor.should_process(captured.timestamp):
+                break
+            metrics.increment('frames_governed')
+        metrics.record('capture_wait', start)
+        if captured is None:
+            return None
+        start = metrics.now()
+        image = captured.image
+        if governor is not None:
+            self._work_start = time.perf_counter()
+            # Only does anything when the camera did not (or could not) switch resolution
+            image = self.preprocessor.scale(image, self._size[0])
+        rgb_frame = self.preprocessor.prepare(image)
+        metrics.record('preprocess', start)
+        start = metrics.now()
+        results = self.hands.process(rgb_frame)
+        batch = self.preprocessor.finish(self.converter.convert(results), image.shape)
+        if self.roi is not None:
+            metrics.set_gauge('roi_side', self.roi.active[2] if self.roi.active else 0)
+        metrics.record('inference', start)
+        if governor is not None:
+            self._work_hands = batch is not None
+            self._work_timestamp = captured.timestamp
+        start = metrics.now()
+        frame = self.preprocessor.mirror(image)
+        metrics.record('preview', start)
+        return TrackedFrame(frame, captured.seq, captured.timestamp, batch)
+
+    def stop(self):
+        self.camera.stop()
+
+
+class SharedFrameRing:
+    """Fixed number of frame slots in one multiprocessing.shared_memory block.
+
+    Made with no name, attached to by name otherwise. Only the process that
+    will unlink the block attaches with `adopt`.
+    """
+
+    def __init__(self, shape, slots, name=None, adopt=False):
+        size = int(np.prod(shape)) * slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        elif adopt:
+            self.shm = shared_memory.SharedMemory(name=name)
+        else:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # Python < 3.13
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + tuple(shape), np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _capture_main(source, slots, free_slots, frames_out, stop):
+    """Capture process: fills free ring slots and announces them to inference.
+
+    The ring is made for the size of the source's first frame, so nothing
+    is scaled unless the source changes size later on.
+    """
+    ring = None
+    source = open_source(source)
+    seq = 0
+    try:
+        if not source.open():
+            return
+        first = None
+        while first is None and not stop.is_set():
+            ret, frame = source.read()
+            if ret and frame is not None:
+                first = frame
+            elif source.exhausted:
+                return
+            else:
+                time.sleep(0.01)
+        if first is None:
+            return
+        first_timestamp = time.perf_counter()
+        ring = SharedFrameRing(first.shape, slots)
+        height, width = first.shape[:2]
+        frames_out.put(RingInfo(ring.name, first.shape))
+        while not stop.is_set():
+            try:
+                slot = free_slots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            target = ring.frames[slot]
+            if first is not None:
+                ret, frame, timestamp = True, first, first_timestamp
+                first = None
+            else:
+                ret, frame = source.read(target)
+                timestamp = time.perf_counter()
+            if not ret or frame is None:
+                free_slots.put(slot)
+                if source.exhausted:
+                    break
+                time.sleep(0.01)
+                continue
+            if frame is not target:
+                if frame.shape != target.shape:
+                    # Only after a resolution change, the ring keeps the first size
+                    cv2.resize(frame, (width, height), dst=target)
+                else:
+                    np.copyto(target, frame)
+            seq += 1
+            frames_out.put((slot, seq, timestamp))
+    finally:
+        frames_out.put(None)
+        source.release()
+        if ring is not None:
+            ring.close()
+
+
+def _inference_main(slots, hands_options, frames_in, free_slots, results_out, stop, roi=None):
+    """Inference process: converts and runs MediaPipe on the newest frame"""
+    import mediapipe as mp
+
+    ring = None
+    preprocessor = Preprocessor(roi, preview=False)  # The preview is flipped by the caller
+    converter = LandmarkConverter(hands_options.get('max_num_hands', 2))
+    if roi is not None:
+        hands_options = roi_hands_options(hands_options)
+    hands = mp.solutions.hands.Hands(**hands_options)
+    finished = False
+    try:
+        while not stop.is_set() and not finished:
+            try:
+                item = frames_in.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            if isinstance(item, RingInfo):
+                # Before the first frame; the caller attaches once it is passed on
+                ring = SharedFrameRing(item.shape, slots, item.name)
+                shape = item.shape
+                results_out.put(item)
+                continue
+            # Skip to the newest frame, handing stale slots straight back
+            while True:
+                try:
+                    newer = frames_in.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    finished = True
+                    break
+                free_slots.put(item[0])
+                item = newer
+
+            slot, seq, timestamp = item
+            frame = ring.frames[slot]
+            start = time.perf_counter()
+            image = preprocessor.prepare(frame)
+            converted = time.perf_counter()
+            batch = preprocessor.finish(converter.convert(hands.process(image)), shape)
+            timings = (converted - start, time.perf_counter() - converted)
+            landmarks = None
+            if batch is not None:
+                # Compact arrays, not protobuf objects, cross the process boundary
+                landmarks = (batch.points.tobytes(), tuple(batch.handedness),
+                             batch.scores.tobytes())
+            results_out.put((slot, seq, timestamp, landmarks, timings))
+    finally:
+        results_out.put(None)
+        hands.close()
+        if ring is not None:
+            ring.close()
+
+
+class PipelinedTracker:
+    """Capture and inference in their own processes, presentation in the caller.
+
+    Frames travel through shared-memory ring slots; the queues only carry
+    slot numbers, timestamps and landmark arrays. Every stage skips to the
+    newest frame, so throughput approaches the speed of the slowest stage
+    instead of the sum of all of them. The capture process sizes the ring
+    for the first frame of the source, whatever its resolution.
+    """
+
+    def __init__(self, source, hands_options, slots=4, metrics=None, roi=None, preview=True):
+        self.source = source  # Picklable source spec or unopened FrameSource
+        self.roi = roi        # Optional HandRoi, moved to the inference process
+        self.preprocessor = Preprocessor(preview=preview)  # Only mirrors the preview
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
+        self.hands_options = dict(hands_options)
+        self.shape = None  # Of the source's frames, known once the first one is read
+        self.slots = slots
+        self.finished = False
+        self.ring = None
+        self._processes = []
+        self._held = None
+
+    def start(self):
+        ctx = multiprocessing.get_context('spawn')
+        self._stop = ctx.Event()
+        self._free_slots = ctx.Queue()
+        self._frames = ctx.Queue()
+        self._results = ctx.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._processes = [
+            ctx.Process(target=_capture_main, daemon=True, name='gesture-capture',
+                        args=(self.source, self.slots, self._free_slots, self._frames,
+                              self._stop)),
+            ctx.Process(target=_inference_main, daemon=True, name='gesture-inference',
+                        args=(self.slots, self.hands_options, self._frames, self._free_slots,
+                              self._results, self._stop, self.roi)),
+        ]
+        for process in self._processes:
+            process.start()
+        self.finished = False
+        return self
+
+    def _attach(self, info):
+        """Map the capture process's ring; this process unlinks it in stop()"""
+        self.ring = SharedFrameRing(info.shape, self.slots, info.name, adopt=True)
+        self.shape = tuple(info.shape)
+
+    def release(self):
+        """Hand the slot of the last frame read back to the capture process"""
+        if self._held is not None:
+            self._free_slots.put(self._held)
+            self._held = None
+
+    def read(self, timeout=0.5):
+        """Wait for the newest processed frame, None on timeout or at the end.
+
+        The returned image stays valid until the next read(). Without a
+        preview it is the raw frame in shared memory, which release() also
+        invalidates.
+        """
+        self.release()
+        if self.finished:
+            return None
+        metrics = self.metrics
+        start = metrics.now()
+        try:
+            item = self._results.get(timeout=timeout)
+            if isinstance(item, RingInfo):
+                self._attach(item)
+                item = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        finally:
+            metrics.record('capture_wait', start)
+        while item is not None:
+            try:
+                newer = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._free_slots.put(item[0])
+            metrics.increment('frames_skipped')
+            item = newer
+        if item is None:
+            self.finished = True
+            return None
+
+        slot, seq, timestamp, landmarks, (preprocess, inference) = item
+        metrics.record_duration('preprocess', preprocess)
+        metrics.record_duration('inference', inference)
+        self._held = slot
+        batch = None
+        if landmarks is not None:
+            points, handedness, scores = landmarks
+            batch = HandBatch(np.frombuffer(points, np.float32).reshape(-1, NUM_LANDMARKS, 3),
+                              list(handedness), np.frombuffer(scores, np.float32))
+        frame = self.ring.frames[slot]
+        if self.preprocessor.preview:
+            start = metrics.now()
+            frame = self.preprocessor.mirror(frame)
+            metrics.record('preview', start)
+            self.release()  # The preview is a copy, capture can refill the slot now
+        return TrackedFrame(frame, seq, timestamp, batch)
+
+    def stop(self):
+        """Stop both worker processes and free the shared memory"""
+        if not self._processes:
+            return
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        while self.ring is None:
+            # Stopped before the first frame came through, the ring may exist anyway
+            try:
+                item = self._results.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                break
+            if isinstance(item, RingInfo):
+                self._attach(item)
+        for q in (self._free_slots, self._frames, self._results):
+            q.cancel_join_thread()
+            q.close()
+        self._processes = []
+        self._held = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from landmarks import HandBatch, draw_hands
+
+
+class PreviewRenderer:
+    """Debug preview window drawn on its own thread at a reduced frame rate.
+
+    The tracking loop calls submit() with every frame; at most `fps` times
+    a second the frame and its landmarks are copied into a reused buffer and
+    handed to the preview thread, which draws the landmarks, the optional
+    `annotate(image)` text and the metrics overlay, shows the window and
+    polls the keyboard. Keys pressed in the window go to `on_key(key)`, on
+    the preview thread. Nothing here blocks the tracking loop.
+    """
+
+    def __init__(self, title, fps=15.0, annotate=None, metrics=None, on_key=None):
+        self.title = title
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.annotate = annotate
+        self.metrics = metrics  # Drawn as an overlay when given
+        self.on_key = on_key
+        self.frames_shown = 0
+        self._cond = threading.Condition()
+        self._pending = None   # Buffer holding the newest submitted frame
+        self._spare = None     # Buffer the preview thread draws on
+        self._batch = None
+        self._has_frame = False
+        self._last_submit = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='preview')
+        self._thread.start()
+        return self
+
+    def submit(self, image, batch=None):
+        """Offer the newest frame, returns False when it was skipped to hold the rate"""
+        now = time.perf_counter()
+        if now - self._last_submit < self.interval:
+            return False
+        self._last_submit = now
+        if batch is not None:
+            # The tracker reuses its landmark buffer for the next frame
+            batch = HandBatch(batch.points.copy(), list(batch.handedness), batch.scores.copy())
+        with self._cond:
+            if self._pending is None or self._pending.shape != image.shape:
+                self._pending = np.empty_like(image)
+            np.copyto(self._pending, image)
+            self._batch = batch
+            self._has_frame = True
+            self._cond.notify()
+        return True
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                with self._cond:
+                    self._cond.wait_for(lambda: self._has_frame or self._stop_event.is_set(),
+                                        timeout=0.05)
+                    image = None
+                    if self._has_frame:
+                        # Swap buffers so submit() can fill the other one meanwhile
+                        self._pending, self._spare = self._spare, self._pending
+                        image, batch = self._spare, self._batch
+                        self._has_frame = False
+                if image is not None:
+                    self._draw(image, batch)
+                # Keep the window responsive and catch key presses between frames
+                key = cv2.waitKey(1) & 0xFF
+                if key != 0xFF and self.on_key is not None:
+                    self.on_key(key)
+        finally:
+            if self.frames_shown:
+                cv2.destroyWindow(self.title)
+
+    def _draw(self, image, batch):
+        if batch is not None:
+            draw_hands(image, batch)
+        if self.annotate is not None:
+            self.annotate(image)
+        if self.metrics is not None:
+            self.metrics.draw_overlay(image)
+        cv2.imshow(self.title, image)
+        self.frames_shown += 1
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
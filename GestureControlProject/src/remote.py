@@ -0,0 +1,420 @@
+"""Vision on one machine (or process), actuation on another.
+
+The vision producer runs the camera, MediaPipe and the gesture state
+machines with a RemoteActuator in place of the local Actuator. It sends
+cursor positions and gesture events to an ActuatorServer, which owns the
+input backend, the window cache and the app actions, and maps the events
+to actions exactly as the producer's handler would locally.
+
+Messages are little-endian structs, each starting with a type byte:
+
+    HELLO   H  version, screen width, height   server -> producer on connect
+    NAME    N  id, length, UTF-8 name          once per gesture or hand name
+    START   S                                  a tracking session starts
+    END     X                                  it ended, buttons are released
+    CURSOR  C  capture timestamp, x, y         17 bytes, screen pixels
+    EVENT   E  kind, gesture id, hand id,      23 bytes
+               timestamp, value tag, a, b
+
+Cursor positions are latest-value: while the link is busy (the socket
+blocks once the server falls behind, which is the back-pressure) only the
+newest position waits to be sent, and the server applies only the newest
+of every burst it reads. Events keep their order; consecutive MOVE events
+of one gesture are merged, scroll steps adding up. Timestamps are the
+producer's time.perf_counter(), so latencies only mean something when
+both ends run on the same machine.
+
+Addresses are "host:port", a bare port for localhost, or "unix:PATH".
+The protocol has no authentication or encryption: anyone who can connect
+to an ActuatorServer injects input, so bind it to a non-loopback
+interface only on a trusted network.
+"""
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from gesture_events import HOLD, MOVE, PRESS, RELEASE, GestureEvent
+
+PROTOCOL_VERSION = 1
+DEFAULT_ACTUATOR_PORT = 47801
+
+HELLO = struct.Struct('<cBII')
+NAME = struct.Struct('<cHB')
+CURSOR = struct.Struct('<cdii')
+EVENT = struct.Struct('<cBHHdBff')
+START = b'S'
+END = b'X'
+
+KINDS = (PRESS, HOLD, RELEASE, MOVE)
+# Event value tags
+NO_VALUE, STEPS, POINT = 0, 1, 2
+
+
+def parse_address(text):
+    """(family, address) of "host:port", a bare port or "unix:PATH" """
+    text = str(text)
+    if text.startswith('unix:'):
+        return socket.AF_UNIX, text[len('unix:'):]
+    host, _, port = text.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+class MessageReader:
+    """Splits a byte stream into messages, whatever the chunks it arrives in.
+
+    feed() returns ('cursor', x, y, timestamp), ('event', GestureEvent),
+    ('start',) and ('end',) tuples; NAME messages are handled internally.
+    Malformed input raises ValueError.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._names = {}
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        offset = 0
+        while offset < len(buffer):
+            kind = buffer[offset:offset + 1]
+            if kind == b'C':
+                if len(buffer) - offset < CURSOR.size:
+                    break
+                _, timestamp, x, y = CURSOR.unpack_from(buffer, offset)
+                messages.append(('cursor', x, y, timestamp))
+                offset += CURSOR.size
+            elif kind == b'E':
+                if len(buffer) - offset < EVENT.size:
+                    break
+                _, kind_index, gesture, hand, timestamp, tag, a, b = EVENT.unpack_from(buffer, offset)
+                if kind_index >= len(KINDS) or gesture not in self._names or hand not in self._names:
+                    # Corrupt or out of order, the connection cannot be trusted any more
+                    raise ValueError(f"Event with unknown kind {kind_index} or name id "
+                                     f"{gesture}/{hand}")
+                value = None
+                if tag == STEPS:
+                    value = int(a)
+                elif tag == POINT:
+                    value = (a, b)
+                messages.append(('event', GestureEvent(KINDS[kind_index], self._names[gesture],
+                                                       self._names[hand], timestamp, value)))
+                offset += EVENT.size
+            elif kind == b'N':
+                if len(buffer) - offset < NAME.size:
+                    break
+                _, name_id, length = NAME.unpack_from(buffer, offset)
+                end = offset + NAME.size + length
+                if len(buffer) < end:
+                    break
+                self._names[name_id] = bytes(buffer[offset + NAME.size:end]).decode()
+                offset = end
+            elif kind == START:
+                messages.append(('start',))
+                offset += 1
+            elif kind == END:
+                messages.append(('end',))
+                offset += 1
+            else:
+                raise ValueError(f"Unknown message type {bytes(kind)!r}")
+        del buffer[:offset]
+        return messages
+
+
+class MessageWriter:
+    """Encodes messages, introducing every gesture and hand name once"""
+
+    def __init__(self):
+        self._ids = {}
+
+    def _name(self, name, out):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self._ids)
+            encoded = name.encode()
+            out += NAME.pack(b'N', name_id, len(encoded))
+            out += encoded
+        return name_id
+
+    def event(self, event, out):
+        gesture = self._name(event.gesture, out)
+        hand = self._name(event.hand, out)
+        value = event.value
+        if value is None:
+            tag, a, b = NO_VALUE, 0.0, 0.0
+        elif isinstance(value, int):
+            tag, a, b = STEPS, value, 0.0
+        else:
+            tag, (a, b) = POINT, value
+        out += EVENT.pack(b'E', KINDS.index(event.kind), gesture, hand, event.timestamp,
+                          tag, a, b)
+
+    def cursor(self, x, y, timestamp, out):
+        out += CURSOR.pack(b'C', timestamp, int(x), int(y))
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The actuator closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+class RemoteActuator:
+    """Stands in for an Actuator on the vision side, see the module docstring.
+
+    Use send_event as the engine's on_event. At most `max_events` events
+    wait to be sent; beyond that the oldest are dropped and counted.
+    `send_buffer` sets SO_SNDBUF in bytes: the smaller it is, the sooner
+    a stalled actuator blocks sending and the fewer stale positions sit
+    in the kernel meanwhile. None keeps the OS default.
+    """
+
+    def __init__(self, address, timeout=5.0, max_events=256, send_buffer=None):
+        self.address = address
+        self.timeout = timeout
+        self.max_events = max_events
+        self.send_buffer = send_buffer
+        self.coalesced = 0  # Cursor positions and MOVE events merged into newer ones
+        self.dropped = 0
+        self.bytes_sent = 0
+        # Capture to the last cursor position leaving this machine, the actuator's
+        # clock is not ours, so this is the part of the latency that can be measured here
+        self.cursor_latency = None
+        self._socket = None
+        self._screen = None
+        self._writer = None
+        self._cond = threading.Condition()
+        self._cursor = None
+        self._events = deque()
+        self._session = None  # START still to be sent
+        self._stopped = True
+        self._thread = None
+
+    def prepare(self):
+        """Connect and learn the actuator's screen size"""
+        if self._socket is not None:
+            return self
+        family, address = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        if self.send_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        try:
+            sock.connect(address)
+            _, version, width, height = HELLO.unpack(_recv_exact(sock, HELLO.size))
+        except Exception:
+            sock.close()
+            raise
+        if version != PROTOCOL_VERSION:
+            sock.close()
+            raise ConnectionError(f"Actuator speaks protocol {version}, not {PROTOCOL_VERSION}")
+        sock.settimeout(None)
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        self._screen = (width, height)
+        self._writer = MessageWriter()
+        return self
+
+    def screen_size(self):
+        return self.prepare()._screen
+
+    def start(self):
+        self.prepare()
+        with self._cond:
+            self._stopped = False
+            self._cursor = None
+            self._events.clear()
+            self._session = START
+        self._thread = threading.Thread(target=self._run, daemon=True, name='remote-actuator')
+        self._thread.start()
+        return self
+
+    def move_to(self, x, y, timestamp=None):
+        with self._cond:
+            if self._cursor is not None:
+                self.coalesced += 1
+            self._cursor = (x, y, timestamp if timestamp is not None else 0.0)
+            self._cond.notify()
+
+    def send_event(self, event):
+        with self._cond:
+            last = self._events[-1] if self._events else None
+            if (event.kind == MOVE and last is not None and last.kind == MOVE
+                    and last.gesture == event.gesture and last.hand == event.hand):
+                value = event.value
+                if isinstance(value, int) and isinstance(last.value, int):
+                    value += last.value  # Scroll steps
+                self._events[-1] = event._replace(value=value)
+                self.coalesced += 1
+            else:
+                self._events.append(event)
+                if len(self._events) > self.max_events:
+                    self._events.popleft()
+                    self.dropped += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._cursor is not None
+                                    or self._events or self._session is not None)
+                session, self._session = self._session, None
+                events = list(self._events)
+                self._events.clear()
+                cursor, self._cursor = self._cursor, None
+                stopped = self._stopped
+            out = bytearray()
+            if session == START:
+                out += START
+            for event in events:
+                self._writer.event(event, out)
+            if cursor is not None:
+                self._writer.cursor(*cursor, out)
+            if stopped:
+                out += END  # Whatever was still queued goes first
+            try:
+                # Blocks while the actuator is behind; newer positions coalesce meanwhile
+                self._socket.sendall(out)
+            except OSError:
+                with self._cond:
+                    self._stopped = True
+                    self._events.clear()
+                    self._cursor = None
+                return
+            self.bytes_sent += len(out)
+            if cursor is not None and cursor[2]:
+                self.cursor_latency = time.perf_counter() - cursor[2]
+            if stopped:
+                return
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class ActuatorServer:
+    """Applies what a vision producer sends to a local Actuator, one producer at a time.
+
+    `on_event(event)` maps events to the actuator's actions, like the
+    engine's on_event does in a single process.
+    """
+
+    def __init__(self, actuator, on_event, address=DEFAULT_ACTUATOR_PORT):
+        self.actuator = actuator
+        self.on_event = on_event
+        self.address = address
+        self.cursor_coalesced = 0  # Positions skipped for a newer one in the same read
+        self.messages = 0
+        self._socket = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)  # Left over from an earlier run
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(address)
+        self._socket.listen(1)
+        self._socket.settimeout(0.2)
+        if family == socket.AF_INET:
+            # When started on port 0
+            self.address = '{}:{}'.format(*self._socket.getsockname())
+        self.actuator.prepare()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='actuator-server')
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until stop() is called, True once it was"""
+        return self._stop_event.wait(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                self._serve(conn)
+
+    def _serve(self, conn):
+        width, height = self.actuator.screen_size()
+        conn.settimeout(0.2)
+        if conn.family == socket.AF_INET:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = MessageReader()
+        started = False
+        try:
+            conn.sendall(HELLO.pack(b'H', PROTOCOL_VERSION, width, height))
+            while not self._stop_event.is_set():
+                try:
+                    data = conn.recv(65536)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break  # The producer disconnected
+                cursor = None
+                for message in reader.feed(data):
+                    self.messages += 1
+                    if message[0] == 'cursor':
+                        if cursor is not None:
+                            self.cursor_coalesced += 1
+                        cursor = message
+                        continue
+                    if cursor is not None and started:
+                        # Events see the cursor where it was when they happened
+                        self.actuator.move_to(cursor[1], cursor[2], cursor[3])
+                    cursor = None
+                    if message[0] == 'start' and not started:
+                        self.actuator.start()
+                        started = True
+                    elif message[0] == 'end' and started:
+                        # Let the last position land first, stop() drops a pending one
+                        self.actuator.wait_idle(0.5)
+                        self.actuator.stop()
+                        started = False
+                    elif message[0] == 'event' and started:
+                        self.on_event(message[1])
+                if cursor is not None and started:
+                    self.actuator.move_to(cursor[1], cursor[2], cursor[3])
+        except (OSError, ValueError) as e:
+            print(f"Actuator connection lost: {e}")
+        finally:
+            if started:
+                self.actuator.stop()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)
@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+
+
+def roi_hands_options(hands_options):
+    """Options for a Hands graph fed ROI crops: every image detected on its own.
+
+    The crop moves and is rescaled every frame and the full frame comes back
+    on a rescan, while MediaPipe's tracking mode carries the last hand box
+    over in the previous image's coordinates. HandRoi does the tracking.
+    """
+    return dict(hands_options, static_image_mode=True)
+
+
+class HandRoi:
+    """Runs hand inference on a window around the last known hands.
+
+    After a frame with hands, the next frame is cropped to a square around
+    their landmarks (grown by `padding` on every side), scaled to `size`
+    pixels and converted to RGB into a reused buffer, instead of converting
+    the whole frame. Landmarks found in the crop are mapped back to full-frame
+    coordinates. When no hand is found, or every `rescan_every` frames so a
+    second hand entering the image is not missed, the full frame is used.
+    """
+
+    def __init__(self, padding=0.4, size=256, min_side=96, rescan_every=60):
+        self.padding = padding
+        self.size = size            # Crop side fed to MediaPipe, None to keep the crop as is
+        self.min_side = min_side    # Smallest crop in frame pixels
+        self.rescan_every = rescan_every
+        self.window = None          # Next crop as (x, y, side) in frame pixels
+        self.active = None          # Crop used for the frame being processed
+        self._frames = 0
+        self._full = None
+        self._small = None
+
+    def reset(self):
+        self.window = None
+        self.active = None
+
+    def prepare(self, frame):
+        """RGB image to run MediaPipe on: the ROI crop, or the whole frame"""
+        self._frames += 1
+        rescan = self.rescan_every and self._frames % self.rescan_every == 0
+        if self.window is None or rescan:
+            self.active = None
+            if self._full is None or self._full.shape != frame.shape:
+                self._full = np.empty_like(frame)
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._full)
+
+        self.active = self.window
+        x, y, side = self.window
+        crop = frame[y:y + side, x:x + side]
+        if self.size:
+            if self._small is None:
+                self._small = np.empty((self.size, self.size, 3), np.uint8)
+            cv2.resize(crop, (self.size, self.size), dst=self._small,
+                       interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(self._small, cv2.COLOR_BGR2RGB, dst=self._small)
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+
+    def update(self, batch, frame_shape):
+        """Map the batch found by MediaPipe back to the frame and pick the next crop.
+
+        Works on batch.points in place and returns the batch for convenience.
+        """
+        height, width = frame_shape[:2]
+        if batch is None:
+            self.window = None
+            return None
+
+        points = batch.points
+        if self.active is not None:
+            x, y, side = self.active
+            points[..., 0] = (x + points[..., 0] * side) / width
+            points[..., 1] = (y + points[..., 1] * side) / height
+            points[..., 2] *= side / width  # z shares the scale of x
+
+        xs = points[..., 0] * width
+        ys = points[..., 1] * height
+        left, right = float(xs.min()), float(xs.max())
+        top, bottom = float(ys.min()), float(ys.max())
+        extent = max(right - left, bottom - top)
+        side = int(max(extent * (1 + 2 * self.padding), self.min_side))
+        if side >= min(width, height):
+            # The hands fill most of the frame, cropping gains nothing
+            self.window = None
+            return batch
+        cx = (left + right) / 2
+        cy = (top + bottom) / 2
+        x = int(min(max(cx - side / 2, 0), width - side))
+        y = int(min(max(cy - side / 2, 0), height - side))
+        self.window = (x, y, side)
+        return batch
@@ -0,0 +1,315 @@
+"""What window is in front, and which windows exist, without asking the OS every time.
+
+A WindowContext keeps the foreground window and a handle -> title index
+of the visible top-level windows. Platforms that can report focus, title,
+create and destroy events keep the cache current through them. Everywhere
+else the foreground window is polled cheaply, and the index is rebuilt
+only every `index_interval` seconds. Lookups read the cache.
+"""
+import sys
+import threading
+from collections import namedtuple
+
+WindowInfo = namedtuple('WindowInfo', ['handle', 'title'])
+
+# Event kinds a platform reports to WindowContext
+FOCUS = 'focus'      # The foreground window changed
+TITLE = 'title'      # A window's title changed
+CREATED = 'created'  # A window appeared
+DESTROYED = 'destroyed'  # A window went away or was hidden
+
+
+class WindowPlatform:
+    """Interface to the platform's window manager"""
+
+    def foreground(self):
+        """Handle of the foreground window, or None"""
+        return None
+
+    def title(self, handle):
+        return ''
+
+    def windows(self):
+        """(handle, title) of every visible top-level window"""
+        return []
+
+    def activate(self, handle):
+        """Bring a window to the front"""
+
+    def watch(self, callback):
+        """Call callback(kind, handle) on window events from now on.
+
+        Returns False when the platform has no events and must be polled.
+        """
+        return False
+
+    def unwatch(self):
+        pass
+
+
+class Win32Windows(WindowPlatform):
+    """Windows, through win32gui; events through SetWinEventHook"""
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+
+    def __init__(self):
+        import win32gui
+        self._win32gui = win32gui
+        self._thread = None
+        self._thread_id = None
+
+    def foreground(self):
+        return self._win32gui.GetForegroundWindow() or None
+
+    def title(self, handle):
+        return self._win32gui.GetWindowText(handle)
+
+    def windows(self):
+        win32gui = self._win32gui
+        found = []
+
+        def callback(hwnd, _):
+            if win32gui.IsWindowVisible(hwnd):
+                title = win32gui.GetWindowText(hwnd)
+                if title:
+                    found.append((hwnd, title))
+            return True
+        win32gui.EnumWindows(callback, None)
+        return found
+
+    def activate(self, handle):
+        self._win32gui.SetForegroundWindow(handle)
+
+    def watch(self, callback):
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._hook_loop, args=(callback, started),
+                                        daemon=True, name='window-events')
+        self._thread.start()
+        started.wait(1.0)
+        return self._thread_id is not None
+
+    def _hook_loop(self, callback, started):
+        """Out-of-context WinEvent hooks need a message loop on the hooking thread"""
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        kinds = {
+            self.EVENT_SYSTEM_FOREGROUND: FOCUS,
+            self.EVENT_OBJECT_NAMECHANGE: TITLE,
+            self.EVENT_OBJECT_CREATE: CREATED,
+            self.EVENT_OBJECT_SHOW: CREATED,
+            self.EVENT_OBJECT_DESTROY: DESTROYED,
+            self.EVENT_OBJECT_HIDE: DESTROYED,
+        }
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD,
+                                          wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, time_ms):
+            # Only whole windows, not the controls inside them
+            if hwnd and id_object == 0 and id_child == 0 and event in kinds:
+                callback(kinds[event], hwnd)
+
+        proc = WinEventProc(on_event)
+        hooks = [user32.SetWinEventHook(low, high, 0, proc, 0, 0, 0)  # WINEVENT_OUTOFCONTEXT
+                 for low, high in ((self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND),
+                                   (self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE),
+                                   (self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE))]
+        if not all(hooks):
+            started.set()
+            return
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        started.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+    def unwatch(self):
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, 0x0012, 0, 0)  # WM_QUIT
+            self._thread.join(timeout=1.0)
+            self._thread_id = None
+
+
+class FakeWindows(WindowPlatform):
+    """In-memory windows for tests and replays, with synchronous events"""
+
+    def __init__(self):
+        self.titles = {}
+        self.focused = None
+        self.activated = []  # Handles passed to activate(), in order
+        self.calls = 0       # Queries that would have reached the OS
+        self._callback = None
+        self._next_handle = 1
+
+    def open(self, title, focus=True):
+        handle = self._next_handle
+        self._next_handle += 1
+        self.titles[handle] = title
+        self._emit(CREATED, handle)
+        if focus:
+            self.focus(handle)
+        return handle
+
+    def close(self, handle):
+        del self.titles[handle]
+        if self.focused == handle:
+            self.focused = None
+        self._emit(DESTROYED, handle)
+
+    def focus(self, handle):
+        self.focused = handle
+        self._emit(FOCUS, handle)
+
+    def set_title(self, handle, title):
+        self.titles[handle] = title
+        self._emit(TITLE, handle)
+
+    def _emit(self, kind, handle):
+        if self._callback is not None:
+            self._callback(kind, handle)
+
+    def foreground(self):
+        self.calls += 1
+        return self.focused
+
+    def title(self, handle):
+        self.calls += 1
+        return self.titles.get(handle, '')
+
+    def windows(self):
+        self.calls += 1
+        return list(self.titles.items())
+
+    def activate(self, handle):
+        self.activated.append(handle)
+        self.focus(handle)
+
+    def watch(self, callback):
+        self._callback = callback
+        return True
+
+    def unwatch(self):
+        self._callback = None
+
+
+def create_window_platform():
+    """The real window manager where supported, otherwise one with no windows"""
+    if sys.platform == 'win32':
+        try:
+            return Win32Windows()
+        except ImportError:
+            pass
+    return WindowPlatform()
+
+
+class WindowContext:
+    """Cached foreground window and title index, kept current by events or polling"""
+
+    def __init__(self, platform=None, poll_interval=0.25, index_interval=2.0):
+        self.platform = platform  # The real window manager is looked up by start()
+        self.poll_interval = poll_interval
+        self.index_interval = index_interval
+        self.active = WindowInfo(None, '')  # Title in lower case
+        self._index = {}         # handle -> lower-case title
+        self._index_dirty = True
+        self._found = {}         # Cached find() results, cleared when the index changes
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.watching = False    # True while the platform reports events
+        self.events = 0
+
+    def start(self):
+        if self.platform is None:
+            self.platform = create_window_platform()
+        self._refresh_active()
+        self._refresh_index()
+        self._stop_event.clear()
+        self.watching = self.platform.watch(self._on_event)
+        if not self.watching:
+            self._thread = threading.Thread(target=self._poll, daemon=True, name='window-poll')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self.platform is not None:
+            self.platform.unwatch()
+        self.watching = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _on_event(self, kind, handle):
+        self.events += 1
+        if kind == FOCUS:
+            self._refresh_active()
+        elif kind == TITLE:
+            title = self.platform.title(handle).lower()
+            with self._lock:
+                if handle in self._index:
+                    self._index[handle] = title
+                    self._found.clear()
+                else:
+                    self._index_dirty = True  # A window that had no title yet
+            if handle == self.active.handle:
+                self.active = WindowInfo(handle, title)
+        else:
+            with self._lock:
+                self._index_dirty = True
+            if kind == DESTROYED and handle == self.active.handle:
+                self._refresh_active()
+
+    def _poll(self):
+        waited = 0.0
+        while not self._stop_event.wait(self.poll_interval):
+            self._refresh_active()
+            waited += self.poll_interval
+            if waited >= self.index_interval:
+                waited = 0.0
+                with self._lock:
+                    self._index_dirty = True
+
+    def _refresh_active(self):
+        handle = self.platform.foreground()
+        title = self.platform.title(handle).lower() if handle is not None else ''
+        self.active = WindowInfo(handle, title)
+
+    def current(self):
+        """The foreground window now: the cached one when events keep it current,
+        otherwise asked for afresh instead of waiting for the next poll"""
+        if not self.watching:
+            self._refresh_active()
+        return self.active
+
+    def _refresh_index(self):
+        windows = self.platform.windows()
+        with self._lock:
+            self._index = {handle: title.lower() for handle, title in windows}
+            self._index_dirty = False
+            self._found.clear()
+
+    def find(self, pattern):
+        """First indexed window whose lower-case title matches a compiled regex, or None"""
+        if self._index_dirty:
+            self._refresh_index()
+        with self._lock:
+            if pattern in self._found:
+                return self._found[pattern]
+            handle = next((h for h, title in self._index.items() if pattern.search(title)), None)
+            self._found[pattern] = handle
+            return handle
+
+    def activate(self, handle):
+        self.platform.activate(handle)
+        self._refresh_active()